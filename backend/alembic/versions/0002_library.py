@@ -0,0 +1,67 @@
+"""Library index tables
+
+Revision ID: 0002_library
+Revises: 0001_initial
+Create Date: 2026-10-19 09:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002_library"
+down_revision = "0001_initial"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # trigram operators for substring search on title/artist
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # library_directories
+    op.create_table(
+        "library_directories",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("path", sa.String(length=1000), nullable=False),
+        sa.Column("mtime_ns", sa.BigInteger(), nullable=False),
+        sa.Column("scanned_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_library_directories_path", "library_directories", ["path"], unique=True)
+
+    # library_tracks
+    op.create_table(
+        "library_tracks",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("path", sa.String(length=1000), nullable=False),
+        sa.Column("directory", sa.String(length=1000), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("mtime_ns", sa.BigInteger(), nullable=False),
+        sa.Column("title", sa.String(length=500), nullable=True),
+        sa.Column("artist", sa.String(length=200), nullable=True),
+        sa.Column("album", sa.String(length=500), nullable=True),
+        sa.Column("duration", sa.Float(), nullable=True),
+        sa.Column("indexed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.UniqueConstraint("path", name="uq_library_tracks_path"),
+    )
+    op.create_index("ix_library_tracks_directory", "library_tracks", ["directory"])
+    op.create_index(
+        "ix_library_tracks_title_trgm", "library_tracks", ["title"],
+        postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_library_tracks_artist_trgm", "library_tracks", ["artist"],
+        postgresql_using="gin", postgresql_ops={"artist": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_library_tracks_artist_trgm", table_name="library_tracks")
+    op.drop_index("ix_library_tracks_title_trgm", table_name="library_tracks")
+    op.drop_index("ix_library_tracks_directory", table_name="library_tracks")
+    op.drop_table("library_tracks")
+    op.drop_index("ix_library_directories_path", table_name="library_directories")
+    op.drop_table("library_directories")
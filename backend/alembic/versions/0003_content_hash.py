@@ -0,0 +1,28 @@
+"""Content hash on library tracks
+
+Revision ID: 0003_content_hash
+Revises: 0002_library
+Create Date: 2026-10-19 10:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_content_hash"
+down_revision = "0002_library"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("library_tracks", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.create_index("ix_library_tracks_content_hash", "library_tracks", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_library_tracks_content_hash", table_name="library_tracks")
+    op.drop_column("library_tracks", "content_hash")
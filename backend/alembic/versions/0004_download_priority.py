@@ -0,0 +1,29 @@
+"""Download priority
+
+Revision ID: 0004_download_priority
+Revises: 0003_content_hash
+Create Date: 2026-10-19 11:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_download_priority"
+down_revision = "0003_content_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "download_history",
+        sa.Column("priority", sa.String(length=20), nullable=False, server_default="interactive"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("download_history", "priority")
@@ -0,0 +1,31 @@
+"""Download retry bookkeeping
+
+Revision ID: 0005_download_retries
+Revises: 0004_download_priority
+Create Date: 2026-10-19 12:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0005_download_retries"
+down_revision = "0004_download_priority"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("download_history", sa.Column("error_class", sa.String(length=20), nullable=True))
+    op.add_column(
+        "download_history",
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("download_history", "attempts")
+    op.drop_column("download_history", "error_class")
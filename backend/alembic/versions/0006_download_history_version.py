@@ -0,0 +1,29 @@
+"""Index download history by user and last update
+
+Revision ID: 0006_download_history_version
+Revises: 0005_download_retries
+Create Date: 2026-10-19 12:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0006_download_history_version"
+down_revision = "0005_download_retries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_download_history_user_id_updated_at",
+        "download_history",
+        ["user_id", "updated_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_download_history_user_id_updated_at", table_name="download_history")
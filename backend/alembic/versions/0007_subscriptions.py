@@ -0,0 +1,63 @@
+"""Subscriptions and download archive
+
+Revision ID: 0007_subscriptions
+Revises: 0006_download_history_version
+Create Date: 2026-10-19 12:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_subscriptions"
+down_revision = "0006_download_history_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # subscriptions
+    op.create_table(
+        "subscriptions",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("url", sa.String(length=2048), nullable=False),
+        sa.Column("title", sa.String(length=500), nullable=True),
+        sa.Column("priority", sa.String(length=20), nullable=False, server_default="bulk"),
+        sa.Column("backfill", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("next_check_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("last_checked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.UniqueConstraint("user_id", "url", name="uq_subscriptions_user_id_url"),
+    )
+    op.create_index("ix_subscriptions_next_check_at", "subscriptions", ["next_check_at"])
+
+    # download_archive
+    op.create_table(
+        "download_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("extractor", sa.String(length=50), nullable=False),
+        sa.Column("media_id", sa.String(length=200), nullable=False),
+        sa.Column(
+            "subscription_id", sa.Integer(),
+            sa.ForeignKey("subscriptions.id", ondelete="SET NULL"), nullable=True,
+        ),
+        sa.Column(
+            "download_id", sa.Integer(),
+            sa.ForeignKey("download_history.id", ondelete="SET NULL"), nullable=True,
+        ),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.UniqueConstraint("user_id", "extractor", "media_id", name="uq_download_archive_user_media"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("download_archive")
+    op.drop_index("ix_subscriptions_next_check_at", table_name="subscriptions")
+    op.drop_table("subscriptions")
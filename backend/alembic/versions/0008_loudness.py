@@ -0,0 +1,30 @@
+"""Loudness analysis results on library tracks
+
+Revision ID: 0008_loudness
+Revises: 0007_subscriptions
+Create Date: 2026-10-19 12:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0008_loudness"
+down_revision = "0007_subscriptions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("library_tracks", sa.Column("loudness_lufs", sa.Float(), nullable=True))
+    op.add_column("library_tracks", sa.Column("sample_peak", sa.Float(), nullable=True))
+    op.add_column("library_tracks", sa.Column("loudness_analyzed_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("library_tracks", "loudness_analyzed_at")
+    op.drop_column("library_tracks", "sample_peak")
+    op.drop_column("library_tracks", "loudness_lufs")
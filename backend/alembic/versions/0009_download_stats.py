@@ -0,0 +1,53 @@
+"""Daily per-user download statistics rollup
+
+Revision ID: 0009_download_stats
+Revises: 0008_loudness
+Create Date: 2026-10-19 12:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0009_download_stats"
+down_revision = "0008_loudness"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "download_stats_daily",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("downloads", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failures", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("bytes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("duration_seconds", sa.Float(), nullable=False, server_default="0"),
+        sa.UniqueConstraint("user_id", "day", name="uq_download_stats_daily_user_day"),
+    )
+
+    # Backfill from existing history; afterwards the scheduler maintains the rollup as jobs finish.
+    # Days are UTC days like the scheduler's, whatever the server's TimeZone setting.
+    op.execute(
+        """
+        INSERT INTO download_stats_daily (user_id, day, downloads, failures, bytes, duration_seconds)
+        SELECT user_id,
+               (download_completed_at AT TIME ZONE 'UTC')::date,
+               COUNT(*) FILTER (WHERE status = 'completed'),
+               COUNT(*) FILTER (WHERE status = 'failed'),
+               COALESCE(SUM(file_size) FILTER (WHERE status = 'completed'), 0),
+               COALESCE(SUM(duration) FILTER (WHERE status = 'completed'), 0)
+        FROM download_history
+        WHERE status IN ('completed', 'failed') AND download_completed_at IS NOT NULL
+        GROUP BY user_id, (download_completed_at AT TIME ZONE 'UTC')::date
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("download_stats_daily")
@@ -0,0 +1,42 @@
+"""Per-user storage counters and quotas
+
+Revision ID: 0010_storage_quota
+Revises: 0009_download_stats
+Create Date: 2026-10-19 12:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0010_storage_quota"
+down_revision = "0009_download_stats"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("storage_used_bytes", sa.BigInteger(), nullable=False, server_default="0"))
+    op.add_column("users", sa.Column("storage_quota_bytes", sa.BigInteger(), nullable=True))
+
+    # One last scan; from here on the scheduler adds each finished file's size
+    op.execute(
+        """
+        UPDATE users SET storage_used_bytes = totals.bytes
+        FROM (
+            SELECT user_id, SUM(file_size) AS bytes
+            FROM download_history
+            WHERE status = 'completed' AND file_size IS NOT NULL
+            GROUP BY user_id
+        ) AS totals
+        WHERE users.id = totals.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "storage_quota_bytes")
+    op.drop_column("users", "storage_used_bytes")
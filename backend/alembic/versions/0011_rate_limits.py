@@ -0,0 +1,33 @@
+"""Shared rate limit counters
+
+Revision ID: 0011_rate_limits
+Revises: 0010_storage_quota
+Create Date: 2026-10-19 12:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0011_rate_limits"
+down_revision = "0010_storage_quota"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Only written with RATE_LIMIT_BACKEND=database; rows older than two windows are deleted as they expire
+    op.create_table(
+        "rate_limit_counters",
+        sa.Column("key", sa.String(length=300), nullable=False),
+        sa.Column("window_start", sa.BigInteger(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("key", "window_start"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("rate_limit_counters")
@@ -0,0 +1,27 @@
+"""Heartbeat of running downloads
+
+Revision ID: 0012_download_heartbeat
+Revises: 0011_rate_limits
+Create Date: 2026-10-19 12:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0012_download_heartbeat"
+down_revision = "0011_rate_limits"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Claims without a recent heartbeat belong to a process that is gone
+    op.add_column("download_history", sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("download_history", "heartbeat_at")
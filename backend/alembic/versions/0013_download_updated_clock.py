@@ -0,0 +1,30 @@
+"""Stamp download_history.updated_at with statement time
+
+Revision ID: 0013_download_updated_clock
+Revises: 0012_download_heartbeat
+Create Date: 2026-10-19 12:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0013_download_updated_clock"
+down_revision = "0012_download_heartbeat"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # now() is the transaction start; rows written late in a long transaction would
+    # appear older than changes a client already paged past in /api/downloads/changes
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column("download_history", "updated_at", server_default=sa.text("clock_timestamp()"))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column("download_history", "updated_at", server_default=sa.text("now()"))
@@ -0,0 +1,110 @@
+"""Compare the cost of one page of download history, before and after slim listings.
+
+"entities" loads whole DownloadHistory rows, validates them through
+DownloadHistoryResponse and encodes with the standard JSON encoder, as
+FastAPI does for a response_model. "columns" selects only the response
+columns and encodes the plain rows with orjson. Runs against an in-memory
+SQLite database, so the numbers are query + serialization, no network.
+
+    cd backend && PYTHONPATH=src python scripts/bench_serialization.py --rows 100
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from music_downloader.model import Base, DownloadHistory, User
+from music_downloader.route.download import DOWNLOAD_RESPONSE_COLUMNS
+from music_downloader.route.responses import FastJSONResponse, response_rows
+from music_downloader.schema.download import DownloadHistoryResponse, DownloadResponse
+
+
+def seed(session_factory, rows: int) -> None:
+    db = session_factory()
+    db.add(User(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+    now = datetime.utcnow()
+    db.add_all([
+        DownloadHistory(
+            user_id=1, url=f"https://www.youtube.com/watch?v={i:011d}", title=f"Track {i}", artist="Artist",
+            status="failed" if i % 10 == 0 else "completed", file_path=f"/app/downloads/Track {i}.mp3",
+            error_message="ERROR: " + "x" * 2000 if i % 10 == 0 else None,
+            created_at=now - timedelta(minutes=i), updated_at=now - timedelta(minutes=i),
+            download_started_at=now, download_completed_at=now,
+        )
+        for i in range(rows)
+    ])
+    db.commit()
+    db.close()
+
+
+def fetch_entities(db, rows: int) -> list:
+    return db.query(DownloadHistory).filter(DownloadHistory.user_id == 1).order_by(
+        DownloadHistory.created_at.desc()
+    ).limit(rows).all()
+
+
+def serialize_entities(downloads: list) -> bytes:
+    body = DownloadHistoryResponse(downloads=downloads, total=len(downloads), page=1, per_page=len(downloads))
+    return json.dumps(body.model_dump(mode="json"), separators=(",", ":")).encode()
+
+
+def fetch_columns(db, rows: int) -> list:
+    return db.query(*DOWNLOAD_RESPONSE_COLUMNS).filter(DownloadHistory.user_id == 1).order_by(
+        DownloadHistory.created_at.desc()
+    ).limit(rows).all()
+
+
+def serialize_columns(downloads: list) -> bytes:
+    content = {
+        "downloads": response_rows(downloads, DownloadResponse),
+        "total": len(downloads), "page": 1, "per_page": len(downloads)
+    }
+    return FastJSONResponse(content).body
+
+
+def measure(session_factory, fetch, serialize, rows: int, repeat: int) -> tuple:
+    """Median (query + serialization, serialization only) seconds"""
+    totals, serializations = [], []
+    for _ in range(repeat):
+        db = session_factory()
+        started = time.perf_counter()
+        downloads = fetch(db, rows)
+        fetched = time.perf_counter()
+        serialize(downloads)
+        finished = time.perf_counter()
+        totals.append(finished - started)
+        serializations.append(finished - fetched)
+        db.close()
+    return statistics.median(totals), statistics.median(serializations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    seed(session_factory, args.rows)
+
+    with session_factory() as db:
+        before_body = serialize_entities(fetch_entities(db, args.rows))
+        assert json.loads(before_body) == json.loads(serialize_columns(fetch_columns(db, args.rows)))
+
+    before = measure(session_factory, fetch_entities, serialize_entities, args.rows, args.repeat)
+    after = measure(session_factory, fetch_columns, serialize_columns, args.rows, args.repeat)
+    print(f"rows per page:  {args.rows} (medians of {args.repeat} runs)")
+    print(f"                {'query+serialize':>16} {'serialize':>10}")
+    print(f"entities:       {before[0] * 1000:13.2f} ms {before[1] * 1000:7.2f} ms")
+    print(f"columns:        {after[0] * 1000:13.2f} ms {after[1] * 1000:7.2f} ms")
+    print(f"speedup:        {before[0] / after[0]:15.1f}x {before[1] / after[1]:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Measure cold import time and memory of the API app.
+
+Each run starts a fresh interpreter, imports the app and builds it with
+create_app(), then reports wall time, peak RSS and whether yt-dlp was loaded.
+
+    cd backend && PYTHONPATH=src python scripts/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+from music_downloader.app import create_app
+create_app()
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "yt_dlp_loaded": "yt_dlp" in sys.modules,
+}))
+"""
+
+
+def run_once() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    print(f"runs:           {args.runs}")
+    print(f"import+create:  {statistics.median(r['seconds'] for r in results) * 1000:.0f} ms (median)")
+    print(f"max RSS:        {statistics.median(r['max_rss_mb'] for r in results):.1f} MB (median)")
+    print(f"modules loaded: {results[-1]['modules']}")
+    print(f"yt-dlp loaded:  {results[-1]['yt_dlp_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,92 @@
 
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
 import uvicorn
 import logging
 import os
+import uuid
 
 from .config.settings import settings
+from .config.logging_config import configure_logging, request_id_var
 from .route.auth import auth_router
 from .route.download import download_router
 from .route.monitor import monitor_router
+from .route.library import library_router
+from .route.subscription import subscription_router
+from .route.stats import stats_router
+from .service.library import library_indexer
+from .service.content_hash import content_hasher
+from .service.loudness import loudness_analyzer
+from .service.scheduler import download_scheduler
+from .service.janitor import workspace_janitor
+from .service.events import event_bus
+from .service.subscriptions import subscription_checker
+from .service.rate_limit import RateLimitMiddleware
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO if not settings.debug else logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background services run only while the server is up, not on plain import
+    event_bus.start()
+    content_hasher.start()
+    loudness_analyzer.start()
+    library_indexer.start()
+    download_scheduler.start()
+    workspace_janitor.start()
+    subscription_checker.start()
+    yield
+    subscription_checker.stop()
+    workspace_janitor.stop()
+    download_scheduler.stop()
+    library_indexer.stop()
+    loudness_analyzer.stop()
+    content_hasher.stop()
+    event_bus.stop()
+
+
+class RequestIdMiddleware:
+    """Tags each request's log records with its X-Request-ID (generated if the client sent none)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming[:64] if incoming.isprintable() and incoming else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
 def create_app():
     version = "0.1.0"
     app = FastAPI(
         title=settings.app_name, 
         version=version, 
-        description="Backend API for downloading music for NAS storage with authentication and audit logging"
+        description="Backend API for downloading music for NAS storage with authentication and audit logging",
+        lifespan=lifespan
     )
 
+    # Rate limits run inside CORS, so browsers can read the 429, and before any route dependency
+    app.add_middleware(RateLimitMiddleware)
+
     # CORS middleware
     origins = [
         "http://localhost",
@@ -40,7 +101,9 @@ def create_app():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Request-ID", "Retry-After"],
     )
+    app.add_middleware(RequestIdMiddleware)
 
     # Database schema handled by Alembic migrations at container start
 
@@ -52,6 +115,9 @@ def create_app():
     app.include_router(auth_router)
     app.include_router(download_router)
     app.include_router(monitor_router)
+    app.include_router(library_router)
+    app.include_router(subscription_router)
+    app.include_router(stats_router)
 
     @app.get("/")
     async def root():
@@ -74,7 +140,8 @@ if __name__ == "__main__":
         app,
         host="0.0.0.0",
         port=8000,
-        reload=settings.debug
+        reload=settings.debug,
+        log_config=None  # keep the queue-based logging configured above
     )
     server = uvicorn.Server(config)
     server.run()
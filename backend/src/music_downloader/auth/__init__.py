@@ -1,19 +1,25 @@
 from .dependencies import (
     get_current_user,
     get_current_active_user,
+    get_admin_user,
+    get_current_media_user,
 )
 from .security import (
     verify_password,
     get_password_hash,
     create_access_token,
+    create_media_token,
     verify_token,
 )
 
 __all__ = [
     "get_current_user",
     "get_current_active_user",
+    "get_admin_user",
+    "get_current_media_user",
     "verify_password",
     "get_password_hash",
     "create_access_token",
+    "create_media_token",
     "verify_token",
 ]
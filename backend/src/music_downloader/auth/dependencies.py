@@ -1,30 +1,30 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 import logging
 from types import SimpleNamespace
-from jose import JWTError, ExpiredSignatureError
+from typing import Optional
+from jose import JWTError, ExpiredSignatureError, jwt
 
 
+from ..config.settings import settings
 from ..model import get_db, User, TokenBlacklist
-from .security import verify_token
+from .security import verify_token, MEDIA_TOKEN_SCOPE
+from .token_cache import token_cache
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
-    token = credentials.credentials
+def _authenticate_token(token: str, db: Session) -> User:
+    """Resolve a JWT to its active, non-revoked user"""
     try:
         payload = verify_token(token)
         jti = payload.get("jti")
-        if not jti:
+        if not jti or payload.get("scope") == MEDIA_TOKEN_SCOPE:
             raise HTTPException(status_code=401, detail="Malformed token")
         username = payload.get("sub")
         if username is None:
@@ -39,7 +39,7 @@ async def get_current_user(
         raise HTTPException(status_code=401, detail="Invalid token")
         
     # Check blacklist
-    if db.query(TokenBlacklist).filter_by(jti=jti).first():
+    if not token_cache.is_known_valid(jti) and db.query(TokenBlacklist).filter_by(jti=jti).first():
         raise HTTPException(status_code=401, detail="Token has been revoked")
 
     user = db.query(User).filter(User.username == username).first()
@@ -56,11 +56,57 @@ async def get_current_user(
             detail="Inactive user"
         )
     
+    token_cache.remember(jti, user.id)
+
      # Attach token data to the return value so logout can see it
     user.token_data = SimpleNamespace(jti=jti, exp=payload.get("exp"))
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get current authenticated user from JWT token"""
+    return _authenticate_token(credentials.credentials, db)
+
+
+async def get_current_media_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    media_token: Optional[str] = Query(
+        None, description="Signed URL token from POST /auth/media-token, for clients that cannot set headers"
+    ),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get current user from the Authorization header or a `media_token` issued for this URL path.
+
+    The session token itself is never accepted in the query string, where it
+    would end up in access logs, browser history and Referer headers.
+    """
+    if credentials:
+        return _authenticate_token(credentials.credentials, db)
+    if not media_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        payload = jwt.decode(media_token, settings.secret_key, algorithms=[settings.algorithm])
+    except ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("scope") != MEDIA_TOKEN_SCOPE or payload.get("path") != request.url.path:
+        raise HTTPException(status_code=401, detail="Token not valid for this URL")
+
+    user = db.query(User).filter(User.username == payload.get("sub")).first()
+    if user is None or not user.is_active:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    return user
+
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user"""
     return current_user
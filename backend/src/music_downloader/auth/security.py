@@ -7,6 +7,9 @@ import uuid
 
 from ..config.settings import settings
 
+# Claim marking a token that only opens one media URL, never a session
+MEDIA_TOKEN_SCOPE = "media"
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -39,6 +42,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def create_media_token(username: str, path: str, expires_delta: Optional[timedelta] = None) -> str:
+    """Create a short-lived JWT valid only for GET requests to `path`, for clients that cannot set headers"""
+    expire = datetime.utcnow() + (expires_delta or timedelta(seconds=settings.media_token_expire_seconds))
+    to_encode = {"sub": username, "scope": MEDIA_TOKEN_SCOPE, "path": path, "exp": expire}
+    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+
+
 def verify_token(token: str) -> dict:
     """Verify and decode a JWT token"""
     try:
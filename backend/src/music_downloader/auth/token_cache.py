@@ -0,0 +1,94 @@
+import threading
+import time
+from typing import Dict, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..config.settings import settings
+from ..model import User, TokenBlacklist
+from ..service.events import event_bus, TOKEN_REVOKED, USER_CHANGED, RESYNC
+
+# User columns a cached authentication depends on
+AUTH_COLUMNS = ("username", "hashed_password", "is_active", "is_admin")
+
+
+class TokenCache:
+    """Tokens that recently passed the blacklist check, keyed by jti.
+
+    Lets authenticated requests skip the blacklist query. Revocations and
+    account changes arrive through the event bus and evict entries in every
+    process; `auth_cache_seconds` bounds staleness if an event is lost.
+    """
+
+    MAX_ENTRIES = 10000
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, float]] = {}  # jti -> (user_id, cached_at)
+        self._lock = threading.Lock()
+
+    def is_known_valid(self, jti: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry is None:
+                return False
+            if time.monotonic() - entry[1] >= settings.auth_cache_seconds:
+                del self._entries[jti]
+                return False
+            return True
+
+    def remember(self, jti: str, user_id: int) -> None:
+        if settings.auth_cache_seconds <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.MAX_ENTRIES:
+                self._entries.clear()
+            self._entries[jti] = (user_id, time.monotonic())
+
+    def forget_token(self, jti: str) -> None:
+        with self._lock:
+            self._entries.pop(jti, None)
+
+    def forget_user(self, user_id: int) -> None:
+        with self._lock:
+            for jti in [jti for jti, (owner, _) in self._entries.items() if owner == user_id]:
+                del self._entries[jti]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+event_bus.subscribe(TOKEN_REVOKED, lambda event: token_cache.forget_token(event["jti"]))
+event_bus.subscribe(USER_CHANGED, lambda event: token_cache.forget_user(event["user_id"]))
+event_bus.subscribe(RESYNC, lambda event: token_cache.clear())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_auth_changes(session, flush_context) -> None:
+    """Note account changes and revocations as they are flushed, to announce them once committed"""
+    changes = session.info.setdefault("auth_changes", [])
+    for obj in session.dirty:
+        if isinstance(obj, User) and any(inspect(obj).attrs[name].history.has_changes() for name in AUTH_COLUMNS):
+            changes.append((USER_CHANGED, {"user_id": obj.id}))
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changes.append((USER_CHANGED, {"user_id": obj.id}))
+    for obj in session.new:
+        if isinstance(obj, TokenBlacklist):
+            changes.append((TOKEN_REVOKED, {"jti": obj.jti, "user_id": obj.user_id}))
+            changes.append((USER_CHANGED, {"user_id": obj.user_id}))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_auth_changes(session) -> None:
+    """Every committed password change, deactivation or revocation evicts the user in all processes"""
+    for event_type, payload in session.info.pop("auth_changes", []):
+        event_bus.publish(event_type, **payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_auth_changes(session) -> None:
+    session.info.pop("auth_changes", None)
@@ -14,10 +14,79 @@ class Settings(BaseSettings):
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     algorithm: str = os.getenv("ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    media_token_expire_seconds: int = int(os.getenv("MEDIA_TOKEN_EXPIRE_SECONDS", "300"))  # signed media URLs
+    auth_cache_seconds: int = int(os.getenv("AUTH_CACHE_SECONDS", "30"))  # 0 checks the blacklist on every request
     
     # NAS output settings
     output_directory: str = os.getenv("OUTPUT_DIRECTORY", "/app/downloads")
+
+    # Storage admission settings
+    default_storage_quota_mb: int = int(os.getenv("DEFAULT_STORAGE_QUOTA_MB", "0"))  # per user; 0 is unlimited
+    storage_defer_seconds: float = float(os.getenv("STORAGE_DEFER_SECONDS", "300"))  # wait when the disk is full
+    unknown_size_estimate_mb: int = int(os.getenv("UNKNOWN_SIZE_ESTIMATE_MB", "50"))  # no size, bitrate or duration
+
+    # Workspace janitor settings
+    janitor_interval_seconds: int = int(os.getenv("JANITOR_INTERVAL_SECONDS", "3600"))  # 0 sweeps only at startup
+    janitor_grace_seconds: int = int(os.getenv("JANITOR_GRACE_SECONDS", "3600"))  # untouched this long = abandoned
+
+    # Post-processing settings
+    audio_bitrate: str = os.getenv("AUDIO_BITRATE", "192")  # MP3 bitrate in kbit/s
+    loudness_normalization: bool = os.getenv("LOUDNESS_NORMALIZATION", "false").lower() == "true"
+    loudness_workers: int = int(os.getenv("LOUDNESS_WORKERS", str(os.cpu_count() or 1)))  # 0 disables analysis
+    write_replaygain_tags: bool = os.getenv("WRITE_REPLAYGAIN_TAGS", "false").lower() == "true"
+
+    # Readiness and load shedding settings
+    readiness_cache_seconds: float = float(os.getenv("READINESS_CACHE_SECONDS", "5"))
+    readiness_check_timeout_seconds: float = float(os.getenv("READINESS_CHECK_TIMEOUT_SECONDS", "2"))
+    min_free_disk_mb: int = int(os.getenv("MIN_FREE_DISK_MB", "1024"))
+    max_queue_depth: int = int(os.getenv("MAX_QUEUE_DEPTH", "5000"))
+    load_shed_retry_after_seconds: int = int(os.getenv("LOAD_SHED_RETRY_AFTER_SECONDS", "30"))
+
+    # Serve files through Nginx (sendfile) instead of the app, e.g. "/protected-downloads"; empty serves directly
+    x_accel_redirect_prefix: str = os.getenv("X_ACCEL_REDIRECT_PREFIX", "")
+
+    # Download scheduler settings
+    download_workers: int = int(os.getenv("DOWNLOAD_WORKERS", "2"))
+    max_concurrent_jobs_per_user: int = int(os.getenv("MAX_CONCURRENT_JOBS_PER_USER", "1"))
+    max_queued_jobs_per_user: int = int(os.getenv("MAX_QUEUED_JOBS_PER_USER", "500"))
+    claim_heartbeat_seconds: int = int(os.getenv("CLAIM_HEARTBEAT_SECONDS", "30"))  # running jobs older than 4 beats are requeued
+    prewarm_downloader: bool = os.getenv("PREWARM_DOWNLOADER", "true").lower() == "true"
+
+    # Fragment download settings (HLS/DASH sources)
+    fragment_concurrency_max: int = int(os.getenv("FRAGMENT_CONCURRENCY_MAX", "8"))  # per job
+    fragment_concurrency: str = os.getenv("FRAGMENT_CONCURRENCY", "")  # per-extractor maximum, e.g. "youtube=8,vimeo=2"
+    download_bandwidth_mbps: float = float(os.getenv("DOWNLOAD_BANDWIDTH_MBPS", "0"))  # shared by all jobs; 0 is unlimited
+
+    # Retry and circuit breaker settings
+    download_max_attempts: int = int(os.getenv("DOWNLOAD_MAX_ATTEMPTS", "4"))
+    retry_base_seconds: float = float(os.getenv("RETRY_BASE_SECONDS", "30"))
+    retry_max_seconds: float = float(os.getenv("RETRY_MAX_SECONDS", "3600"))
+    circuit_failure_threshold: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    circuit_open_seconds: float = float(os.getenv("CIRCUIT_OPEN_SECONDS", "900"))
+
+    # Subscription settings
+    subscription_check_interval_seconds: int = int(os.getenv("SUBSCRIPTION_CHECK_INTERVAL_SECONDS", "3600"))
+    subscription_max_entries: int = int(os.getenv("SUBSCRIPTION_MAX_ENTRIES", "50"))  # newest entries listed per check
+
+    # Library indexer settings
+    library_scan_interval_seconds: int = int(os.getenv("LIBRARY_SCAN_INTERVAL_SECONDS", "900"))  # 0 disables periodic scans
+    library_scan_workers: int = int(os.getenv("LIBRARY_SCAN_WORKERS", "4"))
+    hash_workers: int = int(os.getenv("HASH_WORKERS", "1"))
     
+    # Rate limit settings
+    rate_limits: str = os.getenv(
+        "RATE_LIMITS",
+        "POST /auth/login=10/60,POST /auth/register=5/3600,POST /api/download=60/60,"
+        "POST /api/downloads/import=10/3600,GET /api/downloads/export=30/3600"
+    )  # "METHOD /path=requests/seconds", counted per client IP and per user
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()  # "memory" or "database" (shared by workers)
+    trusted_proxies: str = os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1")  # peers whose X-Real-IP is believed
+
+    # Logging settings
+    log_format: str = os.getenv("LOG_FORMAT", "json").lower()  # "json" or "text"
+    log_queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records beyond this are dropped, not waited on
+    ytdlp_log_sample_rate: float = float(os.getenv("YTDLP_LOG_SAMPLE_RATE", "0.05"))  # share of yt-dlp chatter kept
+
     # App settings
     app_name: str = "NAS Music Downloader"
     debug: bool = os.getenv("DEBUG", "false").lower() == "true"
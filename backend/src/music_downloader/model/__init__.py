@@ -2,7 +2,11 @@ from .db import Base, SessionLocal, engine, get_db, init_db
 from .user import User
 from .audit_log import AuditLog
 from .download_history import DownloadHistory
+from .download_stats import DownloadStatsDaily
 from .token_blacklist import TokenBlacklist
+from .library import LibraryDirectory, LibraryTrack
+from .subscription import Subscription, DownloadArchiveEntry
+from .rate_limit import RateLimitCounter
 
 __all__ = [
     "Base",
@@ -13,5 +17,11 @@ __all__ = [
     "User",
     "AuditLog",
     "DownloadHistory",
+    "DownloadStatsDaily",
     "TokenBlacklist",
+    "LibraryDirectory",
+    "LibraryTrack",
+    "Subscription",
+    "DownloadArchiveEntry",
+    "RateLimitCounter",
 ]
@@ -1,7 +1,9 @@
 # db.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, DateTime
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.sql.functions import FunctionElement
 from ..config.settings import settings
 import logging
 
@@ -32,6 +34,27 @@ def get_db() -> Session:
         db.close()
 
 
+class clock_now(FunctionElement):
+    """Time at which the statement runs; now() on PostgreSQL is the start of the transaction"""
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(clock_now)
+def _compile_clock_now(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(clock_now, "postgresql")
+def _compile_clock_now_postgresql(element, compiler, **kw):
+    return "clock_timestamp()"
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input matches literally (use with escape="\\")"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 def init_db():
     """Initialize database tables"""
     try:
@@ -1,8 +1,8 @@
 # download_history.py
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
-from .db import Base
+from .db import Base, clock_now
 
 
 class DownloadHistory(Base):
@@ -16,12 +16,22 @@ class DownloadHistory(Base):
     duration = Column(Float, nullable=True)  # Duration in seconds
     file_size = Column(Integer, nullable=True)  # File size in bytes
     file_path = Column(String(1000), nullable=True)  # Path to downloaded file
-    status = Column(String(50), nullable=False)  # "pending", "downloading", "completed", "failed"
+    status = Column(String(50), nullable=False)  # "pending", "downloading", "completed", "failed", "cancelled"
+    priority = Column(String(20), nullable=False, default="interactive", server_default="interactive")  # "interactive", "bulk"
     error_message = Column(Text, nullable=True)
+    error_class = Column(String(20), nullable=True)  # "transient", "rate_limited", "extractor", "permanent"
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
     download_started_at = Column(DateTime(timezone=True), nullable=True)
     download_completed_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # refreshed by the process running the download
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # statement time, not transaction start: the changes feed pages by it and must not see it go back in time
+    updated_at = Column(DateTime(timezone=True), server_default=clock_now(), onupdate=clock_now())
     
     # Relationship
     user = relationship("User", backref="download_history")
+
+    # Serves the per-user version token (count + max updated_at) as an index-only scan
+    __table_args__ = (
+        Index("ix_download_history_user_id_updated_at", "user_id", "updated_at"),
+    )
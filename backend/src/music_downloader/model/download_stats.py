@@ -0,0 +1,21 @@
+# download_stats.py
+from sqlalchemy import Column, Integer, BigInteger, Date, Float, ForeignKey, UniqueConstraint
+from .db import Base
+
+
+class DownloadStatsDaily(Base):
+    """Finished downloads per user and UTC day, maintained as jobs finish"""
+    __tablename__ = "download_stats_daily"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    downloads = Column(Integer, nullable=False, default=0, server_default="0")  # completed
+    failures = Column(Integer, nullable=False, default=0, server_default="0")  # failed for good, not retries
+    bytes = Column(BigInteger, nullable=False, default=0, server_default="0")
+    duration_seconds = Column(Float, nullable=False, default=0, server_default="0")
+
+    # Also the index for per-user date range reads
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", name="uq_download_stats_daily_user_day"),
+    )
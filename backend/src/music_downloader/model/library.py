@@ -0,0 +1,46 @@
+# library.py
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Float, Index
+from sqlalchemy.sql import func
+from .db import Base
+
+
+class LibraryDirectory(Base):
+    """Directory of the NAS collection with the mtime seen at its last listing"""
+    __tablename__ = "library_directories"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    path = Column(String(1000), unique=True, nullable=False, index=True)
+    mtime_ns = Column(BigInteger, nullable=False)
+    scanned_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class LibraryTrack(Base):
+    """Audio file found on the NAS, whether downloaded by the app or not"""
+    __tablename__ = "library_tracks"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    path = Column(String(1000), unique=True, nullable=False)
+    directory = Column(String(1000), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False)  # File size in bytes
+    mtime_ns = Column(BigInteger, nullable=False)
+    title = Column(String(500), nullable=True)
+    artist = Column(String(200), nullable=True)
+    album = Column(String(500), nullable=True)
+    duration = Column(Float, nullable=True)  # Duration in seconds
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the file bytes
+    loudness_lufs = Column(Float, nullable=True)  # EBU R128 integrated loudness
+    sample_peak = Column(Float, nullable=True)  # linear, 1.0 = full scale
+    loudness_analyzed_at = Column(DateTime(timezone=True), nullable=True)  # null until measured
+    indexed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Trigram indexes (pg_trgm) back substring search on title/artist
+    __table_args__ = (
+        Index(
+            "ix_library_tracks_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_library_tracks_artist_trgm", "artist",
+            postgresql_using="gin", postgresql_ops={"artist": "gin_trgm_ops"},
+        ),
+    )
@@ -0,0 +1,12 @@
+# rate_limit.py
+from sqlalchemy import Column, Integer, BigInteger, String
+from .db import Base
+
+
+class RateLimitCounter(Base):
+    """Requests per limited key and fixed window, shared by all backend processes"""
+    __tablename__ = "rate_limit_counters"
+
+    key = Column(String(300), primary_key=True)  # "<route>|ip:<address>" or "<route>|user:<username>"
+    window_start = Column(BigInteger, primary_key=True)  # unix seconds, a multiple of the window length
+    count = Column(Integer, nullable=False, default=0, server_default="0")
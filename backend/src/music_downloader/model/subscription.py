@@ -0,0 +1,43 @@
+# subscription.py
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from .db import Base
+
+
+class Subscription(Base):
+    """Channel or playlist checked periodically for new uploads"""
+    __tablename__ = "subscriptions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    url = Column(String(2048), nullable=False)
+    title = Column(String(500), nullable=True)
+    priority = Column(String(20), nullable=False, default="bulk", server_default="bulk")
+    backfill = Column(Boolean, nullable=False, default=False, server_default="false")  # queue existing entries on first check
+    next_check_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+    last_checked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "url", name="uq_subscriptions_user_id_url"),
+    )
+
+
+class DownloadArchiveEntry(Base):
+    """Media already queued for a user, like yt-dlp's download_archive file"""
+    __tablename__ = "download_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    extractor = Column(String(50), nullable=False)  # yt-dlp extractor key, lower-cased
+    media_id = Column(String(200), nullable=False)  # id within the extractor
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id", ondelete="SET NULL"), nullable=True)
+    download_id = Column(Integer, ForeignKey("download_history.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Also the lookup index for "which of these ids are new?"
+    __table_args__ = (
+        UniqueConstraint("user_id", "extractor", "media_id", name="uq_download_archive_user_media"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean
 from sqlalchemy.sql import func
 from .db import Base
 from sqlalchemy.orm import relationship
@@ -12,6 +12,8 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    storage_used_bytes = Column(BigInteger, nullable=False, default=0, server_default="0")  # kept current as downloads finish
+    storage_quota_bytes = Column(BigInteger, nullable=True)  # null uses the default quota, 0 is unlimited
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
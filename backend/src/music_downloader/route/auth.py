@@ -3,16 +3,21 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import logging
+import re
 
 from ..model import get_db, User, AuditLog, TokenBlacklist
-from ..schema.auth import UserCreate, UserResponse, UserLogin, Token
-from ..auth import verify_password, get_password_hash, create_access_token, get_current_user
+from ..schema.auth import UserCreate, UserResponse, UserLogin, Token, MediaTokenRequest, MediaTokenResponse
+from ..auth import verify_password, get_password_hash, create_access_token, create_media_token, get_current_user
+from ..config.settings import settings
 from ..service.audit import log_user_action
 
 logger = logging.getLogger(__name__)
 
 auth_router = APIRouter(prefix="/auth", tags=["authentication"])
 
+# Routes a media token may open: the ones clients fetch through <audio src> or a plain link
+MEDIA_PATH_PATTERN = re.compile(r"/api/downloads/(\d+/file|archive|export)")
+
 @auth_router.post("/register", response_model=UserResponse)
 async def register_user(
     user_data: UserCreate,
@@ -144,6 +149,7 @@ async def logout_user(
         user_id=current_user.id,
         expires_at=datetime.fromtimestamp(exp)
     ))
+    # committing the entry evicts the token from every process's auth cache
     db.commit()
 
     await log_user_action(
@@ -164,3 +170,17 @@ async def logout_user(
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
     return current_user
+
+
+@auth_router.post("/media-token", response_model=MediaTokenResponse)
+async def issue_media_token(body: MediaTokenRequest, current_user: User = Depends(get_current_user)):
+    """Sign a short-lived URL for one media path, for clients that cannot send an Authorization header"""
+    if not MEDIA_PATH_PATTERN.fullmatch(body.path):
+        raise HTTPException(status_code=400, detail="Media tokens are only issued for file, archive and export URLs")
+    expires_delta = timedelta(seconds=settings.media_token_expire_seconds)
+    media_token = create_media_token(current_user.username, body.path, expires_delta)
+    return {
+        "media_token": media_token,
+        "url": f"{body.path}?media_token={media_token}",
+        "expires_at": datetime.utcnow() + expires_delta,
+    }
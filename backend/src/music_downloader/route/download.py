@@ -1,174 +1,469 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
-import os
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Response, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, Query as OrmQuery
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote
+import base64
+import binascii
+import hashlib
 import logging
 
+from ..model.db import escape_like
 from ..model import get_db, User, DownloadHistory
-from ..schema.download import DownloadRequest, DownloadResponse, DownloadHistoryResponse
-from ..auth import get_current_active_user
-from ..service.yt_music import MusicDownloader
-from ..service.audit import log_download_action
+from ..schema.download import (
+    DownloadRequest,
+    DownloadResponse,
+    DownloadHistoryResponse,
+    DownloadChangesResponse,
+    DownloadCancelRequest,
+    DownloadCancelResponse,
+    DownloadImportResponse,
+    DownloadHistoryFilter,
+    DownloadPriority,
+    ArchiveFormat,
+    ExportFormat,
+)
+from ..auth import get_current_active_user, get_current_media_user
+from ..service.scheduler import download_scheduler, DownloadJob
+from ..service.health import shed_load
+from ..service.storage import over_quota, quota_bytes, MB
+from ..service.imports import import_urls
+from ..service.events import event_bus, DOWNLOAD_STATUS
+from ..service.audit import log_download_action, log_user_action
+from ..service.archive import stream_zip, stream_tar, unique_entries, iterate_in_threadpool_closing
+from ..service.export import stream_rows, encode_csv, encode_ndjson
+from .responses import FastJSONResponse, response_columns, response_rows
 from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
 
 download_router = APIRouter(prefix="/api", tags=["downloads"])
 
-@download_router.post("/download", response_model=DownloadResponse)
+
+def _filter_history(query: OrmQuery, filters: DownloadHistoryFilter) -> OrmQuery:
+    """Apply the shared history filters to a DownloadHistory query"""
+    if filters.status:
+        query = query.filter(DownloadHistory.status == filters.status)
+    if filters.artist:
+        query = query.filter(DownloadHistory.artist == filters.artist)
+    if filters.q:
+        pattern = f"%{escape_like(filters.q)}%"
+        query = query.filter(or_(
+            DownloadHistory.title.ilike(pattern, escape="\\"),
+            DownloadHistory.artist.ilike(pattern, escape="\\")
+        ))
+    if filters.created_from:
+        query = query.filter(DownloadHistory.created_at >= filters.created_from)
+    if filters.created_to:
+        query = query.filter(DownloadHistory.created_at < filters.created_to)
+    return query
+
+
+def _attach_queue_info(download: DownloadHistory) -> None:
+    """Expose the scheduler's queue position and start estimate on a pending record"""
+    info = download_scheduler.queue_info(download.id) if download.status == "pending" else None
+    download.queue_position, download.estimated_start_at = info or (None, None)
+
+
+# Statuses a download can still be cancelled in
+CANCELLABLE_STATUSES = ("pending", "downloading")
+
+
+def _cancel_downloads(db: Session, user_id: int, download_ids: List[int]) -> List[int]:
+    """Mark the user's unfinished downloads cancelled and signal their jobs; returns the ids cancelled"""
+    ids = [row.id for row in db.query(DownloadHistory.id).filter(
+        DownloadHistory.id.in_(download_ids),
+        DownloadHistory.user_id == user_id,
+        DownloadHistory.status.in_(CANCELLABLE_STATUSES)
+    )]
+    if not ids:
+        return []
+    db.query(DownloadHistory).filter(
+        DownloadHistory.id.in_(ids),
+        DownloadHistory.status.in_(CANCELLABLE_STATUSES)
+    ).update(
+        {"status": "cancelled", "download_completed_at": datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.commit()
+    # a job may have finished between the two statements
+    ids = [row.id for row in db.query(DownloadHistory.id).filter(
+        DownloadHistory.id.in_(ids),
+        DownloadHistory.status == "cancelled"
+    ).order_by(DownloadHistory.id)]
+    for download_id in ids:
+        # reaches the scheduler of whichever process queued or runs the job
+        event_bus.publish(DOWNLOAD_STATUS, id=download_id, user_id=user_id, status="cancelled")
+    return ids
+
+
+def _resolve_output_path(file_path: Optional[str]) -> Optional[Path]:
+    """Return the file's resolved path if it is a regular file inside the output directory"""
+    if not file_path:
+        return None
+    output_dir = Path(settings.output_directory).resolve()
+    path = Path(file_path).resolve()
+    if not path.is_relative_to(output_dir) or not path.is_file():
+        return None
+    return path
+
+
+# Clients must revalidate every time, but a matching ETag costs one index-only query
+HISTORY_CACHE_CONTROL = "private, no-cache"
+# List endpoints select just these instead of whole entities
+DOWNLOAD_RESPONSE_COLUMNS = response_columns(DownloadHistory, DownloadResponse)
+
+
+def _weak_etag(*parts) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def _is_not_modified(request: Request, etag: str, last_modified: Optional[str] = None) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against the current validators"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag.removeprefix("W/") in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _history_version(db: Session, user_id: int):
+    """Per-user version token: row count and latest update, without loading any rows"""
+    return db.query(
+        func.count(DownloadHistory.id), func.max(DownloadHistory.updated_at)
+    ).filter(DownloadHistory.user_id == user_id).one()
+
+
+def _not_modified_response(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": HISTORY_CACHE_CONTROL}
+    )
+
+
+# Changes younger than this are held back: updated_at is stamped when the statement runs
+# (clock_timestamp()), and a transaction may still commit such a row a moment later,
+# after a cursor has moved past it. Writers keep these transactions short; the
+# scheduler holds none open during a transfer.
+CHANGES_SETTLE_SECONDS = 2
+
+
+def _encode_cursor(updated_at: datetime, download_id: int) -> str:
+    raw = f"{updated_at.isoformat()}|{download_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        updated_at, download_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(updated_at), int(download_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+@download_router.post("/download", response_model=DownloadResponse, dependencies=[Depends(shed_load)])
 async def download_music(
     request: DownloadRequest,
     http_request: Request,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Download music from URL"""
+    """Queue a music download from URL"""
     url = request.url
     
+    if download_scheduler.queued_count(current_user.id) >= settings.max_queued_jobs_per_user:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many queued downloads (limit {settings.max_queued_jobs_per_user})"
+        )
+    if over_quota(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=f"Storage quota of {quota_bytes(current_user) // MB} MB used up"
+        )
+    
     # Create download history record
     download_record = DownloadHistory(
         user_id=current_user.id,
         url=url,
-        status="pending"
+        status="pending",
+        priority=request.priority
     )
     db.add(download_record)
     db.commit()
     db.refresh(download_record)
     
-    # Log download start
+    # Log download queued
     await log_download_action(
         db=db,
         user_id=current_user.id,
-        action="download_started",
+        action="download_queued",
         url=url,
-        details={"download_id": download_record.id},
+        details={"download_id": download_record.id, "priority": request.priority},
         ip_address=http_request.client.host,
         user_agent=http_request.headers.get("user-agent"),
         status="success"
     )
     
-    try:
-        # Update status to downloading
-        download_record.status = "downloading"
-        download_record.download_started_at = datetime.utcnow()
-        db.commit()
-        
-        # Download music using MusicDownloader
-        downloader = MusicDownloader(output_dir=settings.output_directory)
-        download_result = downloader.download_audio(url=url)
-        
-        if download_result.success:
-            # Update download record with success
-            download_record.status = "completed"
-            download_record.title = download_result.title
-            download_record.file_path = download_result.file_path
-            download_record.artist = download_result.artist
-            download_record.duration = download_result.duration
-            download_record.download_completed_at = datetime.utcnow()
-            
-            # Get file size if file exists
-            if os.path.exists(download_result.file_path):
-                download_record.file_size = os.path.getsize(download_result.file_path)
-            
-            db.commit()
-            
-            await log_download_action(
-                db=db,
-                user_id=current_user.id,
-                action="download_completed",
-                url=url,
-                details={
-                    "download_id": download_record.id,
-                    "file_path": download_result.file_path,
-                    "title": download_record.title
-                },
-                ip_address=http_request.client.host,
-                user_agent=http_request.headers.get("user-agent"),
-                status="success"
-            )
-            
-            logger.info(f"Download completed for user {current_user.username}: {url}")
-        else:
-            # Update download record with failure
-            download_record.status = "failed"
-            download_record.error_message = "Download failed"
-            download_record.download_completed_at = datetime.utcnow()
-            db.commit()
-            
-            await log_download_action(
-                db=db,
-                user_id=current_user.id,
-                action="download_failed",
-                url=url,
-                details={"download_id": download_record.id, "error": "Download failed"},
-                ip_address=http_request.client.host,
-                user_agent=http_request.headers.get("user-agent"),
-                status="failed"
-            )
-            
-            logger.warning(f"Download failed for user {current_user.username}: {url}")
-
-        return download_record
-            
-    except Exception as e:
-        # Update download record with error
-        download_record.status = "failed"
-        download_record.error_message = str(e)
-        download_record.download_completed_at = datetime.utcnow()
-        db.commit()
-        
-        await log_download_action(
-            db=db,
-            user_id=current_user.id,
-            action="download_failed",
-            url=url,
-            details={"download_id": download_record.id, "error": str(e)},
-            ip_address=http_request.client.host,
-            user_agent=http_request.headers.get("user-agent"),
-            status="failed"
-        )
-        
-        logger.error(f"Download error for user {current_user.username}: {url} - {e}")
+    download_scheduler.submit(DownloadJob(
+        id=download_record.id,
+        user_id=current_user.id,
+        url=url,
+        priority=request.priority,
+        ip_address=http_request.client.host,
+        user_agent=http_request.headers.get("user-agent")
+    ))
+    event_bus.publish(DOWNLOAD_STATUS, id=download_record.id, user_id=current_user.id, status="pending")
+    logger.info(f"Download queued for user {current_user.username}: {url}")
+    
+    _attach_queue_info(download_record)
+    return download_record
+
+
+@download_router.post(
+    "/downloads/import", response_model=DownloadImportResponse, dependencies=[Depends(shed_load)]
+)
+async def import_downloads(
+    http_request: Request,
+    file: UploadFile = File(..., description="Text file with one URL per line, or a CSV with a URL column"),
+    priority: DownloadPriority = Form("bulk"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Queue every new URL of an uploaded list; duplicates of earlier downloads are skipped"""
+    if over_quota(current_user):
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Download failed: {str(e)}"
+            status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+            detail=f"Storage quota of {quota_bytes(current_user) // MB} MB used up"
         )
+    room = max(0, settings.max_queued_jobs_per_user - download_scheduler.queued_count(current_user.id))
+    # parsing and inserting a long list blocks; keep it off the event loop
+    summary = await run_in_threadpool(import_urls, db, current_user.id, file.file, priority, room)
+
+    await log_user_action(
+        db=db,
+        user_id=current_user.id,
+        action="downloads_imported",
+        resource_type="download",
+        details=(
+            f"{file.filename}: {summary.queued} queued, {summary.duplicate} duplicate, "
+            f"{summary.invalid} invalid, {summary.over_limit} over limit"
+        ),
+        ip_address=http_request.client.host,
+        user_agent=http_request.headers.get("user-agent"),
+        status="success"
+    )
+    return summary
 
 
-@download_router.get("/downloads", response_model=DownloadHistoryResponse)
+@download_router.get("/downloads", response_model=DownloadHistoryResponse, response_class=FastJSONResponse)
 async def get_download_history(
+    http_request: Request,
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
+    filters: DownloadHistoryFilter = Depends(),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get user's download history with pagination"""
+    row_count, last_updated = _history_version(db, current_user.id)
+    etag = _weak_etag(
+        current_user.id, row_count, last_updated, page, per_page, filters.model_dump_json()
+    )
+    if _is_not_modified(http_request, etag):
+        return _not_modified_response(etag)
+
     offset = (page - 1) * per_page
     
-    downloads = db.query(DownloadHistory).filter(
-        DownloadHistory.user_id == current_user.id
-    ).order_by(DownloadHistory.created_at.desc()).offset(offset).limit(per_page).all()
+    history = _filter_history(
+        db.query(*DOWNLOAD_RESPONSE_COLUMNS).filter(DownloadHistory.user_id == current_user.id),
+        filters
+    )
+    rows = history.order_by(DownloadHistory.created_at.desc()).offset(offset).limit(per_page).all()
     
-    total = db.query(DownloadHistory).filter(
-        DownloadHistory.user_id == current_user.id
-    ).count()
+    # Unfiltered, the version query already counted the user's rows
+    filtered = any(value is not None for value in filters.model_dump().values())
+    total = history.count() if filtered else row_count
+    
+    return FastJSONResponse(
+        {
+            "downloads": response_rows(rows, DownloadResponse),
+            "total": total,
+            "page": page,
+            "per_page": per_page
+        },
+        headers={"ETag": etag, "Cache-Control": HISTORY_CACHE_CONTROL}
+    )
+
+
+@download_router.get("/downloads/changes", response_model=DownloadChangesResponse, response_class=FastJSONResponse)
+async def get_download_changes(
+    since: Optional[str] = Query(None, description="Cursor from a previous response; omit for a full sync"),
+    limit: int = Query(100, ge=1, le=500),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Download records created or updated after `since`, oldest change first"""
+    settled_before = datetime.now(timezone.utc) - timedelta(seconds=CHANGES_SETTLE_SECONDS)
+    # keyset over the (user_id, updated_at) index, with the id breaking timestamp ties
+    changes = db.query(*DOWNLOAD_RESPONSE_COLUMNS).filter(
+        DownloadHistory.user_id == current_user.id,
+        DownloadHistory.updated_at < settled_before
+    )
+    if since:
+        updated_at, download_id = _decode_cursor(since)
+        changes = changes.filter(or_(
+            DownloadHistory.updated_at > updated_at,
+            (DownloadHistory.updated_at == updated_at) & (DownloadHistory.id > download_id)
+        ))
+    rows = changes.order_by(DownloadHistory.updated_at, DownloadHistory.id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    downloads = response_rows(rows, DownloadResponse)
+    for download in downloads:
+        if download["status"] == "pending":
+            info = download_scheduler.queue_info(download["id"])
+            download["queue_position"], download["estimated_start_at"] = info or (None, None)
+
+    if rows:
+        cursor = _encode_cursor(rows[-1].updated_at, rows[-1].id)
+    else:
+        cursor = since or _encode_cursor(datetime.fromtimestamp(0, timezone.utc), 0)
+
+    return FastJSONResponse({"downloads": downloads, "cursor": cursor, "has_more": has_more})
+
+
+@download_router.get("/downloads/archive")
+async def download_archive(
+    http_request: Request,
+    ids: Optional[List[int]] = Query(None, description="Download ids; when omitted the history filters select the files"),
+    format: ArchiveFormat = Query("zip"),
+    filters: DownloadHistoryFilter = Depends(),
+    current_user: User = Depends(get_current_media_user),
+    db: Session = Depends(get_db)
+):
+    """Stream a ZIP or tar of completed downloads, built on the fly"""
+    query = db.query(DownloadHistory.file_path).filter(
+        DownloadHistory.user_id == current_user.id,
+        DownloadHistory.status == "completed",
+        DownloadHistory.file_path.isnot(None)
+    )
+    if ids:
+        query = query.filter(DownloadHistory.id.in_(ids))
+    else:
+        query = _filter_history(query, filters)
+    
+    paths = [str(path) for (file_path,) in query.order_by(DownloadHistory.created_at).all()
+             if (path := _resolve_output_path(file_path)) is not None]
+    if not paths:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No downloaded files match"
+        )
+    
+    await log_user_action(
+        db=db,
+        user_id=current_user.id,
+        action="archive_export",
+        resource_type="download",
+        details=f"{format} archive of {len(paths)} files",
+        ip_address=http_request.client.host,
+        user_agent=http_request.headers.get("user-agent"),
+        status="success"
+    )
     
-    return DownloadHistoryResponse(
-        downloads=downloads,
-        total=total,
-        page=page,
-        per_page=per_page
+    entries = unique_entries(paths)
+    chunks = stream_zip(entries) if format == "zip" else stream_tar(entries)
+    filename = f"downloads_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        iterate_in_threadpool_closing(chunks),
+        media_type="application/zip" if format == "zip" else "application/x-tar",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+@download_router.get("/downloads/export")
+async def export_download_history(
+    http_request: Request,
+    format: ExportFormat = Query("csv"),
+    filters: DownloadHistoryFilter = Depends(),
+    current_user: User = Depends(get_current_media_user),
+    db: Session = Depends(get_db)
+):
+    """Stream the user's whole download history, filtered like the history listing, as CSV or NDJSON"""
+    history = _filter_history(
+        db.query(*DOWNLOAD_RESPONSE_COLUMNS).filter(DownloadHistory.user_id == current_user.id),
+        filters
+    ).order_by(DownloadHistory.created_at.desc(), DownloadHistory.id.desc())
+
+    await log_user_action(
+        db=db,
+        user_id=current_user.id,
+        action="history_export",
+        resource_type="download",
+        details=f"{format} export",
+        ip_address=http_request.client.host,
+        user_agent=http_request.headers.get("user-agent"),
+        status="success"
+    )
+
+    # the request's session is closed before the body is sent; rows stream through a session of their own
+    batches = stream_rows(partial(Session, bind=db.get_bind()), history.statement)
+    if format == "csv":
+        chunks = encode_csv([column.key for column in DOWNLOAD_RESPONSE_COLUMNS], batches)
+    else:
+        chunks = encode_ndjson(batches)
+    filename = f"downloads_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        iterate_in_threadpool_closing(chunks),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
 
 
 @download_router.get("/downloads/{download_id}", response_model=DownloadResponse)
 async def get_download_by_id(
     download_id: int,
+    http_request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get specific download by ID"""
+    version = db.query(DownloadHistory.updated_at, DownloadHistory.status).filter(
+        DownloadHistory.id == download_id,
+        DownloadHistory.user_id == current_user.id
+    ).first()
+    if version is not None:
+        # a pending job moves up the queue without its row changing
+        info = download_scheduler.queue_info(download_id) if version.status == "pending" else None
+        etag = _weak_etag(download_id, version.updated_at, version.status, info[0] if info else None)
+        if _is_not_modified(http_request, etag):
+            return _not_modified_response(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = HISTORY_CACHE_CONTROL
+
     download = db.query(DownloadHistory).filter(
         DownloadHistory.id == download_id,
         DownloadHistory.user_id == current_user.id
@@ -180,4 +475,126 @@ async def get_download_by_id(
             detail="Download not found"
         )
     
-    return download
\ No newline at end of file
+    _attach_queue_info(download)
+    return download
+
+
+@download_router.delete("/downloads/{download_id}", response_model=DownloadResponse)
+async def cancel_download(
+    download_id: int,
+    http_request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Cancel a queued or running download; a running job stops and frees its worker within about a second"""
+    download = db.query(DownloadHistory).filter(
+        DownloadHistory.id == download_id,
+        DownloadHistory.user_id == current_user.id
+    ).first()
+    if not download:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Download not found"
+        )
+    if not _cancel_downloads(db, current_user.id, [download_id]):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Download has already finished"
+        )
+
+    await log_download_action(
+        db=db,
+        user_id=current_user.id,
+        action="download_cancelled",
+        url=download.url,
+        details={"download_id": download_id},
+        ip_address=http_request.client.host,
+        user_agent=http_request.headers.get("user-agent"),
+        status="success"
+    )
+    db.refresh(download)
+    return download
+
+
+@download_router.post("/downloads/cancel", response_model=DownloadCancelResponse)
+async def cancel_downloads(
+    request: DownloadCancelRequest,
+    http_request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Cancel several downloads at once; ids that are unknown or already finished are skipped"""
+    cancelled = _cancel_downloads(db, current_user.id, request.ids)
+    if cancelled:
+        await log_user_action(
+            db=db,
+            user_id=current_user.id,
+            action="downloads_cancelled",
+            resource_type="download",
+            details=",".join(str(download_id) for download_id in cancelled),
+            ip_address=http_request.client.host,
+            user_agent=http_request.headers.get("user-agent"),
+            status="success"
+        )
+    return DownloadCancelResponse(cancelled=cancelled)
+
+
+@download_router.api_route("/downloads/{download_id}/file", methods=["GET", "HEAD"])
+async def get_download_file(
+    download_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_media_user),
+    db: Session = Depends(get_db)
+):
+    """Stream a downloaded track with Range and conditional request support"""
+    download = db.query(DownloadHistory).filter(
+        DownloadHistory.id == download_id,
+        DownloadHistory.user_id == current_user.id
+    ).first()
+    
+    if not download or download.status != "completed" or not download.file_path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Download not found"
+        )
+    
+    # Never serve anything outside the output directory, whatever the DB says
+    file_path = _resolve_output_path(download.file_path)
+    try:
+        stat_result = file_path.stat() if file_path else None
+    except OSError:
+        stat_result = None
+    if stat_result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File no longer exists"
+        )
+    
+    # FileResponse streams in chunks and handles Range/If-Range; it only adds 304 handling on top
+    response = FileResponse(
+        file_path,
+        stat_result=stat_result,
+        filename=file_path.name,
+        content_disposition_type="inline",
+        headers={"Cache-Control": "private, no-cache"}
+    )
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+    if _is_not_modified(request, etag, last_modified):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "private, no-cache"}
+        )
+    
+    if settings.x_accel_redirect_prefix:
+        # Nginx serves the bytes with sendfile, including Range and its own validators
+        relative = file_path.relative_to(Path(settings.output_directory).resolve()).as_posix()
+        return Response(
+            headers={
+                "X-Accel-Redirect": f"{settings.x_accel_redirect_prefix.rstrip('/')}/{quote(relative)}",
+                "Content-Disposition": response.headers["content-disposition"],
+                "Cache-Control": "private, no-cache",
+            }
+        )
+    
+    return response
@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+import logging
+
+from ..model.db import escape_like
+from ..model import get_db, User, LibraryTrack
+from ..schema.library import (
+    LibraryTrackResponse,
+    LibrarySearchResponse,
+    LibraryScanStatus,
+    DuplicateGroup,
+    DuplicateReport,
+    DedupResult,
+    DedupMode,
+    CleanupReport,
+)
+from ..auth import get_current_active_user, get_admin_user
+from ..service.library import library_indexer
+from ..service.content_hash import find_duplicates, deduplicate
+from ..service.janitor import workspace_janitor
+from .responses import FastJSONResponse, response_columns, response_rows
+
+logger = logging.getLogger(__name__)
+
+library_router = APIRouter(prefix="/api/library", tags=["library"])
+
+LIBRARY_TRACK_COLUMNS = response_columns(LibraryTrack, LibraryTrackResponse)
+
+
+@library_router.get("/search", response_model=LibrarySearchResponse, response_class=FastJSONResponse)
+async def search_library(
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Search the indexed NAS collection by title or artist"""
+    pattern = f"%{escape_like(q)}%"
+    # ILIKE '%q%' is served by the pg_trgm GIN indexes; similarity only ranks the matches
+    relevance = func.greatest(
+        func.similarity(LibraryTrack.title, q),
+        func.similarity(LibraryTrack.artist, q)
+    )
+    rows = db.query(*LIBRARY_TRACK_COLUMNS).filter(
+        or_(
+            LibraryTrack.title.ilike(pattern, escape="\\"),
+            LibraryTrack.artist.ilike(pattern, escape="\\")
+        )
+    ).order_by(relevance.desc(), LibraryTrack.id).offset(offset).limit(limit).all()
+
+    return FastJSONResponse({
+        "tracks": response_rows(rows, LibraryTrackResponse),
+        "query": q,
+        "limit": limit,
+        "offset": offset
+    })
+
+
+@library_router.post("/rescan", status_code=status.HTTP_202_ACCEPTED)
+async def rescan_library(admin_user: User = Depends(get_admin_user)):
+    """Trigger an incremental library scan in the background"""
+    library_indexer.request_scan()
+    logger.info(f"Library rescan requested by {admin_user.username}")
+    return {"message": "Library scan scheduled"}
+
+
+@library_router.get("/status", response_model=LibraryScanStatus)
+async def get_library_status(admin_user: User = Depends(get_admin_user)):
+    """Get statistics of the last completed library scan"""
+    if library_indexer.last_stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No library scan has completed yet"
+        )
+    return library_indexer.last_stats.to_dict()
+
+
+@library_router.get("/duplicates", response_model=DuplicateReport)
+async def get_duplicate_report(
+    limit: int = Query(100, ge=1, le=1000),
+    admin_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """List groups of byte-identical tracks and the space linking them would reclaim"""
+    groups = [
+        DuplicateGroup(
+            content_hash=content_hash,
+            size=tracks[0].size,
+            paths=[track.path for track in tracks],
+            reclaimable_bytes=tracks[0].size * (len(tracks) - 1)
+        )
+        for content_hash, tracks in find_duplicates(db, limit=limit).items()
+    ]
+    return DuplicateReport(groups=groups, reclaimable_bytes=sum(g.reclaimable_bytes for g in groups))
+
+
+@library_router.post("/dedup", response_model=DedupResult)
+async def deduplicate_library(
+    mode: DedupMode = Query("hardlink"),
+    dry_run: bool = Query(True),
+    admin_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Replace duplicate copies by hardlinks or reflinks to one copy"""
+    # hashes, stats and links across the whole library: keep it off the event loop
+    result = await run_in_threadpool(deduplicate, db, mode=mode, dry_run=dry_run)
+    logger.info(f"Library dedup ({mode}, dry_run={dry_run}) by {admin_user.username}: "
+                f"{result.files_linked} files, {result.bytes_reclaimed} bytes")
+    return result.to_dict()
+
+
+@library_router.post("/cleanup", response_model=CleanupReport)
+async def cleanup_workspaces(admin_user: User = Depends(get_admin_user)):
+    """Remove abandoned download workspaces and partial files now and report the space reclaimed"""
+    # rmtree over the job workspaces blocks; keep it off the event loop
+    report = await run_in_threadpool(workspace_janitor.sweep)
+    logger.info(f"Workspace cleanup by {admin_user.username}: {report.bytes_reclaimed} bytes reclaimed")
+    return report.to_dict()
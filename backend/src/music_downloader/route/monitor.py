@@ -1,12 +1,23 @@
 from datetime import datetime
+from typing import Dict
 
 from fastapi import APIRouter, Response, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
+from ..service.health import health_checker
+
 monitor_router = APIRouter()
 
+class CheckStatus(BaseModel):
+    ok: bool
+    detail: str
+    duration_ms: float
+
 class ReadinessResponse(BaseModel):
     utc_dt: datetime
+    ready: bool
+    checks: Dict[str, CheckStatus]
 
 class LivenessResponse(BaseModel):
     status: str
@@ -14,21 +25,23 @@ class LivenessResponse(BaseModel):
 @monitor_router.get(
     "/readiness", 
     summary="Readiness Probe",
-    response_model=ReadinessResponse
+    response_model=ReadinessResponse,
+    responses={503: {"model": ReadinessResponse, "description": "A readiness check failed"}}
 )
 async def readiness_probe(response: Response):
     """
     Readiness probe endpoint to check if the service is ready.
+    Checks the database, output directory, free disk space, ffmpeg and queue depth
+    (cached for a few seconds, each check time-bounded).
     Returns 200 OK if ready, otherwise 503 Service Unavailable.
     """
-    try:
-        # Here you can add checks to ensure the service is ready
-        # For simplicity, we'll assume it's always ready
-        response.status_code = 200
-    except Exception:
-        raise HTTPException(status_code=503, detail="Service not ready")
-
-    return ReadinessResponse(utc_dt=datetime.utcnow())
+    report = await run_in_threadpool(health_checker.report)
+    response.status_code = 200 if report.ready else 503
+    return ReadinessResponse(
+        utc_dt=datetime.utcnow(),
+        ready=report.ready,
+        checks={name: CheckStatus(**vars(result)) for name, result in report.checks.items()}
+    )
 
 @monitor_router.get(
     "/liveness",
@@ -0,0 +1,28 @@
+from typing import Any, Iterable, List, Type
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-backed JSON response; UTC datetimes end in "Z", as pydantic writes them"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+
+def response_columns(model, schema: Type[BaseModel]) -> list:
+    """Columns of `model` backing the fields of a from_attributes response schema"""
+    columns = model.__table__.columns
+    return [getattr(model, name) for name in schema.model_fields if name in columns]
+
+
+def response_rows(rows: Iterable, schema: Type[BaseModel]) -> List[dict]:
+    """Rows of a response_columns() query as plain dicts shaped like `schema`.
+
+    Skips building ORM entities and validating each one; fields without a
+    column keep their schema default.
+    """
+    defaults = {name: field.default for name, field in schema.model_fields.items()}
+    return [{**defaults, **row._asdict()} for row in rows]
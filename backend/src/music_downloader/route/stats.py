@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+
+from ..model import get_db, User
+from ..schema.stats import StatsResponse, AdminStatsResponse
+from ..auth import get_current_active_user, get_admin_user
+from ..service.stats import daily_stats, user_totals
+
+stats_router = APIRouter(prefix="/api/stats", tags=["stats"])
+
+
+def _since(days: int):
+    return datetime.utcnow().date() - timedelta(days=days - 1)
+
+
+@stats_router.get("", response_model=StatsResponse)
+async def get_my_stats(
+    days: int = Query(30, ge=1, le=366, description="Number of UTC days to include, today included"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Downloads, bytes, duration and failures of the current user per day"""
+    return daily_stats(db, _since(days), user_id=current_user.id)
+
+
+@stats_router.get("/all", response_model=AdminStatsResponse)
+async def get_all_stats(
+    days: int = Query(30, ge=1, le=366, description="Number of UTC days to include, today included"),
+    admin_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Download statistics across all users, per day and per user"""
+    since = _since(days)
+    return {**daily_stats(db, since), "users": user_totals(db, since)}
@@ -0,0 +1,119 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from typing import List
+import logging
+
+from ..model import get_db, User, Subscription
+from ..schema.subscription import SubscriptionCreate, SubscriptionResponse
+from ..auth import get_current_active_user
+from ..service.audit import log_user_action
+from ..service.subscriptions import subscription_checker
+
+logger = logging.getLogger(__name__)
+
+subscription_router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
+
+
+def _get_owned_subscription(db: Session, subscription_id: int, user: User) -> Subscription:
+    subscription = db.query(Subscription).filter(
+        Subscription.id == subscription_id,
+        Subscription.user_id == user.id
+    ).first()
+    if not subscription:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Subscription not found"
+        )
+    return subscription
+
+
+@subscription_router.get("", response_model=List[SubscriptionResponse])
+async def list_subscriptions(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """List the user's channel and playlist subscriptions"""
+    return db.query(Subscription).filter(
+        Subscription.user_id == current_user.id
+    ).order_by(Subscription.created_at).all()
+
+
+@subscription_router.post("", response_model=SubscriptionResponse, status_code=status.HTTP_201_CREATED)
+async def create_subscription(
+    request: SubscriptionCreate,
+    http_request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Subscribe to a channel or playlist; it is checked right away and then periodically"""
+    subscription = Subscription(
+        user_id=current_user.id,
+        url=request.url,
+        priority=request.priority,
+        backfill=request.backfill
+    )
+    db.add(subscription)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Already subscribed to this URL"
+        )
+    db.refresh(subscription)
+
+    await log_user_action(
+        db=db,
+        user_id=current_user.id,
+        action="subscription_created",
+        resource_type="subscription",
+        resource_id=str(subscription.id),
+        details=request.url,
+        ip_address=http_request.client.host,
+        user_agent=http_request.headers.get("user-agent"),
+        status="success"
+    )
+    subscription_checker.request_check()
+    return subscription
+
+
+@subscription_router.post("/{subscription_id}/check", status_code=status.HTTP_202_ACCEPTED)
+async def check_subscription(
+    subscription_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Check a subscription for new entries now instead of at its next scheduled time"""
+    subscription = _get_owned_subscription(db, subscription_id, current_user)
+    subscription.next_check_at = func.now()
+    db.commit()
+    subscription_checker.request_check()
+    return {"message": "Subscription check scheduled"}
+
+
+@subscription_router.delete("/{subscription_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_subscription(
+    subscription_id: int,
+    http_request: Request,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Unsubscribe; already queued downloads and the archive are kept"""
+    subscription = _get_owned_subscription(db, subscription_id, current_user)
+    db.delete(subscription)
+    db.commit()
+
+    await log_user_action(
+        db=db,
+        user_id=current_user.id,
+        action="subscription_deleted",
+        resource_type="subscription",
+        resource_id=str(subscription_id),
+        ip_address=http_request.client.host,
+        user_agent=http_request.headers.get("user-agent"),
+        status="success"
+    )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
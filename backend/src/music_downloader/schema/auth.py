@@ -15,6 +15,7 @@ class UserResponse(UserBase):
     is_admin: bool
     created_at: datetime
     last_login: Optional[datetime] = None
+    storage_used_bytes: int = 0
     
     class Config:
         from_attributes = True
@@ -27,5 +28,13 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+class MediaTokenRequest(BaseModel):
+    path: str
+
+class MediaTokenResponse(BaseModel):
+    media_token: str
+    url: str
+    expires_at: datetime
+
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -1,9 +1,12 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional, Literal
 from datetime import datetime
 
+DownloadPriority = Literal["interactive", "bulk"]
+
 class DownloadRequest(BaseModel):
     url: str
+    priority: DownloadPriority = "interactive"
 
 class DownloadResponse(BaseModel):
     id: int
@@ -12,7 +15,13 @@ class DownloadResponse(BaseModel):
     artist: Optional[str] = None
     status: str
     file_path: Optional[str] = None
+    priority: str = "interactive"
+    error_class: Optional[str] = None
+    attempts: int = 0
+    queue_position: Optional[int] = None  # only while pending
+    estimated_start_at: Optional[datetime] = None
     created_at: datetime
+    updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True # Enable ORM mode
@@ -21,4 +30,34 @@ class DownloadHistoryResponse(BaseModel):
     downloads: List[DownloadResponse]
     total: int
     page: int
-    per_page: int
\ No newline at end of file
+    per_page: int
+
+class DownloadChangesResponse(BaseModel):
+    downloads: List[DownloadResponse]  # oldest change first
+    cursor: str  # pass back as `since` to continue
+    has_more: bool
+
+class DownloadCancelRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+class DownloadCancelResponse(BaseModel):
+    cancelled: List[int]  # ids that were pending or downloading; others are left as they are
+
+class DownloadImportResponse(BaseModel):
+    queued: int
+    duplicate: int  # already queued, downloaded or listed earlier in the file
+    invalid: int
+    over_limit: int  # new, but past the per-user queue limit; import them again later
+    invalid_lines: List[int]  # first 100, 1-based
+    download_ids: List[int]
+
+class DownloadHistoryFilter(BaseModel):
+    """Query filters shared by the history listing and bulk export endpoints"""
+    status: Optional[str] = None
+    artist: Optional[str] = None
+    q: Optional[str] = None  # substring of title or artist
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+ArchiveFormat = Literal["zip", "tar"]
+ExportFormat = Literal["csv", "ndjson"]
\ No newline at end of file
@@ -0,0 +1,58 @@
+from pydantic import BaseModel
+from typing import List, Optional, Literal
+
+class LibraryTrackResponse(BaseModel):
+    id: int
+    path: str
+    title: Optional[str] = None
+    artist: Optional[str] = None
+    album: Optional[str] = None
+    duration: Optional[float] = None
+    size: int
+    content_hash: Optional[str] = None
+    loudness_lufs: Optional[float] = None
+    sample_peak: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class LibrarySearchResponse(BaseModel):
+    tracks: List[LibraryTrackResponse]
+    query: str
+    limit: int
+    offset: int
+
+class LibraryScanStatus(BaseModel):
+    directories_listed: int
+    directories_skipped: int
+    directories_removed: int
+    tracks_added: int
+    tracks_updated: int
+    tracks_removed: int
+    duration_seconds: float
+
+class DuplicateGroup(BaseModel):
+    content_hash: str
+    size: int
+    paths: List[str]
+    reclaimable_bytes: int
+
+class DuplicateReport(BaseModel):
+    groups: List[DuplicateGroup]
+    reclaimable_bytes: int
+
+class DedupResult(BaseModel):
+    dry_run: bool
+    mode: str
+    files_linked: int
+    files_skipped: int
+    bytes_reclaimed: int
+    errors: List[str]
+
+class CleanupReport(BaseModel):
+    workspaces_removed: int
+    partial_files_removed: int
+    bytes_reclaimed: int
+    duration_seconds: float
+
+DedupMode = Literal["hardlink", "reflink"]
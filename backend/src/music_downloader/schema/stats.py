@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import List
+
+class StatsBucket(BaseModel):
+    downloads: int
+    failures: int
+    bytes: int
+    duration_seconds: float
+
+class DailyStats(StatsBucket):
+    day: date
+
+class UserStats(StatsBucket):
+    user_id: int
+    username: str
+
+class StatsResponse(BaseModel):
+    since: date
+    totals: StatsBucket
+    days: List[DailyStats]
+
+class AdminStatsResponse(StatsResponse):
+    users: List[UserStats]
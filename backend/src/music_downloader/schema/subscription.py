@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+from .download import DownloadPriority
+
+class SubscriptionCreate(BaseModel):
+    url: str  # channel tab or playlist URL
+    priority: DownloadPriority = "bulk"
+    backfill: bool = False  # also download what is already there, not just new uploads
+
+class SubscriptionResponse(BaseModel):
+    id: int
+    url: str
+    title: Optional[str] = None
+    priority: str
+    backfill: bool
+    next_check_at: datetime
+    last_checked_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,124 @@
+import io
+import logging
+import os
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, AsyncIterator
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+
+# Formats that do not shrink further; deflating them only burns CPU
+COMPRESSED_EXTENSIONS = {".mp3", ".m4a", ".aac", ".ogg", ".opus", ".flac", ".webm"}
+
+
+class ArchiveEntry(NamedTuple):
+    arcname: str
+    path: str
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable buffer drained by the streaming generator after every write"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def unique_entries(paths: Iterable[str]) -> List[ArchiveEntry]:
+    """Name each file by its basename, suffixing duplicates"""
+    entries, seen = [], set()
+    for path in paths:
+        stem, suffix = os.path.splitext(os.path.basename(path))
+        arcname, counter = f"{stem}{suffix}", 1
+        while arcname in seen:
+            arcname = f"{stem}_{counter}{suffix}"
+            counter += 1
+        seen.add(arcname)
+        entries.append(ArchiveEntry(arcname=arcname, path=path))
+    return entries
+
+
+def stream_zip(entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+    """Yield a ZIP archive chunk by chunk; entries carry data descriptors since the output is unseekable"""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as zf:
+        for entry in entries:
+            try:
+                zinfo = zipfile.ZipInfo.from_file(entry.path, arcname=entry.arcname)
+                src = open(entry.path, "rb")
+            except OSError as e:
+                logger.warning(f"Skipping {entry.path} in archive: {e}")
+                continue
+            compressed = Path(entry.path).suffix.lower() in COMPRESSED_EXTENSIONS
+            zinfo.compress_type = zipfile.ZIP_STORED if compressed else zipfile.ZIP_DEFLATED
+            with src, zf.open(zinfo, "w") as dest:
+                while chunk := src.read(CHUNK_SIZE):
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def stream_tar(entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+    """Yield an uncompressed tar archive chunk by chunk"""
+    for entry in entries:
+        try:
+            st = os.stat(entry.path)
+            src = open(entry.path, "rb")
+        except OSError as e:
+            logger.warning(f"Skipping {entry.path} in archive: {e}")
+            continue
+        with src:
+            info = tarfile.TarInfo(entry.arcname)
+            info.size = st.st_size
+            info.mtime = int(st.st_mtime)
+            info.mode = 0o644
+            yield info.tobuf(format=tarfile.PAX_FORMAT)
+
+            # The header promised st_size bytes: truncate growth, zero-fill shrinkage
+            remaining = info.size
+            while remaining > 0:
+                size = min(CHUNK_SIZE, remaining)
+                chunk = src.read(size) or tarfile.NUL * size
+                remaining -= len(chunk)
+                yield chunk
+            padding = -info.size % tarfile.BLOCKSIZE
+            if padding:
+                yield tarfile.NUL * padding
+    yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
+
+
+async def iterate_in_threadpool_closing(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Drive a blocking chunk generator from the threadpool.
+
+    A client disconnect cancels the response task; the generator is then closed
+    so open file handles are released instead of lingering until GC.
+    """
+    try:
+        while True:
+            chunk = await run_in_threadpool(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        chunks.close()
@@ -7,7 +7,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-async def log_user_action(
+def write_user_action(
     db: Session,
     user_id: Optional[int],
     action: str,
@@ -18,7 +18,7 @@ async def log_user_action(
     user_agent: Optional[str] = None,
     status: str = "success"
 ) -> AuditLog:
-    """Log user action to audit table"""
+    """Log user action to audit table (blocking variant for worker threads)"""
     try:
         audit_log = AuditLog(
             user_id=user_id,
@@ -42,7 +42,32 @@ async def log_user_action(
         raise
 
 
-async def log_download_action(
+async def log_user_action(
+    db: Session,
+    user_id: Optional[int],
+    action: str,
+    resource_type: Optional[str] = None,
+    resource_id: Optional[str] = None,
+    details: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    status: str = "success"
+) -> AuditLog:
+    """Log user action to audit table"""
+    return write_user_action(
+        db=db,
+        user_id=user_id,
+        action=action,
+        resource_type=resource_type,
+        resource_id=resource_id,
+        details=details,
+        ip_address=ip_address,
+        user_agent=user_agent,
+        status=status
+    )
+
+
+def write_download_action(
     db: Session,
     user_id: int,
     action: str,
@@ -52,10 +77,10 @@ async def log_download_action(
     user_agent: Optional[str] = None,
     status: str = "success"
 ) -> AuditLog:
-    """Log download-specific action"""
+    """Log download-specific action (blocking variant for worker threads)"""
     details_str = json.dumps(details) if details else None
     
-    return await log_user_action(
+    return write_user_action(
         db=db,
         user_id=user_id,
         action=action,
@@ -66,3 +91,26 @@ async def log_download_action(
         user_agent=user_agent,
         status=status
     )
+
+
+async def log_download_action(
+    db: Session,
+    user_id: int,
+    action: str,
+    url: str,
+    details: Optional[dict] = None,
+    ip_address: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    status: str = "success"
+) -> AuditLog:
+    """Log download-specific action"""
+    return write_download_action(
+        db=db,
+        user_id=user_id,
+        action=action,
+        url=url,
+        details=details,
+        ip_address=ip_address,
+        user_agent=user_agent,
+        status=status
+    )
@@ -0,0 +1,231 @@
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from typing import Optional, List, Dict
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config.settings import settings
+from ..model import SessionLocal, LibraryTrack
+
+HASH_CHUNK_SIZE = 1024 * 1024
+HASH_BATCH_SIZE = 200
+FICLONE = 0x40049409  # linux/fs.h, reflink on btrfs/xfs
+
+
+@dataclass
+class DedupStats:
+    """Result of a deduplication pass"""
+    dry_run: bool
+    mode: str
+    files_linked: int = 0
+    files_skipped: int = 0
+    bytes_reclaimed: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class ContentHasher:
+    """Background SHA-256 hashing of library tracks that have no content hash yet.
+
+    Hashing yields to downloads: workers run at lowered CPU priority and pause
+    between chunks while any download is in progress.
+    """
+
+    def __init__(self, workers: int = None, session_factory=SessionLocal):
+        self.workers = workers or settings.hash_workers
+        self.session_factory = session_factory
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._active_downloads = 0
+        self._idle = threading.Condition()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @contextmanager
+    def download_in_progress(self):
+        """Mark a running download; hashing pauses until none are left"""
+        with self._idle:
+            self._active_downloads += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._active_downloads -= 1
+                self._idle.notify_all()
+
+    def _wait_until_idle(self) -> None:
+        with self._idle:
+            self._idle.wait_for(lambda: self._active_downloads == 0 or self._stop.is_set())
+
+    def hash_file(self, path: str) -> Optional[str]:
+        """Stream a file through SHA-256 in fixed-size chunks"""
+        digest = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                while not self._stop.is_set():
+                    self._wait_until_idle()
+                    chunk = f.read(HASH_CHUNK_SIZE)
+                    if not chunk:
+                        return digest.hexdigest()
+                    digest.update(chunk)
+        except OSError as e:
+            self.logger.warning(f"Could not hash {path}: {e}")
+        return None
+
+    def hash_pending(self) -> int:
+        """Hash every track lacking a content hash; returns the number hashed"""
+        hashed = 0
+        db = self.session_factory()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, initializer=_lower_thread_priority) as pool:
+                last_id = 0
+                while not self._stop.is_set():
+                    tracks = db.query(LibraryTrack).filter(
+                        LibraryTrack.content_hash.is_(None),
+                        LibraryTrack.id > last_id
+                    ).order_by(LibraryTrack.id).limit(HASH_BATCH_SIZE).all()
+                    if not tracks:
+                        break
+                    last_id = tracks[-1].id
+
+                    for track, digest in zip(tracks, pool.map(self._hash_unchanged, tracks)):
+                        if digest:
+                            track.content_hash = digest
+                            hashed += 1
+                    db.commit()
+        finally:
+            db.close()
+        if hashed:
+            self.logger.info(f"Hashed {hashed} library tracks")
+        return hashed
+
+    def _hash_unchanged(self, track: LibraryTrack) -> Optional[str]:
+        """Hash a track, discarding the result if the file changed since it was indexed"""
+        path, size, mtime_ns = track.path, track.size, track.mtime_ns
+        digest = self.hash_file(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+            return None
+        return digest
+
+    def request_run(self) -> None:
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="content-hasher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        with self._idle:
+            self._idle.notify_all()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def _run(self) -> None:
+        # a first pass right away catches tracks indexed before hashing existed or left over by a crash
+        while not self._stop.is_set():
+            try:
+                self.hash_pending()
+            except Exception as e:
+                self.logger.error(f"Content hashing failed: {e}", exc_info=True)
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+
+def _lower_thread_priority() -> None:
+    try:
+        # On Linux a thread id is a valid PRIO_PROCESS target, so only this worker is reniced
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+def find_duplicates(db: Session, limit: int = 100) -> Dict[str, List[LibraryTrack]]:
+    """Group library tracks sharing a content hash, largest groups first"""
+    duplicate_hashes = db.query(LibraryTrack.content_hash).filter(
+        LibraryTrack.content_hash.isnot(None)
+    ).group_by(LibraryTrack.content_hash).having(
+        func.count(LibraryTrack.id) > 1
+    ).order_by(func.count(LibraryTrack.id).desc(), LibraryTrack.content_hash).limit(limit).subquery()
+
+    groups: Dict[str, List[LibraryTrack]] = {}
+    tracks = db.query(LibraryTrack).filter(
+        LibraryTrack.content_hash.in_(duplicate_hashes.select())
+    ).order_by(LibraryTrack.content_hash, LibraryTrack.id).all()
+    for track in tracks:
+        groups.setdefault(track.content_hash, []).append(track)
+    return groups
+
+
+def _replace_with_link(source: str, target: str, mode: str) -> None:
+    """Atomically replace `target` by a hardlink or reflink of `source`"""
+    temp_path = f"{target}.dedup-tmp"
+    try:
+        if mode == "hardlink":
+            os.link(source, temp_path)
+        else:
+            with open(source, "rb") as src, open(temp_path, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        os.replace(temp_path, target)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def deduplicate(db: Session, mode: str = "hardlink", dry_run: bool = True) -> DedupStats:
+    """Replace duplicate copies by links to the oldest indexed copy"""
+    stats = DedupStats(dry_run=dry_run, mode=mode)
+    for content_hash, tracks in find_duplicates(db, limit=None).items():
+        keep = tracks[0]
+        try:
+            keep_stat = os.stat(keep.path)
+        except OSError as e:
+            stats.errors.append(f"{keep.path}: {e}")
+            continue
+
+        for track in tracks[1:]:
+            try:
+                st = os.stat(track.path)
+            except OSError as e:
+                stats.errors.append(f"{track.path}: {e}")
+                continue
+            already_linked = (st.st_dev, st.st_ino) == (keep_stat.st_dev, keep_stat.st_ino)
+            changed = (st.st_size, st.st_mtime_ns) != (track.size, track.mtime_ns)
+            if already_linked or changed or st.st_dev != keep_stat.st_dev:
+                stats.files_skipped += 1
+                continue
+
+            if not dry_run:
+                try:
+                    _replace_with_link(keep.path, track.path, mode)
+                    # keep the index in step so the next scan does not re-probe the file
+                    track.mtime_ns = os.stat(track.path).st_mtime_ns
+                except OSError as e:
+                    stats.errors.append(f"{track.path}: {e}")
+                    continue
+            stats.files_linked += 1
+            stats.bytes_reclaimed += st.st_size
+    db.commit()
+    return stats
+
+
+content_hasher = ContentHasher()
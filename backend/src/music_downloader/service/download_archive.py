@@ -0,0 +1,52 @@
+from typing import Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, Query
+
+from ..model import DownloadArchiveEntry, DownloadHistory
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# Downloads that ended without a file; their media may be queued again
+UNFINISHED_STATUSES = ("failed", "cancelled")
+
+
+def record_archive_entry(
+    db: Session,
+    user_id: int,
+    extractor: Optional[str],
+    media_id: Optional[str],
+    download_id: Optional[int] = None
+) -> None:
+    """Add a downloaded item to its user's download archive, so subscriptions and imports skip it.
+
+    Called as each download completes, whoever queued it. An upsert, so an
+    item already archived (seeded by a subscription, or downloaded twice)
+    keeps its row and only gains the download it was missing. Joins the
+    caller's transaction.
+    """
+    if not extractor or not media_id:
+        return
+    table = DownloadArchiveEntry.__table__
+    statement = _INSERTS[db.get_bind().dialect.name](table).values(
+        user_id=user_id, extractor=extractor, media_id=media_id, download_id=download_id
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.extractor, table.c.media_id],
+        set_={"download_id": func.coalesce(table.c.download_id, statement.excluded.download_id)}
+    )
+    db.execute(statement)
+
+
+def archived_entries(db: Session, user_id: int, *columns) -> Query:
+    """`columns` of the user's archive entries, leaving out those whose download failed or was cancelled.
+
+    Entries are written when a download completes, or when a subscription
+    is seeded; older rows may still point at a download that never finished.
+    """
+    return db.query(*columns).outerjoin(
+        DownloadHistory, DownloadArchiveEntry.download_id == DownloadHistory.id
+    ).filter(
+        DownloadArchiveEntry.user_id == user_id,
+        or_(DownloadHistory.id.is_(None), DownloadHistory.status.notin_(UNFINISHED_STATUSES))
+    )
@@ -0,0 +1,128 @@
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+from sqlalchemy import text
+
+from ..model import engine
+
+# Event types
+DOWNLOAD_STATUS = "download.status"  # id, user_id, status
+USER_CHANGED = "user.changed"  # user_id
+TOKEN_REVOKED = "token.revoked"  # jti, user_id
+RESYNC = "bus.resync"  # local only: events may have been missed, drop derived state
+
+EventHandler = Callable[[dict], None]
+
+
+class EventBus:
+    """Small pub/sub bus shared by every backend process.
+
+    On PostgreSQL events travel over LISTEN/NOTIFY, so each process (this one
+    included) gets them within milliseconds of the publishing commit. Without
+    a listening connection, e.g. on SQLite or before start(), events are
+    dispatched in-process only.
+    """
+
+    CHANNEL = "music_downloader_events"
+    POLL_SECONDS = 1.0
+    MAX_RECONNECT_SECONDS = 30.0
+
+    def __init__(self, engine=engine):
+        self.engine = engine
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._handlers: Dict[str, List[EventHandler]] = defaultdict(list)
+        self._listening = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, event_type: str, handler: EventHandler) -> None:
+        """Call `handler(event)` for every event of `event_type`; runs on the listener thread"""
+        self._handlers[event_type].append(handler)
+
+    def publish(self, event_type: str, **payload) -> None:
+        """Send an event to all processes; payloads stay small (NOTIFY caps them at 8000 bytes)"""
+        event = {"type": event_type, **payload}
+        if self._listening.is_set():
+            try:
+                with self.engine.connect() as connection:
+                    connection.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        {"channel": self.CHANNEL, "payload": json.dumps(event, default=str)}
+                    )
+                    connection.commit()
+                return
+            except Exception as e:
+                self.logger.warning(f"NOTIFY failed for {event_type}, delivering locally only: {e}")
+        self._dispatch(event)
+
+    def _dispatch(self, event: dict) -> None:
+        for handler in self._handlers.get(event.get("type"), ()):
+            try:
+                handler(event)
+            except Exception as e:
+                self.logger.error(f"Handler for {event.get('type')} failed: {e}", exc_info=True)
+
+    def start(self) -> None:
+        if self.engine.dialect.name != "postgresql" or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="event-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._listening.clear()
+
+    def _listen(self) -> None:
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                self._listen_once()
+            except Exception as e:
+                self.logger.warning(f"Event listener connection lost, retrying in {delay:.0f}s: {e}")
+            if self._stop.is_set():
+                break
+            if self._listening.is_set():
+                self._listening.clear()
+                delay = 1.0
+                # anything published while we were away is gone
+                self._dispatch({"type": RESYNC})
+            self._stop.wait(delay)
+            delay = min(self.MAX_RECONNECT_SECONDS, delay * 2)
+
+    def _listen_once(self) -> None:
+        connection = self.engine.raw_connection()
+        # a LISTEN connection in autocommit mode must never go back to the pool
+        connection.detach()
+        try:
+            dbapi_connection = connection.dbapi_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.CHANNEL}")
+            self._listening.set()
+            self.logger.info(f"Listening for events on {self.CHANNEL}")
+            while not self._stop.is_set():
+                ready, _, _ = select.select([dbapi_connection], [], [], self.POLL_SECONDS)
+                if not ready:
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notification = dbapi_connection.notifies.pop(0)
+                    try:
+                        event = json.loads(notification.payload)
+                    except ValueError:
+                        self.logger.warning(f"Dropping malformed event: {notification.payload[:200]}")
+                        continue
+                    self._dispatch(event)
+        finally:
+            connection.close()
+
+
+event_bus = EventBus()
@@ -0,0 +1,56 @@
+import csv
+import io
+from contextlib import closing
+from datetime import datetime
+from typing import Iterator, List, Sequence
+
+import orjson
+from sqlalchemy.orm import Session
+
+# Rows fetched per round trip from the server-side cursor, and encoded per response chunk
+EXPORT_BATCH_ROWS = 1000
+
+
+def stream_rows(session_factory, statement, batch_rows: int = EXPORT_BATCH_ROWS) -> Iterator[Sequence]:
+    """Batches of rows of `statement`, read through a server-side cursor in a session of their own.
+
+    The session lives as long as the generator, not the request, and is
+    closed when the generator is exhausted or closed on client disconnect.
+    """
+    db: Session = session_factory()
+    try:
+        result = db.execute(statement.execution_options(yield_per=batch_rows))
+        yield from result.partitions()
+    finally:
+        db.close()
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(fields: List[str], batches: Iterator[Sequence]) -> Iterator[bytes]:
+    """Header line first, so the client gets a byte before the first query returns, then one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue().encode("utf-8")
+    with closing(batches):
+        for rows in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_value(value) for value in row] for row in rows)
+            yield buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson(batches: Iterator[Sequence]) -> Iterator[bytes]:
+    """One JSON object per row and line, one chunk per batch"""
+    with closing(batches):
+        for rows in batches:
+            yield b"".join(
+                orjson.dumps(row._asdict(), option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE) for row in rows
+            )
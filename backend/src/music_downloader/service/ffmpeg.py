@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+FFPROBE_TIMEOUT_SECONDS = 30
+FFMPEG_TIMEOUT_SECONDS = 1800
+CANCEL_POLL_SECONDS = 0.2
+
+# Single-pass EBU R128 normalization (streaming music platforms target about -14..-16 LUFS)
+LOUDNORM_FILTER = "loudnorm=I=-16:TP=-1.5:LRA=11"
+
+
+class ProcessCancelled(Exception):
+    """ffmpeg was killed because the caller's cancel event was set"""
+
+
+def probe_audio(path: str) -> Optional[Dict[str, Any]]:
+    """Read duration and common tags of an audio file with ffprobe"""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration:format_tags:stream_tags",
+        "-of", "json",
+        path,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=FFPROBE_TIMEOUT_SECONDS, check=True)
+        data = json.loads(result.stdout or b"{}")
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        logger.warning(f"ffprobe failed for {path}: {e}")
+        return None
+
+    # Vorbis/Opus keep their comments on the stream, ID3/MP4 on the container
+    tags: Dict[str, str] = {}
+    for stream in data.get("streams", []):
+        tags.update({k.lower(): v for k, v in stream.get("tags", {}).items()})
+    fmt = data.get("format", {})
+    tags.update({k.lower(): v for k, v in fmt.get("tags", {}).items()})
+
+    duration = fmt.get("duration")
+    return {
+        'title': tags.get('title'),
+        'artist': tags.get('artist') or tags.get('album_artist'),
+        'album': tags.get('album'),
+        'duration': float(duration) if duration not in (None, "N/A") else None,
+    }
+
+
+def _run_ffmpeg(cmd: List[str], cancelled: Optional[threading.Event] = None) -> None:
+    """Run ffmpeg to completion, killing it within CANCEL_POLL_SECONDS once `cancelled` is set"""
+    started = time.monotonic()
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise RuntimeError(f"ffmpeg failed: {e}") from e
+    with process:
+        while True:
+            try:
+                _, stderr = process.communicate(timeout=CANCEL_POLL_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                if cancelled is not None and cancelled.is_set():
+                    process.kill()
+                    process.communicate()
+                    raise ProcessCancelled("ffmpeg stopped: cancelled")
+                if time.monotonic() - started > FFMPEG_TIMEOUT_SECONDS:
+                    process.kill()
+                    process.communicate()
+                    raise RuntimeError(f"ffmpeg timed out after {FFMPEG_TIMEOUT_SECONDS}s")
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()[-500:]}")
+
+
+def postprocess_audio(source: str, destination: str, tags: Dict[str, Optional[str]],
+                      cover: Optional[str] = None, loudnorm: bool = False, bitrate: str = "192",
+                      cancelled: Optional[threading.Event] = None) -> float:
+    """Transcode to MP3, write ID3 tags, embed `cover` and optionally normalize loudness.
+
+    Everything happens in one ffmpeg invocation, so the file is decoded and
+    written exactly once. Returns the seconds spent; raises RuntimeError if
+    ffmpeg fails and ProcessCancelled if `cancelled` is set meanwhile.
+    """
+    cmd: List[str] = ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y", "-i", source]
+    if cover:
+        cmd += ["-i", cover]
+    cmd += ["-map", "0:a:0"]
+    if cover:
+        # ID3 APIC frames hold JPEG/PNG; thumbnails are often WebP
+        cmd += [
+            "-map", "1:v:0", "-c:v", "mjpeg", "-disposition:v", "attached_pic",
+            "-metadata:s:v", "title=Album cover", "-metadata:s:v", "comment=Cover (front)",
+        ]
+    if loudnorm:
+        cmd += ["-af", LOUDNORM_FILTER]
+    cmd += ["-c:a", "libmp3lame", "-b:a", f"{bitrate}k", "-map_metadata", "-1"]
+    for key, value in tags.items():
+        if value:
+            cmd += ["-metadata", f"{key}={value}"]
+    cmd += ["-id3v2_version", "3", "-f", "mp3", destination]
+
+    started = time.monotonic()
+    _run_ffmpeg(cmd, cancelled)
+    return time.monotonic() - started
+
+
+def write_replaygain_tags(path: str, gain_db: float, peak: float) -> None:
+    """Add ReplayGain track tags by remuxing (no re-encode) and atomically replacing `path`"""
+    directory, name = os.path.split(path)
+    # hidden, same extension: ffmpeg picks the muxer from it and the indexer skips it
+    temp_path = os.path.join(directory, f".{name}.replaygain{os.path.splitext(name)[1]}")
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y", "-i", path,
+        "-map", "0", "-c", "copy", "-map_metadata", "0",
+        "-metadata", f"REPLAYGAIN_TRACK_GAIN={gain_db:.2f} dB",
+        "-metadata", f"REPLAYGAIN_TRACK_PEAK={peak:.6f}",
+    ]
+    if path.lower().endswith(".mp3"):
+        cmd += ["-id3v2_version", "3"]
+    cmd.append(temp_path)
+    try:
+        subprocess.run(cmd, capture_output=True, timeout=FFMPEG_TIMEOUT_SECONDS, check=True)
+        os.replace(temp_path, path)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg failed: {e.stderr.decode(errors='replace').strip()[-500:]}") from e
+    except (OSError, subprocess.SubprocessError) as e:
+        raise RuntimeError(f"ffmpeg failed: {e}") from e
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
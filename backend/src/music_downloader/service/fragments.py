@@ -0,0 +1,149 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from ..config.settings import settings
+
+# yt-dlp protocols it downloads fragment by fragment itself, where concurrent_fragment_downloads applies
+FRAGMENTED_PROTOCOLS = {"m3u8_native", "http_dash_segments", "http_dash_segments_generator", "ism", "f4m"}
+INITIAL_CONCURRENCY = 4
+# Weight of the newest measurement in the per-connection throughput average
+EWMA_WEIGHT = 0.3
+
+
+def parse_extractor_limits(spec: str) -> Dict[str, int]:
+    """`"youtube=8,soundcloud=2"` -> {"youtube": 8, "soundcloud": 2}; malformed items are ignored"""
+    limits = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        try:
+            limits[name.strip().lower()] = max(1, int(value))
+        except ValueError:
+            continue
+    return limits
+
+
+def is_fragmented(info: Dict[str, Any]) -> bool:
+    """Whether the selected format(s) of a resolved info dict are fetched fragment by fragment"""
+    formats = info.get("requested_formats") or [info]
+    return any(fmt.get("protocol") in FRAGMENTED_PROTOCOLS or fmt.get("fragments") for fmt in formats)
+
+
+@dataclass
+class FragmentLease:
+    """Download settings granted to one job, and what it measured"""
+    extractor: str
+    fragmented: bool
+    concurrency: int  # concurrent_fragment_downloads
+    rate_limit: Optional[int] = None  # bytes/s, from the bandwidth budget
+    downloaded_bytes: int = 0
+    download_seconds: float = 0.0
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """bytes/s over the transfer, once it finished"""
+        if self.downloaded_bytes <= 0 or self.download_seconds <= 0:
+            return None
+        return self.downloaded_bytes / self.download_seconds
+
+
+@dataclass
+class _ExtractorState:
+    concurrency: int
+    per_connection_bps: Optional[float] = None  # average throughput of one fragment connection
+
+
+class FragmentTuner:
+    """Chooses fragment concurrency per extractor from the throughput earlier jobs achieved.
+
+    Concurrency doubles while each extra connection still adds throughput,
+    and halves once per-connection throughput collapses, within the
+    extractor's configured maximum. With a bandwidth budget, a job gets
+    only as many connections as the budget left by running jobs can feed,
+    and a matching rate limit.
+    """
+
+    def __init__(self, max_concurrency: int = None, extractor_limits: Dict[str, int] = None,
+                 bandwidth_bytes: float = None):
+        self.max_concurrency = settings.fragment_concurrency_max if max_concurrency is None else max_concurrency
+        self.extractor_limits = (
+            parse_extractor_limits(settings.fragment_concurrency) if extractor_limits is None else extractor_limits
+        )
+        self.bandwidth_bytes = settings.download_bandwidth_mbps * 125_000 if bandwidth_bytes is None else bandwidth_bytes
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._states: Dict[str, _ExtractorState] = {}
+        self._active: Dict[int, FragmentLease] = {}
+
+    def limit(self, extractor: str) -> int:
+        return max(1, self.extractor_limits.get(extractor, self.max_concurrency))
+
+    def _state(self, extractor: str) -> _ExtractorState:
+        state = self._states.get(extractor)
+        if state is None:
+            initial = min(INITIAL_CONCURRENCY, self.limit(extractor))
+            state = self._states[extractor] = _ExtractorState(concurrency=initial)
+        return state
+
+    def _expected_bps(self, lease: FragmentLease) -> float:
+        """Bandwidth a running download is likely to take: what its connections achieved before, within its limit"""
+        state = self._states.get(lease.extractor)
+        if state is None or state.per_connection_bps is None:
+            return float(lease.rate_limit or 0)
+        expected = state.per_connection_bps * lease.concurrency
+        return min(expected, lease.rate_limit) if lease.rate_limit else expected
+
+    def acquire(self, info: Dict[str, Any]) -> FragmentLease:
+        """Settings for the download of a resolved info dict; hand the lease back with release()"""
+        extractor = (info.get("extractor_key") or info.get("extractor") or "generic").lower()
+        fragmented = is_fragmented(info)
+        with self._lock:
+            state = self._state(extractor)
+            concurrency = min(state.concurrency, self.limit(extractor)) if fragmented else 1
+            rate_limit = None
+            if self.bandwidth_bytes > 0:
+                in_use = sum(self._expected_bps(lease) for lease in self._active.values())
+                fair_share = self.bandwidth_bytes / (len(self._active) + 1)
+                available = max(self.bandwidth_bytes - in_use, fair_share)
+                rate_limit = int(available)
+                if fragmented and state.per_connection_bps:
+                    concurrency = max(1, min(concurrency, int(available // state.per_connection_bps)))
+            lease = FragmentLease(extractor, fragmented, concurrency, rate_limit)
+            self._active[id(lease)] = lease
+        return lease
+
+    def release(self, lease: FragmentLease) -> None:
+        """Return a lease and learn from its measured throughput"""
+        with self._lock:
+            self._active.pop(id(lease), None)
+            throughput = lease.throughput
+            if not lease.fragmented or throughput is None:
+                return
+            state = self._state(lease.extractor)
+            per_connection = throughput / lease.concurrency
+            previous, before = state.per_connection_bps, state.concurrency
+            if previous is None or per_connection >= 0.75 * previous:
+                # connections still scale, unless the rate limit was what held it back
+                capped = lease.rate_limit is not None and throughput >= 0.9 * lease.rate_limit
+                if not capped:
+                    grown = max(state.concurrency, lease.concurrency * 2)
+                    state.concurrency = min(self.limit(lease.extractor), grown)
+            elif per_connection < 0.6 * previous:  # the extra connections added little
+                state.concurrency = max(1, lease.concurrency // 2)
+            state.per_connection_bps = (
+                per_connection if previous is None else EWMA_WEIGHT * per_connection + (1 - EWMA_WEIGHT) * previous
+            )
+        if state.concurrency != before:
+            self.logger.debug(
+                f"Fragment concurrency for {lease.extractor}: {before} -> {state.concurrency} "
+                f"({throughput / 1e6:.2f} MB/s with {lease.concurrency})"
+            )
+
+    def concurrency(self, extractor: str) -> int:
+        """Concurrency the next fragmented download from `extractor` would start with"""
+        with self._lock:
+            return self._state(extractor.lower()).concurrency
+
+
+fragment_tuner = FragmentTuner()
@@ -0,0 +1,146 @@
+import logging
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+
+from ..config.settings import settings
+from ..model import engine
+from .scheduler import download_scheduler
+
+logger = logging.getLogger(__name__)
+
+STALE_REPORT_SECONDS = 60
+
+
+def check_database() -> str:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return "ok"
+
+
+def check_output_writable() -> str:
+    with tempfile.NamedTemporaryFile(dir=settings.output_directory, prefix=".readiness-"):
+        pass
+    return "ok"
+
+
+def check_free_disk() -> str:
+    free_mb = shutil.disk_usage(settings.output_directory).free // (1024 * 1024)
+    if free_mb < settings.min_free_disk_mb:
+        raise RuntimeError(f"{free_mb} MB free, below {settings.min_free_disk_mb} MB")
+    return f"{free_mb} MB free"
+
+
+def check_ffmpeg() -> str:
+    path = shutil.which("ffmpeg")
+    if path is None:
+        raise RuntimeError("ffmpeg not found on PATH")
+    return path
+
+
+def check_queue_depth() -> str:
+    depth = download_scheduler.queue_depth()
+    if depth >= settings.max_queue_depth:
+        raise RuntimeError(f"{depth} queued jobs, limit {settings.max_queue_depth}")
+    return f"{depth} queued"
+
+
+@dataclass
+class CheckResult:
+    ok: bool
+    detail: str
+    duration_ms: float
+
+
+@dataclass
+class HealthReport:
+    ready: bool
+    checks: Dict[str, CheckResult]
+
+
+class HealthChecker:
+    """Runs readiness checks concurrently, each bounded by a timeout, and caches the report"""
+
+    def __init__(self):
+        self.checks: Dict[str, Callable[[], str]] = {
+            "database": check_database,
+            "output_directory": check_output_writable,
+            "disk_space": check_free_disk,
+            "ffmpeg": check_ffmpeg,
+            "queue_depth": check_queue_depth,
+        }
+        self.last_report: Optional[HealthReport] = None
+        self._last_run = 0.0
+        self._lock = threading.Lock()
+        # a hung check (e.g. a dead NFS mount) keeps its thread; the pool bounds how many pile up
+        self._pool = ThreadPoolExecutor(max_workers=2 * len(self.checks), thread_name_prefix="readiness")
+
+    def report(self) -> HealthReport:
+        """Cached report, refreshed at most every `readiness_cache_seconds`"""
+        with self._lock:
+            if self.last_report is None or time.monotonic() - self._last_run >= settings.readiness_cache_seconds:
+                self.last_report = self._run()
+                self._last_run = time.monotonic()
+            return self.last_report
+
+    def recent_report(self, max_age: float) -> Optional[HealthReport]:
+        """Last report if it is younger than `max_age` seconds, without running checks"""
+        if self.last_report is None or time.monotonic() - self._last_run > max_age:
+            return None
+        return self.last_report
+
+    def _run(self) -> HealthReport:
+        started = time.monotonic()
+        futures = {name: self._pool.submit(self._timed, check) for name, check in self.checks.items()}
+        deadline = started + settings.readiness_check_timeout_seconds
+        results: Dict[str, CheckResult] = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                results[name] = CheckResult(
+                    ok=False, detail="timed out", duration_ms=settings.readiness_check_timeout_seconds * 1000
+                )
+        report = HealthReport(ready=all(result.ok for result in results.values()), checks=results)
+        if not report.ready:
+            failing = {name: result.detail for name, result in results.items() if not result.ok}
+            logger.warning(f"Readiness checks failing: {failing}")
+        return report
+
+    @staticmethod
+    def _timed(check: Callable[[], str]) -> CheckResult:
+        started = time.monotonic()
+        try:
+            detail, ok = check(), True
+        except Exception as e:
+            detail, ok = str(e) or e.__class__.__name__, False
+        return CheckResult(ok=ok, detail=detail, duration_ms=round((time.monotonic() - started) * 1000, 1))
+
+
+health_checker = HealthChecker()
+
+
+async def shed_load() -> None:
+    """Reject new work with 503 + Retry-After while the node is saturated.
+
+    Uses only in-memory state (queue depth and the cached readiness report),
+    so it runs before authentication or any other DB work.
+    """
+    depth = download_scheduler.queue_depth()
+    # a stale "not ready" must not shed forever when nothing probes readiness any more
+    report = health_checker.recent_report(max_age=STALE_REPORT_SECONDS)
+    if depth < settings.max_queue_depth and (report is None or report.ready):
+        return
+    reason = "Download queue is full" if depth >= settings.max_queue_depth else "Service not ready"
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"{reason}, try again later",
+        headers={"Retry-After": str(settings.load_shed_retry_after_seconds)},
+    )
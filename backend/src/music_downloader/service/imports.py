@@ -0,0 +1,170 @@
+import csv
+import io
+import logging
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..model import DownloadHistory, DownloadArchiveEntry
+from .download_archive import archived_entries
+from .scheduler import download_scheduler, DownloadJob
+
+logger = logging.getLogger(__name__)
+
+INSERT_CHUNK_SIZE = 1000
+MAX_URL_LENGTH = 2048  # DownloadHistory.url
+MAX_REPORTED_INVALID_LINES = 100
+
+YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be"}
+# Query parameters that only track where a link was shared from
+TRACKING_PARAMS = {"si", "feature", "fbclid", "gclid", "pp"}
+# Earlier downloads in these statuses do not make a URL a duplicate
+RETRYABLE_STATUSES = ("failed", "cancelled")
+
+
+@dataclass
+class ImportSummary:
+    queued: int = 0
+    duplicate: int = 0
+    invalid: int = 0
+    over_limit: int = 0  # valid and new, but past the user's queue limit
+    invalid_lines: List[int] = field(default_factory=list)  # first few, 1-based
+    download_ids: List[int] = field(default_factory=list)
+
+
+def _youtube_id(parts) -> Optional[str]:
+    host = parts.netloc.lower()
+    if host == "youtu.be":
+        video_id = parts.path.strip("/").split("/")[0]
+    elif parts.path == "/watch":
+        video_id = dict(parse_qsl(parts.query)).get("v", "")
+    elif parts.path.startswith(("/shorts/", "/live/")):
+        video_id = parts.path.split("/")[2]
+    else:
+        return None
+    return video_id if len(video_id) == 11 else None
+
+
+def normalize_url(raw: str) -> Optional[Tuple[str, str]]:
+    """(URL to download, dedup key) for a user-supplied link, or None if it is not a web URL.
+
+    YouTube links in any of their forms (youtu.be, shorts, share parameters)
+    collapse to one watch URL keyed by video id; YouTube Music links keep
+    their host, since that extractor returns richer album metadata.
+    """
+    raw = raw.strip()
+    if not raw or len(raw) > MAX_URL_LENGTH:
+        return None
+    try:
+        parts = urlsplit(raw)
+    except ValueError:
+        return None
+    scheme, host = parts.scheme.lower(), parts.netloc.lower()
+    if scheme not in ("http", "https") or not parts.hostname or " " in raw:
+        return None
+
+    if host in YOUTUBE_HOSTS:
+        video_id = _youtube_id(parts)
+        if video_id:
+            watch_host = "music.youtube.com" if host == "music.youtube.com" else "www.youtube.com"
+            return f"https://{watch_host}/watch?v={video_id}", f"youtube:{video_id}"
+
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in TRACKING_PARAMS and not key.startswith("utm_")
+    ])
+    url = urlunsplit((scheme, host, parts.path or "/", query, ""))
+    return url, url
+
+
+def iter_import_lines(stream: BinaryIO) -> Iterator[Tuple[int, Optional[str]]]:
+    """Yield (line number, first URL-looking cell) for each non-blank line of a text or CSV upload.
+
+    Reads the upload incrementally; blank lines and `#` comments are skipped,
+    and lines without any http(s) cell yield None (a CSV header is ignored).
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        for line_number, row in enumerate(csv.reader(text), start=1):
+            cells = [cell.strip() for cell in row if cell.strip()]
+            if not cells or cells[0].startswith("#"):
+                continue
+            url = next((cell for cell in cells if cell.lower().startswith(("http://", "https://"))), None)
+            if url is None and line_number == 1:
+                continue  # header row
+            yield line_number, url
+    finally:
+        text.detach()
+
+
+def _known_keys(db: Session, user_id: int) -> set:
+    """Dedup keys of everything the user already has queued, running or downloaded"""
+    known = set()
+    rows = db.query(DownloadHistory.url).filter(
+        DownloadHistory.user_id == user_id,
+        DownloadHistory.status.notin_(RETRYABLE_STATUSES)
+    ).yield_per(5000)
+    for (url,) in rows:
+        normalized = normalize_url(url)
+        known.add(normalized[1] if normalized else url)
+    archived = archived_entries(db, user_id, DownloadArchiveEntry.media_id).filter(
+        DownloadArchiveEntry.extractor == "youtube"
+    ).yield_per(5000)
+    known.update(f"youtube:{media_id}" for (media_id,) in archived)
+    return known
+
+
+def import_urls(db: Session, user_id: int, stream: BinaryIO, priority: str, room: int) -> ImportSummary:
+    """Queue every new URL of an uploaded list, with one multi-row INSERT per chunk.
+
+    `room` is how many more jobs the user may queue; the rest is counted as
+    over the limit, not inserted.
+    """
+    summary = ImportSummary()
+    known = _known_keys(db, user_id)
+    pending: List[str] = []
+
+    def flush() -> None:
+        if not pending:
+            return
+        rows = [{"user_id": user_id, "url": url, "status": "pending", "priority": priority} for url in pending]
+        # a multi-row INSERT may return its rows in any order unless asked to keep the input order
+        inserted = db.execute(
+            insert(DownloadHistory).returning(DownloadHistory.id, DownloadHistory.url, sort_by_parameter_order=True),
+            rows
+        ).all()
+        db.commit()
+        # no per-job event: nothing waits for "pending" and thousands of NOTIFYs would flood the bus
+        for download_id, url in inserted:
+            download_scheduler.submit(DownloadJob(id=download_id, user_id=user_id, url=url, priority=priority))
+        summary.download_ids.extend(download_id for download_id, _ in inserted)
+        summary.queued += len(inserted)
+        pending.clear()
+
+    for line_number, raw in iter_import_lines(stream):
+        normalized = normalize_url(raw) if raw else None
+        if normalized is None:
+            summary.invalid += 1
+            if len(summary.invalid_lines) < MAX_REPORTED_INVALID_LINES:
+                summary.invalid_lines.append(line_number)
+            continue
+        url, key = normalized
+        if key in known:
+            summary.duplicate += 1
+            continue
+        known.add(key)
+        if summary.queued + len(pending) >= room:
+            summary.over_limit += 1
+            continue
+        pending.append(url)
+        if len(pending) >= INSERT_CHUNK_SIZE:
+            flush()
+    flush()
+    logger.info(
+        f"Imported URL list for user {user_id}: {summary.queued} queued, {summary.duplicate} duplicate, "
+        f"{summary.invalid} invalid, {summary.over_limit} over the queue limit"
+    )
+    return summary
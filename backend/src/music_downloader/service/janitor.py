@@ -0,0 +1,153 @@
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Optional, Set
+
+from ..config.settings import settings
+from .scheduler import download_scheduler
+from .yt_music import JOBS_DIRECTORY
+
+# yt-dlp leftovers of interrupted downloads
+PARTIAL_SUFFIXES = (".part", ".ytdl")
+# workspaces of releases that created them in the output root: download_<date>_<time>[_<mkdtemp suffix>];
+# anything else there, e.g. a "download_favourites" album folder, belongs to the user
+LEGACY_WORKSPACE_PATTERN = re.compile(r"download_\d{8}_\d{6}(_\w+)?")
+
+
+@dataclass
+class JanitorReport:
+    """Result of a janitor sweep"""
+    workspaces_removed: int = 0
+    partial_files_removed: int = 0
+    bytes_reclaimed: int = 0
+    duration_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _tree_usage(path: Path) -> tuple:
+    """(bytes, newest mtime) of everything under `path`, the directory itself included"""
+    size, newest = 0, path.lstat().st_mtime
+    for directory, _, files in os.walk(path):
+        newest = max(newest, os.lstat(directory).st_mtime)
+        for name in files:
+            try:
+                st = os.lstat(os.path.join(directory, name))
+            except OSError:
+                continue
+            size += st.st_size
+            newest = max(newest, st.st_mtime)
+    return size, newest
+
+
+class WorkspaceJanitor:
+    """Reclaims job workspaces and partial downloads nobody is working on any more.
+
+    A workspace is left alone while its job runs here, or while anything in
+    it changed within the grace period (another process may own it).
+    """
+
+    def __init__(self, root: str = None, interval: int = None, grace: int = None,
+                 running_jobs: Callable[[], Set[int]] = None):
+        self.root = Path(root or settings.output_directory)
+        self.interval = settings.janitor_interval_seconds if interval is None else interval
+        self.grace = settings.janitor_grace_seconds if grace is None else grace
+        self.running_jobs = running_jobs or download_scheduler.running_job_ids
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.last_report: Optional[JanitorReport] = None
+
+        self._sweep_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sweep(self) -> JanitorReport:
+        with self._sweep_lock:
+            started = time.monotonic()
+            report = JanitorReport()
+            cutoff = time.time() - self.grace
+            running = {str(job_id) for job_id in self.running_jobs()}
+
+            workspaces = []
+            jobs_root = self.root / JOBS_DIRECTORY
+            if jobs_root.is_dir():
+                workspaces.extend(path for path in jobs_root.iterdir() if path.name not in running)
+            try:
+                root_entries = list(self.root.iterdir())
+            except OSError as e:
+                self.logger.warning(f"Could not list {self.root}: {e}")
+                root_entries = []
+            workspaces.extend(
+                path for path in root_entries
+                if LEGACY_WORKSPACE_PATTERN.fullmatch(path.name) and path.is_dir() and not path.is_symlink()
+            )
+
+            for path in workspaces:
+                try:
+                    is_tree = path.is_dir() and not path.is_symlink()
+                    size, newest = _tree_usage(path) if is_tree else (path.lstat().st_size, path.lstat().st_mtime)
+                    if newest >= cutoff:
+                        continue
+                    shutil.rmtree(path) if is_tree else path.unlink()
+                except OSError as e:
+                    self.logger.warning(f"Could not remove workspace {path}: {e}")
+                    continue
+                report.workspaces_removed += 1
+                report.bytes_reclaimed += size
+
+            for path in root_entries:
+                if not path.name.endswith(PARTIAL_SUFFIXES):
+                    continue
+                try:
+                    st = path.lstat()
+                    if not path.is_file() or st.st_mtime >= cutoff:
+                        continue
+                    path.unlink()
+                except OSError as e:
+                    self.logger.warning(f"Could not remove partial file {path}: {e}")
+                    continue
+                report.partial_files_removed += 1
+                report.bytes_reclaimed += st.st_size
+
+            report.duration_seconds = round(time.monotonic() - started, 3)
+            self.last_report = report
+            if report.workspaces_removed or report.partial_files_removed:
+                self.logger.info(
+                    f"Janitor reclaimed {report.bytes_reclaimed} bytes: {report.workspaces_removed} workspaces, "
+                    f"{report.partial_files_removed} partial files"
+                )
+            return report
+
+    def request_sweep(self) -> None:
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="workspace-janitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                self.logger.error(f"Janitor sweep failed: {e}", exc_info=True)
+            self._wakeup.wait(self.interval if self.interval > 0 else None)
+            self._wakeup.clear()
+
+
+workspace_janitor = WorkspaceJanitor()
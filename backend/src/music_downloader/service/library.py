@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+
+from ..config.settings import settings
+from ..model import SessionLocal, LibraryDirectory, LibraryTrack
+from .ffmpeg import probe_audio
+from .content_hash import content_hasher
+from .loudness import loudness_analyzer
+
+AUDIO_EXTENSIONS = {".mp3", ".m4a", ".flac", ".ogg", ".opus", ".wav", ".aac"}
+
+
+def _truncate(value: Optional[str], length: int) -> Optional[str]:
+    value = (value or "").strip()
+    return value[:length] or None
+
+
+@dataclass
+class ScanStats:
+    """Result of a library scan"""
+    directories_listed: int = 0
+    directories_skipped: int = 0
+    directories_removed: int = 0
+    tracks_added: int = 0
+    tracks_updated: int = 0
+    tracks_removed: int = 0
+    duration_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class LibraryIndexer:
+    """Incremental indexer for the audio files under the output directory.
+
+    Directory mtimes are persisted, so a rescan only lists directories whose
+    entries changed and only probes files whose (size, mtime) changed.
+    Unchanged directories are descended into through their known children.
+    """
+
+    def __init__(self, root: str = None, workers: int = None, interval: int = None,
+                 session_factory=SessionLocal):
+        self.root = Path(root or settings.output_directory)
+        self.workers = workers or settings.library_scan_workers
+        self.interval = settings.library_scan_interval_seconds if interval is None else interval
+        self.session_factory = session_factory
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.last_stats: Optional[ScanStats] = None
+
+        self._scan_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def scan(self, full: bool = False) -> ScanStats:
+        """Bring the index in line with the filesystem. `full` ignores stored directory mtimes."""
+        with self._scan_lock:
+            started = time.monotonic()
+            stats = ScanStats()
+            db = self.session_factory()
+            try:
+                known_dirs: Dict[str, int] = dict(
+                    db.query(LibraryDirectory.path, LibraryDirectory.mtime_ns).all()
+                )
+                children: Dict[str, List[str]] = defaultdict(list)
+                for path in known_dirs:
+                    children[os.path.dirname(path)].append(path)
+
+                seen_dirs = set()
+                stack = [str(self.root)]
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    while stack:
+                        directory = stack.pop()
+                        try:
+                            # stat before listing so a change during the listing is caught next scan
+                            mtime_ns = os.stat(directory).st_mtime_ns
+                        except OSError:
+                            continue
+                        seen_dirs.add(directory)
+
+                        if not full and known_dirs.get(directory) == mtime_ns:
+                            stats.directories_skipped += 1
+                            stack.extend(children.get(directory, ()))
+                            continue
+
+                        stack.extend(self._index_directory(db, pool, directory, stats))
+                        self._save_directory(db, directory, mtime_ns)
+                        stats.directories_listed += 1
+                        db.commit()
+
+                removed = [path for path in known_dirs if path not in seen_dirs]
+                for chunk_start in range(0, len(removed), 500):
+                    chunk = removed[chunk_start:chunk_start + 500]
+                    stats.tracks_removed += db.query(LibraryTrack).filter(
+                        LibraryTrack.directory.in_(chunk)
+                    ).delete(synchronize_session=False)
+                    db.query(LibraryDirectory).filter(
+                        LibraryDirectory.path.in_(chunk)
+                    ).delete(synchronize_session=False)
+                stats.directories_removed = len(removed)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+            stats.duration_seconds = round(time.monotonic() - started, 3)
+            self.last_stats = stats
+            self.logger.info(f"Library scan finished: {stats}")
+            # after every scan, not only after changes: tracks an earlier pass left unprocessed are picked up
+            content_hasher.request_run()
+            loudness_analyzer.request_run()
+            return stats
+
+    def _index_directory(self, db, pool: ThreadPoolExecutor, directory: str, stats: ScanStats) -> List[str]:
+        """Sync the tracks of one directory and return its subdirectories"""
+        subdirs: List[str] = []
+        files: Dict[str, Tuple[int, int]] = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # hidden entries hold job workspaces and other app state
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                        st = entry.stat()
+                        files[entry.path] = (st.st_size, st.st_mtime_ns)
+        except OSError as e:
+            self.logger.warning(f"Could not list {directory}: {e}")
+            return subdirs
+
+        existing = {
+            track.path: track
+            for track in db.query(LibraryTrack).filter(LibraryTrack.directory == directory)
+        }
+        for path, track in existing.items():
+            if path not in files:
+                db.delete(track)
+                stats.tracks_removed += 1
+
+        changed = [
+            path for path, signature in files.items()
+            if path not in existing or (existing[path].size, existing[path].mtime_ns) != signature
+        ]
+        # ffprobe runs out of process, so threads are enough to keep every core busy
+        for path, tags in zip(changed, pool.map(probe_audio, changed)):
+            tags = tags or {}
+            size, mtime_ns = files[path]
+            track = existing.get(path)
+            if track is None:
+                track = LibraryTrack(path=path, directory=directory)
+                db.add(track)
+                stats.tracks_added += 1
+            else:
+                stats.tracks_updated += 1
+            track.size = size
+            track.mtime_ns = mtime_ns
+            track.title = _truncate(tags.get('title') or Path(path).stem, 500)
+            track.artist = _truncate(tags.get('artist'), 200)
+            track.album = _truncate(tags.get('album'), 500)
+            track.duration = tags.get('duration')
+            track.content_hash = None
+            track.loudness_lufs = None
+            track.sample_peak = None
+            track.loudness_analyzed_at = None
+        return subdirs
+
+    def _save_directory(self, db, directory: str, mtime_ns: int) -> None:
+        record = db.query(LibraryDirectory).filter(LibraryDirectory.path == directory).first()
+        if record is None:
+            db.add(LibraryDirectory(path=directory, mtime_ns=mtime_ns))
+        else:
+            record.mtime_ns = mtime_ns
+
+    def request_scan(self) -> None:
+        """Wake the background loop for an immediate incremental scan"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="library-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                self.logger.error(f"Library scan failed: {e}", exc_info=True)
+            self._wakeup.wait(self.interval if self.interval > 0 else None)
+            self._wakeup.clear()
+
+
+library_indexer = LibraryIndexer()
@@ -0,0 +1,328 @@
+import logging
+import multiprocessing
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from ..config.settings import settings
+from ..config.logging_config import configure_logging, log_context
+from ..model import SessionLocal, LibraryTrack, DownloadHistory
+from .ffmpeg import write_replaygain_tags
+from .storage import charge_storage
+
+SAMPLE_RATE = 48000
+STEP_FRAMES = SAMPLE_RATE // 10  # 100 ms; a gating block spans 4 steps (400 ms, 75% overlap)
+CHUNK_FRAMES = STEP_FRAMES * 50  # 5 s of audio held in memory at a time
+ANALYSIS_BATCH_SIZE = 50
+
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+HISTOGRAM_STEP_LU = 0.01
+HISTOGRAM_BINS = int((10.0 - ABSOLUTE_GATE_LUFS) / HISTOGRAM_STEP_LU)
+REPLAYGAIN_REFERENCE_LUFS = -18.0
+
+# ITU-R BS.1770 K-weighting at 48 kHz (high shelf, then RLB high-pass). A recursive
+# filter does not vectorize, so ffmpeg applies it while decoding; NumPy does the rest.
+K_WEIGHTING = (
+    "biquad=b0=1.53512485958697:b1=-2.69169618940638:b2=1.19839281085285"
+    ":a0=1:a1=-1.69065929318241:a2=0.73248077421585,"
+    "biquad=b0=1:b1=-2:b2=1:a0=1:a1=-1.99004745483398:a2=0.99007225036621"
+)
+# Float PCM of the K-weighted source channels, in their native layout. astats logs the
+# sample peak of the unweighted signal at the end, so no channel is mixed before measuring.
+FILTERGRAPH = (
+    f"[0:a:0]aresample={SAMPLE_RATE},aformat=sample_fmts=flt,"
+    f"astats=measure_perchannel=none:measure_overall=Peak_level,{K_WEIGHTING}[out]"
+)
+PEAK_PATTERN = re.compile(rb"Peak level dB: (-?(?:inf|[0-9.]+))")
+
+# BS.1770 channel weights by WAVE_FORMAT_EXTENSIBLE speaker bit: LFE is ignored,
+# surround channels count +1.5 dB; everything else (and a mask-less stream) weighs 1.0
+SPEAKER_LFE = 0x8
+SPEAKER_SURROUNDS = 0x10 | 0x20 | 0x200 | 0x400  # back left/right, side left/right
+SURROUND_WEIGHT = 1.41
+
+
+def channel_weights(channels: int, mask: int) -> np.ndarray:
+    """Per-channel weights for a WAV stream with `channels` channels and speaker `mask`"""
+    speakers = [bit for bit in (1 << i for i in range(32)) if mask & bit]
+    if len(speakers) != channels:
+        return np.ones(channels)
+    return np.array([
+        0.0 if bit == SPEAKER_LFE else SURROUND_WEIGHT if bit & SPEAKER_SURROUNDS else 1.0
+        for bit in speakers
+    ])
+
+
+@dataclass
+class LoudnessResult:
+    integrated_lufs: Optional[float]  # None for silence or tracks shorter than one gating block
+    sample_peak: float  # linear, 1.0 = full scale
+
+    @property
+    def replaygain_db(self) -> Optional[float]:
+        if self.integrated_lufs is None:
+            return None
+        return REPLAYGAIN_REFERENCE_LUFS - self.integrated_lufs
+
+
+class LoudnessMeter:
+    """Streaming EBU R128 integrated loudness over K-weighted PCM.
+
+    Gating blocks are accumulated into a fixed-size histogram (power sum and
+    count per 0.01 LU), so memory does not grow with track length.
+    """
+
+    def __init__(self, weights: np.ndarray):
+        self.weights = weights
+        self._steps = np.empty(0)  # last 3 step energies, shared with the next chunk's blocks
+        self._pending = np.empty((0, len(weights)), dtype=np.float32)
+        self._counts = np.zeros(HISTOGRAM_BINS)
+        self._powers = np.zeros(HISTOGRAM_BINS)
+
+    def add(self, frames: np.ndarray) -> None:
+        """Feed an (n, channels) float32 array of K-weighted samples"""
+        weighted = np.concatenate([self._pending, frames])
+        usable = len(weighted) // STEP_FRAMES * STEP_FRAMES
+        self._pending = weighted[usable:]
+        if not usable:
+            return
+
+        # mean square per 100 ms step, weighted sum over channels
+        squared = np.square(weighted[:usable], dtype=np.float64)
+        step_powers = squared.reshape(-1, STEP_FRAMES, len(self.weights)).mean(axis=1) @ self.weights
+        steps = np.concatenate([self._steps, step_powers])
+        self._steps = steps[-3:]
+        if len(steps) < 4:
+            return
+
+        windows = np.lib.stride_tricks.sliding_window_view(steps, 4)
+        powers = windows.mean(axis=1)
+        with np.errstate(divide="ignore"):
+            loudness = -0.691 + 10 * np.log10(powers)
+        gated = loudness > ABSOLUTE_GATE_LUFS
+        bins = np.clip(
+            ((loudness[gated] - ABSOLUTE_GATE_LUFS) / HISTOGRAM_STEP_LU).astype(np.int64), 0, HISTOGRAM_BINS - 1
+        )
+        self._counts += np.bincount(bins, minlength=HISTOGRAM_BINS)
+        self._powers += np.bincount(bins, weights=powers[gated], minlength=HISTOGRAM_BINS)
+
+    def integrated(self) -> Optional[float]:
+        total = self._counts.sum()
+        if not total:
+            return None
+        relative_gate = -0.691 + 10 * np.log10(self._powers.sum() / total) + RELATIVE_GATE_LU
+        first_bin = max(0, int((relative_gate - ABSOLUTE_GATE_LUFS) / HISTOGRAM_STEP_LU))
+        count = self._counts[first_bin:].sum()
+        if not count:
+            return None
+        return float(-0.691 + 10 * np.log10(self._powers[first_bin:].sum() / count))
+
+
+def _read_wav_format(stream) -> Tuple[int, int]:
+    """Consume a WAV header up to the sample data; returns (channels, speaker mask)"""
+    if stream.read(12)[:4] != b"RIFF":
+        raise ValueError("not a WAV stream")
+    channels, mask = None, 0
+    while True:
+        header = stream.read(8)
+        if len(header) < 8:
+            raise ValueError("WAV stream ended before its data chunk")
+        chunk_id, size = header[:4], int.from_bytes(header[4:], "little")
+        if chunk_id == b"data":
+            if channels is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            return channels, mask
+        body = stream.read(size + size % 2)
+        if chunk_id == b"fmt ":
+            channels = int.from_bytes(body[2:4], "little")
+            if len(body) >= 24:  # WAVE_FORMAT_EXTENSIBLE
+                mask = int.from_bytes(body[20:24], "little")
+
+
+def analyze_loudness(path: str) -> Optional[LoudnessResult]:
+    """Decode `path` through ffmpeg in fixed-size chunks and measure it; None if it cannot be decoded"""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-nostats", "-loglevel", "info", "-i", path,
+        "-filter_complex", FILTERGRAPH, "-map", "[out]", "-map_metadata", "-1",
+        "-c:a", "pcm_f32le", "-f", "wav", "-",
+    ]
+    logger = logging.getLogger(__name__)
+    # a file, not a pipe: stderr is only read once stdout is drained
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        except OSError as e:
+            logger.warning(f"Could not start ffmpeg for {path}: {e}")
+            return None
+        meter = None
+        with process:
+            try:
+                channels, mask = _read_wav_format(process.stdout)
+                meter = LoudnessMeter(channel_weights(channels, mask))
+            except ValueError:
+                pass
+            if meter is not None:
+                frame_bytes = channels * 4
+                remainder = b""
+                while True:
+                    data = process.stdout.read(CHUNK_FRAMES * frame_bytes)
+                    if not data:
+                        break
+                    data = remainder + data
+                    usable = len(data) // frame_bytes * frame_bytes
+                    remainder = data[usable:]
+                    meter.add(np.frombuffer(data[:usable], dtype=np.float32).reshape(-1, channels))
+            else:
+                process.stdout.read()
+        stderr.seek(0)
+        log = stderr.read()
+
+    peaks = PEAK_PATTERN.findall(log)
+    if process.returncode != 0 or meter is None or not peaks:
+        logger.warning(f"Loudness analysis failed for {path}: {log.decode(errors='replace').strip()[-300:]}")
+        return None
+    return LoudnessResult(integrated_lufs=meter.integrated(), sample_peak=10 ** (float(peaks[-1]) / 20))
+
+
+class LoudnessAnalyzer:
+    """Background loudness measurement of library tracks in a process pool, one process per core"""
+
+    def __init__(self, workers: int = None, session_factory=SessionLocal):
+        self.workers = settings.loudness_workers if workers is None else workers
+        self.session_factory = session_factory
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def analyze_pending(self) -> int:
+        """Measure every track not analyzed since it last changed; returns the number measured"""
+        analyzed = 0
+        db = self.session_factory()
+        try:
+            # forkserver: forking this multi-threaded process could copy held locks into workers
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_init_worker_process
+            ) as pool:
+                last_id = 0
+                while not self._stop.is_set():
+                    tracks = db.query(LibraryTrack).filter(
+                        LibraryTrack.loudness_analyzed_at.is_(None),
+                        LibraryTrack.id > last_id
+                    ).order_by(LibraryTrack.id).limit(ANALYSIS_BATCH_SIZE).all()
+                    if not tracks:
+                        break
+                    last_id = tracks[-1].id
+
+                    retagged = {}
+                    for track, result in zip(tracks, pool.map(_analyze_track, [(t.id, t.path) for t in tracks])):
+                        if not self._unchanged(track):
+                            continue  # the indexer will pick it up again
+                        # failures are recorded too, so undecodable files are not retried every run
+                        track.loudness_analyzed_at = datetime.now(timezone.utc)
+                        if result is None:
+                            continue
+                        track.loudness_lufs = result.integrated_lufs
+                        track.sample_peak = result.sample_peak
+                        analyzed += 1
+                        if settings.write_replaygain_tags and result.replaygain_db is not None:
+                            if self._tag(track, result):
+                                retagged[track.path] = track.size
+                    if retagged:
+                        self._resize_downloads(db, retagged)
+                    db.commit()
+        finally:
+            db.close()
+        if analyzed:
+            self.logger.info(f"Measured loudness of {analyzed} library tracks")
+        return analyzed
+
+    @staticmethod
+    def _unchanged(track: LibraryTrack) -> bool:
+        try:
+            st = os.stat(track.path)
+        except OSError:
+            return False
+        return (st.st_size, st.st_mtime_ns) == (track.size, track.mtime_ns)
+
+    def _tag(self, track: LibraryTrack, result: LoudnessResult) -> bool:
+        try:
+            write_replaygain_tags(track.path, result.replaygain_db, result.sample_peak)
+            st = os.stat(track.path)
+        except (RuntimeError, OSError) as e:
+            self.logger.warning(f"Could not write ReplayGain tags to {track.path}: {e}")
+            return False
+        # keep the index in sync so the rewrite is not mistaken for a new version of the track
+        track.size = st.st_size
+        track.mtime_ns = st.st_mtime_ns
+        track.content_hash = None
+        return True
+
+    @staticmethod
+    def _resize_downloads(db, sizes: Dict[str, int]) -> None:
+        """Carry new sizes of retagged files over to the downloads that produced them and their owners' usage"""
+        downloads = db.query(DownloadHistory).filter(
+            DownloadHistory.file_path.in_(list(sizes)),
+            DownloadHistory.status == "completed"
+        ).all()
+        for download in downloads:
+            size = sizes[download.file_path]
+            charge_storage(db, download.user_id, size - (download.file_size or 0))
+            download.file_size = size
+
+    def request_run(self) -> None:
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self.workers <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="loudness-analyzer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def _run(self) -> None:
+        # a first pass right away catches tracks indexed before analysis existed or left over by a crash
+        while not self._stop.is_set():
+            try:
+                self.analyze_pending()
+            except Exception as e:
+                self.logger.error(f"Loudness analysis failed: {e}", exc_info=True)
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+
+def _analyze_track(item: Tuple[int, str]) -> Optional[LoudnessResult]:
+    """Pool entry point; the worker's log records carry the track as their job id"""
+    track_id, path = item
+    with log_context(job_id=f"loudness-{track_id}"):
+        return analyze_loudness(path)
+
+
+def _init_worker_process() -> None:
+    # forkserver children start with logging unconfigured
+    configure_logging()
+    try:
+        os.nice(10)
+    except OSError:
+        pass
+
+
+loudness_analyzer = LoudnessAnalyzer()
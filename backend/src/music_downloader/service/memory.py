@@ -0,0 +1,53 @@
+import os
+import resource
+import sys
+import time
+from dataclasses import dataclass
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss_bytes() -> int:
+    """Highest resident set size this process has reached"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB elsewhere
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process right now; the peak where /proc is not available"""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+class RssSampler:
+    """Highest process RSS seen while one job runs, read at most once per `interval` seconds.
+
+    Download workers are threads of one process, so a job's figure includes
+    whatever its neighbours hold at the same time.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.start_bytes = self.peak_bytes = current_rss_bytes()
+        self._next_sample = time.monotonic() + interval
+
+    def sample(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if force or now >= self._next_sample:
+            self._next_sample = now + self.interval
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+
+    @property
+    def growth_bytes(self) -> int:
+        return self.peak_bytes - self.start_bytes
+
+
+@dataclass
+class WorkerMemory:
+    """RSS observed by one download worker across the jobs it ran"""
+    jobs: int = 0
+    last_rss_bytes: int = 0  # after its most recent job
+    peak_rss_bytes: int = 0  # highest seen during any of its jobs
@@ -0,0 +1,270 @@
+import ipaddress
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+from sqlalchemy.dialects import postgresql, sqlite
+from starlette.concurrency import run_in_threadpool
+
+from ..config.settings import settings
+from ..model import SessionLocal, RateLimitCounter
+
+logger = logging.getLogger(__name__)
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# Seconds between sweeps of counters no request can read any more
+PRUNE_INTERVAL_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """At most `limit` requests per `window` seconds"""
+    limit: int
+    window: int
+
+
+def parse_rate_limits(spec: str) -> Dict[Tuple[str, str], RateLimit]:
+    """`"POST /auth/login=10/60"` -> {("POST", "/auth/login"): RateLimit(10, 60)}; malformed items are ignored"""
+    limits = {}
+    for item in spec.split(","):
+        route, _, rate = item.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        count, _, window = rate.partition("/")
+        try:
+            limit = RateLimit(int(count), int(window))
+        except ValueError:
+            continue
+        if method and path.strip() and limit.limit > 0 and limit.window > 0:
+            limits[(method.upper(), path.strip().rstrip("/") or "/")] = limit
+    return limits
+
+
+def parse_networks(spec: str) -> list:
+    """`"127.0.0.1,::1"` -> ip_network objects; malformed items are ignored"""
+    networks = []
+    for item in spec.split(","):
+        try:
+            networks.append(ipaddress.ip_network(item.strip(), strict=False))
+        except ValueError:
+            continue
+    return networks
+
+
+def sliding_window(previous: int, current: int, elapsed: float, rate: RateLimit) -> int:
+    """Seconds until one more request fits, 0 if it fits now.
+
+    The previous fixed window counts in proportion to how much of it still
+    overlaps the sliding window ending now, which approximates a true sliding
+    log with two counters per key.
+    """
+    allowance = rate.limit - 1  # requests already counted that still leave room for this one
+    weight = 1 - elapsed / rate.window
+    if previous * weight + current <= allowance:
+        return 0
+    if current <= allowance:
+        # wait for enough of the previous window to slide out
+        wait = rate.window * (1 - (allowance - current) / previous) - elapsed
+    else:
+        # this window is full; in the next one it becomes the previous window
+        wait = rate.window - elapsed + rate.window * max(0.0, 1 - allowance / current)
+    return max(1, math.ceil(round(wait, 6)))
+
+
+class RateLimiter(ABC):
+    """Counts requests per key; a request is admitted only if every key it counts against has room"""
+
+    @abstractmethod
+    def hit(self, keys: Sequence[str], rate: RateLimit) -> int:
+        """Count one request against `keys`; returns seconds to wait instead when any of them is over its limit"""
+
+    async def ahit(self, keys: Sequence[str], rate: RateLimit) -> int:
+        return self.hit(keys, rate)
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Sliding-window counters in this process; each worker process limits on its own"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._windows: Dict[str, Tuple[int, int, int]] = {}  # key -> (window start, previous count, current count)
+        self._next_prune = 0.0
+
+    def _counts(self, key: str, start: int, rate: RateLimit) -> Tuple[int, int]:
+        window_start, previous, current = self._windows.get(key, (start, 0, 0))
+        if window_start == start:
+            return previous, current
+        return (current if window_start == start - rate.window else 0), 0
+
+    def hit(self, keys: Sequence[str], rate: RateLimit) -> int:
+        now = self.clock()
+        start = int(now // rate.window * rate.window)
+        with self._lock:
+            self._prune(now)
+            counts = {key: self._counts(key, start, rate) for key in keys}
+            retry_after = max(sliding_window(previous, current, now - start, rate)
+                              for previous, current in counts.values())
+            if retry_after:
+                return retry_after  # rejected requests do not count
+            for key, (previous, current) in counts.items():
+                self._windows[key] = (start, previous, current + 1)
+            return 0
+
+    def _prune(self, now: float) -> None:
+        if now < self._next_prune:
+            return
+        self._next_prune = now + PRUNE_INTERVAL_SECONDS
+        # a key idle for two of its windows counts as empty
+        horizon = now - 2 * _longest_window()
+        stale = [key for key, (start, _, _) in self._windows.items() if start < horizon]
+        for key in stale:
+            del self._windows[key]
+
+
+class DatabaseRateLimiter(RateLimiter):
+    """Sliding-window counters in the rate_limit_counters table, shared by all worker processes.
+
+    Two processes checking the same key at the same moment may both admit
+    the last allowed request, so a limit can be exceeded by the number of
+    processes at most.
+    """
+
+    def __init__(self, session_factory=SessionLocal, clock=time.time):
+        self.session_factory = session_factory
+        self.clock = clock
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._next_prune = 0.0
+
+    async def ahit(self, keys: Sequence[str], rate: RateLimit) -> int:
+        return await run_in_threadpool(self.hit, keys, rate)
+
+    def hit(self, keys: Sequence[str], rate: RateLimit) -> int:
+        now = self.clock()
+        start = int(now // rate.window * rate.window)
+        db = self.session_factory()
+        try:
+            rows = db.query(RateLimitCounter.key, RateLimitCounter.window_start, RateLimitCounter.count).filter(
+                RateLimitCounter.key.in_(keys),
+                RateLimitCounter.window_start.in_([start - rate.window, start]),
+            ).all()
+            counts = {(key, window_start): count for key, window_start, count in rows}
+            retry_after = max(
+                sliding_window(counts.get((key, start - rate.window), 0), counts.get((key, start), 0),
+                               now - start, rate)
+                for key in keys
+            )
+            if retry_after:
+                return retry_after
+            insert = _INSERTS[db.get_bind().dialect.name]
+            for key in keys:
+                statement = insert(RateLimitCounter.__table__).values(key=key, window_start=start, count=1)
+                db.execute(statement.on_conflict_do_update(
+                    index_elements=["key", "window_start"],
+                    set_={"count": RateLimitCounter.__table__.c.count + 1},
+                ))
+            self._prune(db, now)
+            db.commit()
+            return 0
+        except Exception as e:
+            db.rollback()
+            # a database hiccup must not lock everyone out
+            self.logger.warning(f"Rate limit check failed, admitting request: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _prune(self, db, now: float) -> None:
+        if now < self._next_prune:
+            return
+        self._next_prune = now + PRUNE_INTERVAL_SECONDS
+        db.query(RateLimitCounter).filter(
+            RateLimitCounter.window_start < now - 2 * _longest_window()
+        ).delete(synchronize_session=False)
+
+
+def _longest_window() -> int:
+    return max((rate.window for rate in route_limits.values()), default=0)
+
+
+def create_rate_limiter(backend: str = None) -> RateLimiter:
+    backend = settings.rate_limit_backend if backend is None else backend
+    if backend == "database":
+        return DatabaseRateLimiter()
+    return MemoryRateLimiter()
+
+
+route_limits = parse_rate_limits(settings.rate_limits)
+trusted_proxies = parse_networks(settings.trusted_proxies)
+rate_limiter = create_rate_limiter()
+
+
+def client_ip(scope) -> str:
+    """Peer address, or the X-Real-IP a trusted reverse proxy (the bundled nginx) put in front of it"""
+    peer = (scope.get("client") or ("unknown", 0))[0]
+    try:
+        address = ipaddress.ip_address(peer)
+    except ValueError:
+        return peer
+    if any(address in network for network in trusted_proxies):
+        headers = dict(scope["headers"])
+        # the last X-Forwarded-For hop is the one the proxy itself appended
+        forwarded = headers.get(b"x-real-ip") or headers.get(b"x-forwarded-for", b"").split(b",")[-1]
+        if forwarded.strip():
+            return forwarded.strip().decode("latin-1")
+    return peer
+
+
+def token_subject(scope) -> Optional[str]:
+    """Username of a validly signed bearer token; checks only the signature and expiry, no database"""
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
+class RateLimitMiddleware:
+    """Answers 429 + Retry-After to rate-limited routes before the request reaches any dependency.
+
+    Each limited route counts per client IP and, with a bearer token, per
+    user; a request has to fit both limits.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"].rstrip("/") or "/"
+        rate = route_limits.get((scope["method"], path))
+        if rate is None:
+            await self.app(scope, receive, send)
+            return
+        route = f"{scope['method']} {path}"
+        keys = [f"{route}|ip:{client_ip(scope)}"]
+        username = token_subject(scope)
+        if username:
+            keys.append(f"{route}|user:{username}")
+        retry_after = await rate_limiter.ahit(keys, rate)
+        if not retry_after:
+            await self.app(scope, receive, send)
+            return
+        logger.warning(f"Rate limit exceeded on {route} by {', '.join(key.split('|', 1)[1] for key in keys)}")
+        response = JSONResponse(
+            status_code=429,
+            content={"detail": f"Too many requests, retry in {retry_after} seconds"},
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
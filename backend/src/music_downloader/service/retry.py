@@ -0,0 +1,113 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict
+from urllib.parse import urlparse
+
+from ..config.settings import settings
+
+# Failure classes reported by MusicDownloader
+TRANSIENT = "transient"  # network hiccups, 5xx, timeouts
+RATE_LIMITED = "rate_limited"  # 429 / bot checks: the whole source wants us to slow down
+EXTRACTOR = "extractor"  # the site changed under yt-dlp; fixed by updating yt-dlp
+PERMANENT = "permanent"  # unavailable, private, unsupported: retrying cannot help
+
+RETRYABLE = {TRANSIENT, RATE_LIMITED, EXTRACTOR}
+
+# hosts that belong to the same extractor family
+_HOST_ALIASES = {"youtu.be": "youtube", "youtube-nocookie.com": "youtube"}
+
+
+def source_key(url: str) -> str:
+    """Name of the site a URL belongs to, e.g. "youtube" for music.youtube.com"""
+    host = (urlparse(url).hostname or "").lower()
+    for prefix in ("www.", "m.", "music."):
+        host = host.removeprefix(prefix)
+    if host in _HOST_ALIASES:
+        return _HOST_ALIASES[host]
+    labels = host.split(".")
+    return labels[-2] if len(labels) >= 2 else host or "unknown"
+
+
+def backoff_delay(attempt: int, error_class: str) -> float:
+    """Exponential backoff with equal jitter; `attempt` counts failures so far (1-based)"""
+    base = settings.retry_base_seconds * (4 if error_class == RATE_LIMITED else 1)
+    delay = min(settings.retry_max_seconds, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+@dataclass
+class _Circuit:
+    failures: int = 0
+    open_until: float = 0.0
+    probing: bool = False
+    probe_job: Optional[int] = None  # the job holding the probe slot
+
+
+class CircuitBreaker:
+    """Per-source breaker: after `threshold` consecutive retryable failures the source
+    is paused for `cooldown` seconds, then a single probe job decides whether it reopens.
+    """
+
+    PROBE_RECHECK_SECONDS = 5.0
+
+    def __init__(self, threshold: int = None, cooldown: float = None):
+        self.threshold = threshold or settings.circuit_failure_threshold
+        self.cooldown = cooldown or settings.circuit_open_seconds
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._circuits: Dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, source: str, job_id: Optional[int] = None) -> Optional[float]:
+        """None if job `job_id` for `source` may run now, otherwise seconds to wait before asking again"""
+        with self._lock:
+            circuit = self._circuits.get(source)
+            if circuit is None or circuit.failures < self.threshold:
+                return None
+            remaining = circuit.open_until - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if circuit.probing:
+                return self.PROBE_RECHECK_SECONDS
+            circuit.probing = True
+            circuit.probe_job = job_id
+            self.logger.info(f"Circuit half-open for {source}, sending a probe job")
+            return None
+
+    def record_success(self, source: str) -> None:
+        with self._lock:
+            if self._circuits.pop(source, None) is not None:
+                self.logger.info(f"Circuit closed for {source}")
+
+    def record_failure(self, source: str) -> None:
+        with self._lock:
+            circuit = self._circuits.setdefault(source, _Circuit())
+            circuit.failures += 1
+            circuit.probing = False
+            if circuit.failures >= self.threshold:
+                circuit.open_until = time.monotonic() + self.cooldown
+                self.logger.warning(
+                    f"Circuit open for {source} after {circuit.failures} consecutive failures; "
+                    f"pausing its jobs for {self.cooldown:.0f}s"
+                )
+
+    def release(self, source: str, job_id: Optional[int] = None) -> None:
+        """Give back the probe slot when job `job_id` was the probe and ended without a verdict
+        (e.g. permanent error); jobs that started before the circuit opened hold no slot to give back
+        """
+        with self._lock:
+            circuit = self._circuits.get(source)
+            if circuit is not None and circuit.probing and circuit.probe_job == job_id:
+                circuit.probing = False
+
+    def open_sources(self) -> Dict[str, float]:
+        """Sources currently paused, with seconds until their next probe"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                source: max(0.0, circuit.open_until - now)
+                for source, circuit in self._circuits.items()
+                if circuit.failures >= self.threshold
+            }
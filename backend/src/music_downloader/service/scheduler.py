@@ -0,0 +1,525 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Deque, List, Callable, Set, Tuple
+
+from sqlalchemy import or_, update
+
+from ..config.settings import settings
+from ..config.logging_config import log_context, request_id_var
+from ..model import SessionLocal, DownloadHistory
+from .download_archive import record_archive_entry
+from .audit import write_download_action
+from .content_hash import content_hasher
+from .events import event_bus, DOWNLOAD_STATUS
+from .library import library_indexer
+from .memory import RssSampler, WorkerMemory, current_rss_bytes
+from .retry import CircuitBreaker, RETRYABLE, TRANSIENT, PERMANENT, backoff_delay, source_key
+from .stats import record_download_outcome
+from .storage import storage_admission, charge_storage, StorageDeferred, QuotaExceeded, Reservation, MB
+from .yt_music import MusicDownloader, DownloadResult, DownloadCancelled
+
+# Lower rank is served first; a single interactive URL always beats queued bulk work
+PRIORITY_RANKS = {"interactive": 0, "bulk": 1}
+# A claim whose heartbeat is this many beats old belongs to a process that is gone
+STALE_CLAIM_BEATS = 4
+
+
+@dataclass
+class DownloadJob:
+    """A queued download, mirroring a pending DownloadHistory row"""
+    id: int
+    user_id: int
+    url: str
+    priority: str = "interactive"
+    ip_address: Optional[str] = None
+    user_agent: Optional[str] = None
+    attempts: int = 0  # failed attempts so far
+    request_id: Optional[str] = field(default_factory=request_id_var.get)  # the request that queued it, for logs
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def source(self) -> str:
+        return source_key(self.url)
+
+
+class FairQueue:
+    """Per-user FIFO queues, served round-robin across users within each priority class.
+
+    Not thread-safe on its own; DownloadScheduler guards it with its condition.
+    """
+
+    def __init__(self):
+        self._classes: Dict[int, "OrderedDict[int, Deque[DownloadJob]]"] = {
+            rank: OrderedDict() for rank in sorted(set(PRIORITY_RANKS.values()))
+        }
+        self._size = Counter()
+
+    def __len__(self) -> int:
+        return sum(self._size.values())
+
+    def count(self, user_id: int) -> int:
+        return self._size[user_id]
+
+    def push(self, job: DownloadJob) -> None:
+        users = self._classes[PRIORITY_RANKS.get(job.priority, max(self._classes))]
+        users.setdefault(job.user_id, deque()).append(job)
+        self._size[job.user_id] += 1
+
+    def pop(self, can_start: Callable[[int], bool] = lambda user_id: True) -> Optional[DownloadJob]:
+        """Take the next job of the first user in rotation that may start another job"""
+        for users in self._classes.values():
+            for user_id, jobs in users.items():
+                if not can_start(user_id):
+                    continue
+                job = jobs.popleft()
+                if jobs:
+                    users.move_to_end(user_id)
+                else:
+                    del users[user_id]
+                self._size[user_id] -= 1
+                return job
+        return None
+
+    def remove(self, job_id: int) -> Optional[DownloadJob]:
+        for users in self._classes.values():
+            for user_id, jobs in users.items():
+                for job in jobs:
+                    if job.id == job_id:
+                        jobs.remove(job)
+                        if not jobs:
+                            del users[user_id]
+                        self._size[user_id] -= 1
+                        return job
+        return None
+
+    def order(self) -> List[DownloadJob]:
+        """Dispatch order if every user could start a job right away"""
+        ordered: List[DownloadJob] = []
+        for users in self._classes.values():
+            pending = [list(jobs) for jobs in users.values()]
+            depth = max((len(jobs) for jobs in pending), default=0)
+            for round_index in range(depth):
+                ordered.extend(jobs[round_index] for jobs in pending if round_index < len(jobs))
+        return ordered
+
+
+class DownloadScheduler:
+    """Thread pool executing download jobs with per-user fairness and quotas"""
+
+    def __init__(self, workers: int = None, session_factory=SessionLocal):
+        self.workers = workers or settings.download_workers
+        self.session_factory = session_factory
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.circuit_breaker = CircuitBreaker()
+
+        self._queue = FairQueue()
+        # jobs waiting out a retry backoff or a paused source: (ready_at, seq, job)
+        self._delayed: List[Tuple[float, int, DownloadJob]] = []
+        self._delay_seq = itertools.count()
+        self._running: Dict[int, DownloadJob] = {}
+        self._cancel_events: Dict[int, threading.Event] = {}  # per running job
+        self._running_per_user = Counter()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        # moving average of job run time, used for start time estimates
+        self._avg_job_seconds = 60.0
+        self._worker_memory: Dict[str, WorkerMemory] = {}
+
+    def submit(self, job: DownloadJob) -> None:
+        with self._cond:
+            self._queue.push(job)
+            self._cond.notify()
+
+    def submit_later(self, job: DownloadJob, delay: float) -> None:
+        with self._cond:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._delay_seq), job))
+            self._cond.notify()
+
+    def _release_due(self) -> Optional[float]:
+        """Move delayed jobs that are due into the queue; returns seconds until the next one"""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            self._queue.push(heapq.heappop(self._delayed)[2])
+        return self._delayed[0][0] - now if self._delayed else None
+
+    def queue_depth(self) -> int:
+        """Jobs waiting to run, including those waiting out a backoff"""
+        with self._cond:
+            return len(self._queue) + len(self._delayed)
+
+    def queued_count(self, user_id: int) -> int:
+        with self._cond:
+            return self._queue.count(user_id) + sum(1 for _, _, job in self._delayed if job.user_id == user_id)
+
+    def queue_info(self, job_id: int) -> Optional[Tuple[int, datetime]]:
+        """1-based queue position and estimated start time of a queued job"""
+        with self._cond:
+            order = self._queue.order()
+            index = next((i for i, job in enumerate(order) if job.id == job_id), None)
+            if index is None:
+                return None
+            ahead = index + len(self._running)
+            waves = 0 if ahead < self.workers else ahead // self.workers
+            wait_seconds = waves * self._avg_job_seconds
+        return index + 1, datetime.utcnow() + timedelta(seconds=wait_seconds)
+
+    def cancel(self, job_id: int) -> bool:
+        """Drop a queued job, or signal a running one to stop; False if this process does not have it"""
+        with self._cond:
+            found = False
+            while self._queue.remove(job_id) is not None:
+                found = True
+            delayed = [entry for entry in self._delayed if entry[2].id != job_id]
+            if len(delayed) != len(self._delayed):
+                self._delayed = delayed
+                heapq.heapify(self._delayed)
+                found = True
+            event = self._cancel_events.get(job_id)
+            if event is not None:
+                event.set()
+                found = True
+            return found
+
+    def _on_status(self, event: dict) -> None:
+        # cancellations may be requested through any backend process
+        if event.get("status") == "cancelled":
+            self.cancel(event["id"])
+
+    def running_job_ids(self) -> Set[int]:
+        with self._cond:
+            return set(self._running)
+
+    def worker_memory(self) -> Dict[str, WorkerMemory]:
+        """Per worker thread: jobs run, RSS after the last one and the peak seen during any"""
+        with self._cond:
+            return {name: replace(stats) for name, stats in self._worker_memory.items()}
+
+    def _can_start(self, user_id: int) -> bool:
+        return self._running_per_user[user_id] < settings.max_concurrent_jobs_per_user
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        self._requeue_pending()
+        if settings.prewarm_downloader:
+            threading.Thread(target=self._prewarm, name="download-prewarm", daemon=True).start()
+        heartbeat = threading.Thread(target=self._heartbeat, name="download-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"download-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _prewarm(self) -> None:
+        """Load yt-dlp off the startup path so the first job does not pay for it"""
+        started = time.monotonic()
+        try:
+            MusicDownloader.prewarm()
+        except Exception as e:
+            self.logger.warning(f"Downloader prewarm failed: {e}")
+            return
+        self.logger.info(f"Downloader prewarmed in {time.monotonic() - started:.2f}s")
+
+    def _reset_stale_claims(self, db) -> list:
+        """Put downloads whose running process stopped sending heartbeats back to pending.
+
+        Claims of other live processes keep fresh heartbeats and are left
+        alone. The update is atomic per row, so only one process takes over
+        each stale claim; returns the rows it took.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=STALE_CLAIM_BEATS * settings.claim_heartbeat_seconds)
+        return db.execute(
+            update(DownloadHistory).where(
+                DownloadHistory.status == "downloading",
+                or_(DownloadHistory.heartbeat_at.is_(None), DownloadHistory.heartbeat_at < cutoff)
+            ).values(status="pending").returning(
+                DownloadHistory.id, DownloadHistory.user_id, DownloadHistory.url,
+                DownloadHistory.priority, DownloadHistory.attempts
+            )
+        ).all()
+
+    def _requeue_pending(self) -> None:
+        """Reload jobs that were queued, or interrupted mid-download, before a restart"""
+        db = self.session_factory()
+        try:
+            self._reset_stale_claims(db)
+            db.commit()
+            rows = db.query(
+                DownloadHistory.id, DownloadHistory.user_id, DownloadHistory.url,
+                DownloadHistory.priority, DownloadHistory.attempts
+            ).filter(DownloadHistory.status == "pending").order_by(DownloadHistory.created_at).all()
+        finally:
+            db.close()
+        for row in rows:
+            self.submit(DownloadJob(
+                id=row.id, user_id=row.user_id, url=row.url, priority=row.priority, attempts=row.attempts or 0
+            ))
+        if rows:
+            self.logger.info(f"Requeued {len(rows)} pending downloads")
+
+    def _heartbeat(self) -> None:
+        """Keep this process's claims fresh, and take over the claims of processes that died"""
+        while not self._stop.wait(settings.claim_heartbeat_seconds):
+            db = self.session_factory()
+            try:
+                running = self.running_job_ids()
+                if running:
+                    # keeping updated_at: a heartbeat is no change for ETags or the changes feed
+                    db.query(DownloadHistory).filter(
+                        DownloadHistory.id.in_(running),
+                        DownloadHistory.status == "downloading"
+                    ).update(
+                        {"heartbeat_at": datetime.utcnow(), "updated_at": DownloadHistory.updated_at},
+                        synchronize_session=False
+                    )
+                rows = self._reset_stale_claims(db)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self.logger.warning(f"Download heartbeat failed: {e}")
+                continue
+            finally:
+                db.close()
+            for row in rows:
+                self.submit(DownloadJob(
+                    id=row.id, user_id=row.user_id, url=row.url, priority=row.priority, attempts=row.attempts or 0
+                ))
+            if rows:
+                self.logger.warning(f"Took over {len(rows)} downloads abandoned by a stopped process")
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._stop.is_set():
+                        return
+                    next_due = self._release_due()
+                    job = self._queue.pop(self._can_start)
+                    if job is not None:
+                        # Park jobs for a paused source instead of burning a worker on them
+                        wait = self.circuit_breaker.acquire(job.source, job.id)
+                        if wait is None:
+                            break
+                        heapq.heappush(self._delayed, (time.monotonic() + wait, next(self._delay_seq), job))
+                        continue
+                    self._cond.wait(timeout=next_due)
+                self._running[job.id] = job
+                self._running_per_user[job.user_id] += 1
+                cancelled = self._cancel_events[job.id] = threading.Event()
+
+            started = time.monotonic()
+            memory = RssSampler()
+            try:
+                with log_context(request_id=job.request_id, job_id=job.id):
+                    try:
+                        self._execute(job, cancelled, memory)
+                    except Exception as e:
+                        self.logger.error(f"Download job {job.id} crashed: {e}", exc_info=True)
+            finally:
+                rss_after = current_rss_bytes()
+                with self._cond:
+                    stats = self._worker_memory.setdefault(threading.current_thread().name, WorkerMemory())
+                    stats.jobs += 1
+                    stats.last_rss_bytes = rss_after
+                    stats.peak_rss_bytes = max(stats.peak_rss_bytes, memory.peak_bytes, rss_after)
+                    del self._running[job.id]
+                    del self._cancel_events[job.id]
+                    self._running_per_user[job.user_id] -= 1
+                    self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * (time.monotonic() - started)
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _publish_status(job: DownloadJob, status: str) -> None:
+        event_bus.publish(DOWNLOAD_STATUS, id=job.id, user_id=job.user_id, status=status)
+
+    def _execute(self, job: DownloadJob, cancelled: Optional[threading.Event] = None,
+                 memory: Optional[RssSampler] = None) -> None:
+        db = self.session_factory()
+        reservations: List[Reservation] = []
+
+        def admit(info: dict) -> None:
+            reservations.append(storage_admission.reserve(job.user_id, info))
+
+        try:
+            # Claim atomically so a job is never run twice
+            now = datetime.utcnow()
+            claimed = db.query(DownloadHistory).filter(
+                DownloadHistory.id == job.id,
+                DownloadHistory.status == "pending"
+            ).update(
+                {"status": "downloading", "download_started_at": now, "heartbeat_at": now},
+                synchronize_session=False
+            )
+            db.commit()
+            # Hold no connection during the transfer: an idle transaction would pin one pooled
+            # connection per running download; the session starts afresh on its next query
+            db.close()
+            if not claimed:
+                return
+            self._publish_status(job, "downloading")
+
+            try:
+                downloader = MusicDownloader(output_dir=settings.output_directory)
+                with content_hasher.download_in_progress():
+                    download_result = downloader.download_audio(
+                        url=job.url, admit=admit, job_id=job.id, cancelled=cancelled, memory=memory
+                    )
+            except DownloadCancelled:
+                # the API already marked the record cancelled; the workspace is gone with the job
+                self.logger.info(f"Download job {job.id} cancelled: {job.url}")
+                return
+            except StorageDeferred as e:
+                # not the job's fault: wait for space without spending an attempt
+                download_record = db.get(DownloadHistory, job.id)
+                download_record.status = "pending"
+                download_record.error_message = str(e)
+                db.commit()
+                self._publish_status(job, "pending")
+                self.submit_later(job, settings.storage_defer_seconds)
+                self.logger.warning(f"Deferred job {job.id} for {settings.storage_defer_seconds:.0f}s: {e}")
+                return
+            except QuotaExceeded as e:
+                self.logger.warning(f"Rejected job {job.id}: {e}")
+                download_result = DownloadResult(success=False, error_message=str(e), error_class=PERMANENT)
+            except Exception as e:
+                self.logger.error(f"Download error for job {job.id}: {job.url} - {e}")
+                download_result = DownloadResult(
+                    success=False, error_message=str(e), error_class=MusicDownloader.classify_error(e)
+                )
+
+            download_record = db.get(DownloadHistory, job.id)
+            if download_record.status == "cancelled":
+                # cancelled after the transfer finished, too late to interrupt it
+                if download_result.success and download_result.file_path:
+                    try:
+                        os.remove(download_result.file_path)
+                    except OSError:
+                        pass
+                self.logger.info(f"Download job {job.id} cancelled: {job.url}")
+                return
+
+            if download_result.success:
+                self.circuit_breaker.record_success(job.source)
+                download_record.status = "completed"
+                download_record.title = download_result.title
+                download_record.file_path = download_result.file_path
+                download_record.artist = download_result.artist
+                download_record.duration = download_result.duration
+                download_record.error_message = None
+                download_record.error_class = None
+                download_record.download_completed_at = datetime.utcnow()
+
+                # Get file size if file exists
+                if os.path.exists(download_result.file_path):
+                    download_record.file_size = os.path.getsize(download_result.file_path)
+
+                record_download_outcome(
+                    db, job.user_id, "completed",
+                    file_size=download_record.file_size, duration=download_record.duration
+                )
+                charge_storage(db, job.user_id, download_record.file_size or 0)
+                record_archive_entry(
+                    db, job.user_id, download_result.extractor, download_result.media_id, download_id=job.id
+                )
+                db.commit()
+                self._publish_status(job, "completed")
+                library_indexer.request_scan()
+
+                write_download_action(
+                    db=db,
+                    user_id=job.user_id,
+                    action="download_completed",
+                    url=job.url,
+                    details={
+                        "download_id": job.id,
+                        "file_path": download_result.file_path,
+                        "title": download_record.title,
+                        "download_seconds": download_result.download_seconds,
+                        "fragment_concurrency": download_result.fragment_concurrency,
+                        "postprocess_seconds": download_result.postprocess_seconds,
+                        "peak_rss_mb": round(memory.peak_bytes / MB, 1) if memory else None,
+                        "rss_growth_mb": round(memory.growth_bytes / MB, 1) if memory else None
+                    },
+                    ip_address=job.ip_address,
+                    user_agent=job.user_agent,
+                    status="success"
+                )
+                self.logger.info(f"Download completed for job {job.id}: {job.url}")
+                return
+
+            error = download_result.error_message or "Download failed"
+            error_class = download_result.error_class or TRANSIENT
+            job.attempts += 1
+            download_record.attempts = job.attempts
+            download_record.error_message = error
+            download_record.error_class = error_class
+
+            # a dead link says nothing about the health of its source, only retryable errors count
+            if error_class in RETRYABLE:
+                self.circuit_breaker.record_failure(job.source)
+
+            if error_class in RETRYABLE and job.attempts < settings.download_max_attempts:
+                delay = backoff_delay(job.attempts, error_class)
+                download_record.status = "pending"
+                db.commit()
+                self._publish_status(job, "pending")
+                self.submit_later(job, delay)
+                self.logger.warning(
+                    f"Download attempt {job.attempts} failed for job {job.id} ({error_class}), "
+                    f"retrying in {delay:.0f}s: {job.url}"
+                )
+                return
+
+            download_record.status = "failed"
+            download_record.download_completed_at = datetime.utcnow()
+            record_download_outcome(db, job.user_id, "failed")
+            db.commit()
+            self._publish_status(job, "failed")
+
+            write_download_action(
+                db=db,
+                user_id=job.user_id,
+                action="download_failed",
+                url=job.url,
+                details={
+                    "download_id": job.id,
+                    "error": error,
+                    "error_class": error_class,
+                    "attempts": job.attempts
+                },
+                ip_address=job.ip_address,
+                user_agent=job.user_agent,
+                status="failed"
+            )
+            self.logger.warning(f"Download failed for job {job.id} after {job.attempts} attempts ({error_class}): {job.url}")
+        finally:
+            # A probe that ended without a verdict (lost claim, cancel, deferral, permanent error,
+            # crash) gives its slot back; for any other job, or after a verdict, this is a no-op
+            self.circuit_breaker.release(job.source, job.id)
+            # only now: a finished file is in the user's counter, so the quota check still sees it
+            for reservation in reservations:
+                storage_admission.release(reservation)
+            db.close()
+
+
+download_scheduler = DownloadScheduler()
+event_bus.subscribe(DOWNLOAD_STATUS, download_scheduler._on_status)
@@ -0,0 +1,74 @@
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..model import DownloadStatsDaily, User
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+_COUNTERS = ("downloads", "failures", "bytes", "duration_seconds")
+
+
+def record_download_outcome(
+    db: Session,
+    user_id: int,
+    status: str,
+    file_size: Optional[int] = None,
+    duration: Optional[float] = None,
+    day: Optional[date] = None
+) -> None:
+    """Add a finished download to its user's daily rollup.
+
+    An upsert incrementing the counters in place, so concurrent workers never
+    lose an update; it joins the caller's transaction and commits with the
+    status change it accounts for.
+    """
+    completed = status == "completed"
+    values = {
+        "user_id": user_id,
+        "day": day or datetime.utcnow().date(),
+        "downloads": 1 if completed else 0,
+        "failures": 0 if completed else 1,
+        "bytes": (file_size or 0) if completed else 0,
+        "duration_seconds": (duration or 0.0) if completed else 0.0,
+    }
+    table = DownloadStatsDaily.__table__
+    statement = _INSERTS[db.get_bind().dialect.name](table).values(**values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.day],
+        set_={name: table.c[name] + statement.excluded[name] for name in _COUNTERS}
+    )
+    db.execute(statement)
+
+
+def _sums():
+    return [func.coalesce(func.sum(getattr(DownloadStatsDaily, name)), 0).label(name) for name in _COUNTERS]
+
+
+def _bucket(row) -> dict:
+    return {name: getattr(row, name) for name in _COUNTERS}
+
+
+def daily_stats(db: Session, since: date, user_id: Optional[int] = None) -> dict:
+    """Per-day series and totals from the rollup table, for one user or everyone"""
+    query = db.query(DownloadStatsDaily.day, *_sums()).filter(DownloadStatsDaily.day >= since)
+    if user_id is not None:
+        query = query.filter(DownloadStatsDaily.user_id == user_id)
+    days = [
+        {"day": row.day, **_bucket(row)}
+        for row in query.group_by(DownloadStatsDaily.day).order_by(DownloadStatsDaily.day)
+    ]
+    totals = {name: sum(day[name] for day in days) for name in _COUNTERS}
+    return {"since": since, "totals": totals, "days": days}
+
+
+def user_totals(db: Session, since: date) -> list:
+    """Totals per user since `since`, busiest first"""
+    rows = db.query(DownloadStatsDaily.user_id, User.username, *_sums()).join(
+        User, User.id == DownloadStatsDaily.user_id
+    ).filter(DownloadStatsDaily.day >= since).group_by(
+        DownloadStatsDaily.user_id, User.username
+    ).order_by(func.sum(DownloadStatsDaily.bytes).desc(), DownloadStatsDaily.user_id).all()
+    return [{"user_id": row.user_id, "username": row.username, **_bucket(row)} for row in rows]
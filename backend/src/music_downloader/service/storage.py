@@ -0,0 +1,132 @@
+import logging
+import shutil
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..config.settings import settings
+from ..model import SessionLocal, User
+
+MB = 1024 * 1024
+
+
+class AdmissionError(Exception):
+    """A download may not start because its estimated size does not fit"""
+
+
+class StorageDeferred(AdmissionError):
+    """Not enough free disk space right now; try again once space is freed"""
+
+
+class QuotaExceeded(AdmissionError):
+    """The download would take the user over their storage quota"""
+
+
+@dataclass
+class Reservation:
+    user_id: int
+    disk_bytes: int  # source and transcoded output exist side by side until the job ends
+    quota_bytes: int  # the transcoded output that stays on the NAS
+
+
+def estimate_download_bytes(info: Dict[str, Any]) -> Tuple[int, int]:
+    """(source bytes, output bytes) for a resolved yt-dlp info dict.
+
+    Uses the selected formats' `filesize`, then `filesize_approx`, then
+    bitrate x duration; the MP3 output is the configured bitrate x duration.
+    """
+    duration = info.get("duration") or 0
+    source = 0
+    for fmt in info.get("requested_formats") or [info]:
+        size = fmt.get("filesize") or fmt.get("filesize_approx")
+        if not size:
+            kbps = fmt.get("abr") or fmt.get("tbr") or 0
+            size = int(kbps * 1000 / 8 * duration)
+        source += size
+    output = int(int(settings.audio_bitrate) * 1000 / 8 * duration)
+    fallback = settings.unknown_size_estimate_mb * MB
+    return source or fallback, output or source or fallback
+
+
+def quota_bytes(user: User) -> Optional[int]:
+    """Effective quota of `user` in bytes; None if unlimited"""
+    quota = user.storage_quota_bytes
+    if quota is None:
+        quota = settings.default_storage_quota_mb * MB
+    return quota or None
+
+
+def over_quota(user: User) -> bool:
+    quota = quota_bytes(user)
+    return quota is not None and (user.storage_used_bytes or 0) >= quota
+
+
+def charge_storage(db: Session, user_id: int, size: int) -> None:
+    """Add a finished file to its user's byte counter, in the caller's transaction"""
+    db.query(User).filter(User.id == user_id).update(
+        {User.storage_used_bytes: User.storage_used_bytes + size}, synchronize_session=False
+    )
+
+
+class StorageAdmission:
+    """Reserves each running download's estimated size against free disk and user quotas.
+
+    Reservations live in this process only; the free space check still sees
+    what other processes have written so far.
+    """
+
+    def __init__(self, path: str = None, session_factory=SessionLocal):
+        self.path = path or settings.output_directory
+        self.session_factory = session_factory
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._reserved_disk = 0
+        self._reserved_quota = Counter()
+
+    def reserved_bytes(self) -> int:
+        with self._lock:
+            return self._reserved_disk
+
+    def reserve(self, user_id: int, info: Dict[str, Any]) -> Reservation:
+        """Reserve room for a resolved download or raise an AdmissionError"""
+        source, output = estimate_download_bytes(info)
+        reservation = Reservation(user_id=user_id, disk_bytes=source + output, quota_bytes=output)
+
+        db = self.session_factory()
+        try:
+            user = db.get(User, user_id)
+            quota = quota_bytes(user) if user else None
+            used = (user.storage_used_bytes or 0) if user else 0
+        finally:
+            db.close()
+
+        with self._lock:
+            if quota is not None and used + self._reserved_quota[user_id] + output > quota:
+                raise QuotaExceeded(
+                    f"Storage quota exceeded: {used // MB} MB used of {quota // MB} MB, "
+                    f"this download needs about {output // MB + 1} MB"
+                )
+            available = (
+                shutil.disk_usage(self.path).free - self._reserved_disk - settings.min_free_disk_mb * MB
+            )
+            if reservation.disk_bytes > available:
+                raise StorageDeferred(
+                    f"Not enough free disk space: need about {reservation.disk_bytes // MB + 1} MB, "
+                    f"{max(0, available) // MB} MB available"
+                )
+            self._reserved_disk += reservation.disk_bytes
+            self._reserved_quota[user_id] += reservation.quota_bytes
+        return reservation
+
+    def release(self, reservation: Reservation) -> None:
+        with self._lock:
+            self._reserved_disk -= reservation.disk_bytes
+            self._reserved_quota[reservation.user_id] -= reservation.quota_bytes
+            if self._reserved_quota[reservation.user_id] <= 0:
+                del self._reserved_quota[reservation.user_id]
+
+
+storage_admission = StorageAdmission()
@@ -0,0 +1,195 @@
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, List
+
+from ..config.settings import settings
+from ..model import SessionLocal, DownloadHistory, Subscription, DownloadArchiveEntry
+from .audit import write_download_action
+from .download_archive import archived_entries
+from .events import event_bus, DOWNLOAD_STATUS
+from .scheduler import download_scheduler, DownloadJob
+from .yt_music import MusicDownloader, PlaylistListing
+
+# Downloads that count as known until they finish and reach the archive
+IN_FLIGHT_STATUSES = ("pending", "downloading")
+
+
+@dataclass
+class SubscriptionCheckResult:
+    """Outcome of one subscription check"""
+    listed: int = 0
+    new: int = 0
+    queued: int = 0
+    seeded: int = 0  # archived without downloading (first check without backfill)
+
+
+class SubscriptionChecker:
+    """Lists due subscriptions with flat extraction and queues entries missing from the archive.
+
+    The archive is keyed by (user, extractor, media id), so a check costs one
+    listing request plus two indexed lookups, however long the channel is.
+    Queued entries are archived when their download completes; until then
+    their pending or running history rows keep them from being queued twice.
+    """
+
+    POLL_SECONDS = 60
+
+    def __init__(self, session_factory=SessionLocal,
+                 lister: Callable[[str, int], PlaylistListing] = MusicDownloader.list_entries):
+        self.session_factory = session_factory
+        self.lister = lister
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check_due(self) -> int:
+        """Check every subscription whose next check time has passed; returns how many ran"""
+        db = self.session_factory()
+        try:
+            due = db.query(Subscription.id, Subscription.next_check_at).filter(
+                Subscription.next_check_at <= datetime.now(timezone.utc)
+            ).order_by(Subscription.next_check_at).all()
+            checked = 0
+            for subscription_id, next_check_at in due:
+                if self._stop.is_set():
+                    break
+                # Claim by moving the next check forward, so only one process runs it
+                claimed = db.query(Subscription).filter(
+                    Subscription.id == subscription_id,
+                    Subscription.next_check_at == next_check_at
+                ).update(
+                    {"next_check_at": datetime.now(timezone.utc)
+                        + timedelta(seconds=settings.subscription_check_interval_seconds)},
+                    synchronize_session=False
+                )
+                db.commit()
+                if not claimed:
+                    continue
+                try:
+                    self.check(db, db.get(Subscription, subscription_id))
+                except Exception as e:
+                    # e.g. another subscription queued the same video concurrently; retried next time
+                    db.rollback()
+                    self.logger.error(f"Checking subscription {subscription_id} failed: {e}", exc_info=True)
+                checked += 1
+            return checked
+        finally:
+            db.close()
+
+    def check(self, db, subscription: Subscription) -> SubscriptionCheckResult:
+        result = SubscriptionCheckResult()
+        try:
+            listing = self.lister(subscription.url, settings.subscription_max_entries)
+            # listings stream their entries, so paging errors surface here
+            entries = {(entry.extractor, entry.media_id): entry for entry in listing.entries}
+        except Exception as e:
+            self.logger.warning(f"Listing subscription {subscription.id} failed: {subscription.url} - {e}")
+            subscription.last_error = str(e)[:2000]
+            subscription.last_checked_at = datetime.now(timezone.utc)
+            db.commit()
+            return result
+
+        result.listed = len(entries)
+        known = set()
+        if entries:
+            known.update(archived_entries(
+                db, subscription.user_id, DownloadArchiveEntry.extractor, DownloadArchiveEntry.media_id
+            ).filter(DownloadArchiveEntry.media_id.in_([media_id for _, media_id in entries])).all())
+            # queued or running: archived only once they complete, so a failure can be retried
+            keys_by_url = {entry.url: key for key, entry in entries.items()}
+            in_flight = db.query(DownloadHistory.url).filter(
+                DownloadHistory.user_id == subscription.user_id,
+                DownloadHistory.status.in_(IN_FLIGHT_STATUSES),
+                DownloadHistory.url.in_(list(keys_by_url))
+            )
+            known.update(keys_by_url[url] for (url,) in in_flight)
+        new = [entry for key, entry in entries.items() if key not in known]
+        result.new = len(new)
+
+        seed_only = subscription.last_checked_at is None and not subscription.backfill
+        room = settings.max_queued_jobs_per_user - download_scheduler.queued_count(subscription.user_id)
+        jobs: List[DownloadJob] = []
+        # listings are newest first; queue oldest first so history reads chronologically
+        for entry in reversed(new):
+            if seed_only:
+                # there before the subscription: archived without downloading
+                db.add(DownloadArchiveEntry(
+                    user_id=subscription.user_id,
+                    extractor=entry.extractor,
+                    media_id=entry.media_id,
+                    subscription_id=subscription.id
+                ))
+                continue
+            if room <= 0:
+                break  # not queued, so the next check picks them up
+            record = DownloadHistory(
+                user_id=subscription.user_id,
+                url=entry.url,
+                title=entry.title[:500] if entry.title else None,
+                status="pending",
+                priority=subscription.priority
+            )
+            db.add(record)
+            db.flush()
+            jobs.append(DownloadJob(
+                id=record.id, user_id=subscription.user_id, url=entry.url, priority=subscription.priority
+            ))
+            room -= 1
+        result.queued = len(jobs)
+        result.seeded = len(new) if seed_only else 0
+
+        if listing.title:
+            subscription.title = listing.title[:500]
+        subscription.last_error = None
+        subscription.last_checked_at = datetime.now(timezone.utc)
+        db.commit()
+
+        for job in jobs:
+            download_scheduler.submit(job)
+            event_bus.publish(DOWNLOAD_STATUS, id=job.id, user_id=job.user_id, status="pending")
+        if jobs:
+            write_download_action(
+                db=db,
+                user_id=subscription.user_id,
+                action="subscription_queued",
+                url=subscription.url,
+                details={"subscription_id": subscription.id, "download_ids": [job.id for job in jobs]}
+            )
+        self.logger.info(
+            f"Checked subscription {subscription.id}: {result.listed} listed, {result.new} new, "
+            f"{result.queued} queued, {result.seeded} archived without download"
+        )
+        return result
+
+    def request_check(self) -> None:
+        """Wake the background loop to check due subscriptions now"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="subscription-checker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.check_due()
+            except Exception as e:
+                self.logger.error(f"Subscription check failed: {e}", exc_info=True)
+            self._wakeup.wait(self.POLL_SECONDS)
+            self._wakeup.clear()
+
+
+subscription_checker = SubscriptionChecker()
@@ -1,12 +1,68 @@
-import yt_dlp
+import itertools
 import logging
+import os
 import re
-from datetime import datetime
-from typing import Optional, Dict, Any
+import shutil
+import tempfile
+import threading
+from typing import Optional, Dict, Any, List, Callable, Iterable, Iterator
 from pathlib import Path
 from dataclasses import dataclass
 
 from ..config.settings import settings
+from ..config.logging_config import YTDLP_LOGGER
+from .retry import TRANSIENT, RATE_LIMITED, EXTRACTOR, PERMANENT
+from .ffmpeg import postprocess_audio, ProcessCancelled
+from .storage import AdmissionError, MB
+from .memory import RssSampler
+from .fragments import fragment_tuner, FragmentLease
+
+THUMBNAIL_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+# Per-job workspaces under the output directory; hidden, so the library indexer skips them
+JOBS_DIRECTORY = ".jobs"
+
+# Lower-cased message fragments, checked in this order
+_RATE_LIMIT_MARKERS = ("http error 429", "too many requests", "rate-limit", "rate limit", "not a bot")
+_PERMANENT_MARKERS = (
+    "video unavailable", "private video", "has been removed", "not available in your country",
+    "unsupported url", "members-only", "confirm your age", "is not a valid url", "copyright",
+    "account associated with this video has been terminated", "premieres in", "live event will begin",
+)
+_EXTRACTOR_MARKERS = (
+    "unable to extract", "signature extraction failed", "nsig extraction failed",
+    "failed to extract", "requested format is not available", "please report this issue",
+)
+# Info dict tables nothing reads once formats are chosen; YouTube's caption tables alone are thousands of dicts
+_UNUSED_INFO_KEYS = ("formats", "automatic_captions", "subtitles", "heatmap", "_format_sort_fields")
+# Redirects followed while resolving a playlist URL without processing it
+_MAX_LISTING_REDIRECTS = 3
+
+class DownloadCancelled(Exception):
+    """The download was stopped through its cancel event"""
+
+class YtDlpLogger:
+    """Sends yt-dlp output to the "yt_dlp" logger, where chatter below WARNING is sampled"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(YTDLP_LOGGER)
+
+    def debug(self, msg: str) -> None:
+        # yt-dlp passes its screen output through debug() as well
+        if msg.startswith('[debug] '):
+            self.logger.debug(msg)
+        else:
+            self.logger.info(msg)
+
+    def info(self, msg: str) -> None:
+        self.logger.info(msg)
+
+    def warning(self, msg: str) -> None:
+        self.logger.warning(msg)
+
+    def error(self, msg: str) -> None:
+        self.logger.error(msg)
+
+ytdlp_logger = YtDlpLogger()
 
 @dataclass
 class DownloadResult:
@@ -18,6 +74,52 @@ class DownloadResult:
     duration: Optional[float] = None
     file_size: Optional[int] = None
     error_message: Optional[str] = None
+    error_class: Optional[str] = None  # see service.retry
+    postprocess_seconds: Optional[float] = None  # time spent in the ffmpeg pass
+    download_seconds: Optional[float] = None  # time spent transferring media
+    fragment_concurrency: Optional[int] = None  # fragments fetched in parallel, for HLS/DASH sources
+    extractor: Optional[str] = None  # lower-cased yt-dlp extractor key, for the download archive
+    media_id: Optional[str] = None  # id within the extractor
+
+@dataclass(slots=True)
+class TrackMetadata:
+    """The part of a resolved info dict that tagging and the download record use"""
+    title: str = ''
+    artist: str = ''
+    duration: Optional[float] = None  # in seconds
+    upload_date: Optional[str] = None
+    album: Optional[str] = None  # set by music extractors such as YouTube Music
+    release_year: Optional[int] = None
+    webpage_url: Optional[str] = None
+    extractor: Optional[str] = None  # lower-cased yt-dlp extractor key
+    media_id: Optional[str] = None
+
+    @classmethod
+    def from_info(cls, info: Dict[str, Any]) -> "TrackMetadata":
+        return cls(
+            title=(info.get('title') or '').strip(),
+            artist=(info.get('uploader') or '').strip() or (info.get('creator') or '').strip(),
+            duration=info.get('duration'),
+            upload_date=info.get('upload_date'),
+            album=info.get('album'),
+            release_year=info.get('release_year'),
+            webpage_url=info.get('webpage_url'),
+            extractor=(info.get('extractor_key') or '').lower() or None,
+            media_id=str(info['id']) if info.get('id') is not None else None,
+        )
+
+@dataclass
+class PlaylistEntry:
+    """One item of a flat (entries-only) playlist or channel listing"""
+    extractor: str  # lower-cased yt-dlp extractor key, as in a download_archive file
+    media_id: str
+    url: str
+    title: Optional[str] = None
+
+@dataclass
+class PlaylistListing:
+    title: Optional[str]
+    entries: Iterable[PlaylistEntry]  # may be lazy: pages are fetched while it is iterated, once
 
 class MusicDownloader:
     def __init__(self, output_dir: str = None):
@@ -38,93 +140,314 @@ class MusicDownloader:
             filename = filename[:200] + "..."
         return filename
     
-    def _extract_metadata(self, info: Dict[str, Any]) -> Dict[str, Any]:
+    def _reserve_final_path(self, sanitized_name: str) -> Path:
+        """Claim a free name in the output directory by creating it empty with O_EXCL.
+
+        Checking exists() first would let two jobs for the same title pick
+        the same name, and the second move would replace the first file.
+        """
+        name_part = sanitized_name.rsplit('.', 1)[0]
+        for counter in itertools.count():
+            final_path = self.output_dir / (sanitized_name if counter == 0 else f"{name_part}_{counter}.mp3")
+            try:
+                os.close(os.open(final_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            except FileExistsError:
+                continue
+            return final_path
+
+    def _extract_metadata(self, info: Dict[str, Any]) -> TrackMetadata:
+        return TrackMetadata.from_info(info)
+
+    @staticmethod
+    def _release_unused_info(info: Dict[str, Any]) -> None:
+        """Empty the bulky tables of a resolved info dict in place.
+
+        yt-dlp hands filters a shallow copy, so clearing the shared lists and
+        dicts frees them for the rest of the download; the selected formats
+        live on in the copy itself and in `requested_formats`.
+        """
+        for key in _UNUSED_INFO_KEYS:
+            value = info.get(key)
+            if isinstance(value, (list, dict)):
+                value.clear()
+
+    @staticmethod
+    def _id3_tags(metadata: TrackMetadata) -> Dict[str, Optional[str]]:
+        upload_date = metadata.upload_date or ''
+        year = metadata.release_year or upload_date[:4]
         return {
-            'title': info.get('title', '').strip(),
-            'artist': info.get('uploader', '').strip() or info.get('creator', '').strip(),
-            'duration': info.get('duration'),  # in seconds
-            'description': info.get('description', ''),
-            'upload_date': info.get('upload_date'),
-            'view_count': info.get('view_count'),
-            'webpage_url': info.get('webpage_url'),
+            'title': metadata.title,
+            'artist': metadata.artist,
+            'album': metadata.album,
+            'date': str(year) if year else None,
         }
-    
-    def download_audio(self, url: str) -> DownloadResult:
+
+    @staticmethod
+    def _find_downloaded_file(download_dir: Path, info: Dict[str, Any]) -> Optional[Path]:
+        for download in info.get('requested_downloads') or []:
+            filepath = download.get('filepath')
+            if filepath and Path(filepath).is_file():
+                return Path(filepath)
+        candidates = [
+            path for path in download_dir.iterdir()
+            if path.suffix.lower() not in THUMBNAIL_EXTENSIONS and path.suffix != '.part'
+        ]
+        return candidates[0] if candidates else None
+
+    @staticmethod
+    def prewarm() -> None:
+        """Import yt-dlp and its YouTube extractor ahead of the first job"""
+        import yt_dlp
+
+        with yt_dlp.YoutubeDL({'quiet': True, 'logger': ytdlp_logger}) as ydl:
+            ydl.get_info_extractor('Youtube')
+
+    @staticmethod
+    def list_entries(url: str, limit: int) -> PlaylistListing:
+        """List the first `limit` entries of a playlist or channel without resolving them.
+
+        The playlist is not processed: its entries are read lazily while the
+        returned listing is iterated, so only the pages holding the first
+        `limit` entries are requested and no entry list is built up front.
+        Channels list their newest uploads first.
+        """
+        import yt_dlp
+        from yt_dlp.utils import PagedList
+
+        ydl = yt_dlp.YoutubeDL({'quiet': True, 'logger': ytdlp_logger, 'skip_download': True})
         try:
-            # Create unique subdirectory for this download
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            download_dir = self.output_dir / f"download_{timestamp}"
-            download_dir.mkdir(exist_ok=True)
+            info = ydl.extract_info(url, download=False, process=False) or {}
+            for _ in range(_MAX_LISTING_REDIRECTS):
+                if info.get('_type') not in ('url', 'url_transparent'):
+                    break
+                info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key')) or {}
+        except Exception:
+            ydl.close()
+            raise
+
+        extractor_key = info.get('extractor_key')
+
+        def entries() -> Iterator[PlaylistEntry]:
+            with ydl:
+                raw = info.get('entries') or []
+                raw = raw.getslice(0, limit) if isinstance(raw, PagedList) else itertools.islice(raw, limit)
+                for entry in raw:
+                    if not entry or not entry.get('id') or entry.get('_type') == 'playlist':
+                        continue
+                    # e.g. the Videos/Shorts tabs of a channel root URL; subscribe to a tab instead
+                    if entry.get('ie_key') and entry.get('ie_key') == extractor_key:
+                        continue
+                    extractor = entry.get('ie_key') or extractor_key or 'generic'
+                    yield PlaylistEntry(
+                        extractor=extractor.lower(),
+                        media_id=str(entry['id']),
+                        url=entry.get('webpage_url') or entry.get('url') or url,
+                        title=entry.get('title'),
+                    )
+
+        return PlaylistListing(title=info.get('title'), entries=entries())
+
+    @staticmethod
+    def classify_error(error: Exception) -> str:
+        """Map a yt-dlp or runtime failure to a retry class"""
+        import yt_dlp
+        from yt_dlp.utils import ExtractorError, UnsupportedError, GeoRestrictedError
+        from yt_dlp.networking.exceptions import HTTPError, TransportError
+
+        causes = []
+        cause = error.exc_info[1] if isinstance(error, yt_dlp.DownloadError) and error.exc_info else error
+        while cause is not None and cause not in causes:
+            causes.append(cause)
+            cause = getattr(cause, "cause", None) or cause.__cause__
+
+        for cause in causes:
+            if isinstance(cause, HTTPError):
+                if cause.status == 429:
+                    return RATE_LIMITED
+                if cause.status >= 500:
+                    return TRANSIENT
+                # YouTube answers 403 when its player changes and signatures go stale
+                return EXTRACTOR if cause.status == 403 else PERMANENT
+            if isinstance(cause, (TransportError, TimeoutError, ConnectionError)):
+                return TRANSIENT
+            if isinstance(cause, (UnsupportedError, GeoRestrictedError)):
+                return PERMANENT
+
+        message = str(error).lower()
+        if any(marker in message for marker in _RATE_LIMIT_MARKERS):
+            return RATE_LIMITED
+        if any(marker in message for marker in _PERMANENT_MARKERS):
+            return PERMANENT
+        if any(marker in message for marker in _EXTRACTOR_MARKERS):
+            return EXTRACTOR
+        if any(isinstance(cause, ExtractorError) for cause in causes):
+            return PERMANENT if any(getattr(cause, "expected", False) for cause in causes) else EXTRACTOR
+        return TRANSIENT
+
+    def job_workspace(self, job_id: int) -> Path:
+        return self.output_dir / JOBS_DIRECTORY / str(job_id)
+
+    def download_audio(
+        self,
+        url: str,
+        admit: Optional[Callable[[Dict[str, Any]], None]] = None,
+        job_id: Optional[int] = None,
+        cancelled: Optional[threading.Event] = None,
+        memory: Optional[RssSampler] = None
+    ) -> DownloadResult:
+        """Download `url` as a tagged MP3 in the output directory.
+
+        Intermediate files live in a workspace of their own, `.jobs/<job_id>`,
+        which is removed however the download ends. `admit` is called once with
+        the resolved info dict after format selection, before any media is
+        fetched; an AdmissionError it raises propagates. Setting `cancelled`
+        stops the transfer at its next progress update, or kills ffmpeg,
+        and raises DownloadCancelled.
+
+        Right after format selection the info dict is reduced to a
+        TrackMetadata record and its bulky tables are released, and the
+        fragment tuner sets the job's fragment concurrency and rate limit;
+        `memory`, if given, samples process RSS as the job progresses.
+        """
+        # Deferred: yt-dlp pulls in hundreds of extractor modules, only workers need them
+        import yt_dlp
+
+        def is_cancelled() -> bool:
+            return cancelled is not None and cancelled.is_set()
+
+        lease: Optional[FragmentLease] = None
+
+        def progress_hook(progress: Dict[str, Any]) -> None:
+            if memory is not None:
+                memory.sample()
+            if lease is not None and progress.get('status') == 'finished':
+                lease.downloaded_bytes += progress.get('total_bytes') or progress.get('downloaded_bytes') or 0
+                lease.download_seconds += progress.get('elapsed') or 0
+            if is_cancelled():
+                raise yt_dlp.utils.DownloadCancelled("Download cancelled")
+
+        rejections: List[AdmissionError] = []
+        selected: List[TrackMetadata] = []
+
+        def match_filter(info: Dict[str, Any], *, incomplete: bool) -> Optional[str]:
+            nonlocal lease
+            if incomplete:
+                return None
+            if selected:
+                # a playlist or channel URL: a job is one track, and only the first one was admitted
+                return "Only the first entry of a playlist is downloaded"
+            # formats are chosen by now: keep what tagging needs, let go of the rest
+            selected.append(self._extract_metadata(info))
+            self._release_unused_info(info)
+            if memory is not None:
+                memory.sample(force=True)
+            if admit is not None:
+                try:
+                    admit(info)
+                except AdmissionError as e:
+                    rejections.append(e)
+                    return str(e)  # yt-dlp skips the download
+            if lease is None:
+                # the downloader reads these from the shared params when it is created, right after this
+                lease = fragment_tuner.acquire(info)
+                ydl.params['concurrent_fragment_downloads'] = lease.concurrency
+                if lease.rate_limit:
+                    ydl.params['ratelimit'] = lease.rate_limit
+            return None
+
+        download_dir = None
+        try:
+            if job_id is not None:
+                download_dir = self.job_workspace(job_id)
+                # leftovers of an interrupted earlier attempt of this job
+                shutil.rmtree(download_dir, ignore_errors=True)
+                download_dir.mkdir(parents=True)
+            else:
+                (self.output_dir / JOBS_DIRECTORY).mkdir(exist_ok=True)
+                download_dir = Path(tempfile.mkdtemp(prefix="download_", dir=self.output_dir / JOBS_DIRECTORY))
             
-            # Configure yt-dlp options
+            # Configure yt-dlp options; all post-processing happens in one ffmpeg pass below
             ydl_opts = {
                 'format': 'bestaudio/best',
                 'outtmpl': str(download_dir / '%(title)s.%(ext)s'),
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
+                'writethumbnail': True,
                 'quiet': True,
                 'no_warnings': False,
+                'noprogress': True,  # progress goes to the hooks, not the log
+                'logger': ytdlp_logger,
                 'noplaylist': True,
-                'extractaudio': True,
-                'audioformat': 'mp3',
                 'embed_subs': False,
                 'writesubtitles': False,
                 'writeautomaticsub': False,
+                'match_filter': match_filter,
+                'progress_hooks': [progress_hook],
             }
             
-            # Download and extract info
+            # Extract info and download in one go, so the page is only resolved once
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Extract info first
-                info = ydl.extract_info(url, download=False)
+                info = ydl.extract_info(url, download=True)
+                if rejections:
+                    raise rejections[0]
                 if not info:
                     return DownloadResult(
                         success=False,
-                        error_message="Could not extract video information"
+                        error_message="Could not extract video information",
+                        error_class=EXTRACTOR
                     )
                 
-                # Extract metadata
-                metadata = self._extract_metadata(info)
-                self.logger.info(f"Downloading: {metadata['title']} by {metadata['artist']}")
-                
-                # Perform download
-                ydl.download([url])
+                metadata = selected[0] if selected else self._extract_metadata(info)
+                audio_file = self._find_downloaded_file(download_dir, info)
+                info = None  # only the compact record stays alive through post-processing
+                self.logger.info(f"Downloaded: {metadata.title} by {metadata.artist}")
+                if lease is not None and lease.throughput:
+                    self.logger.info(
+                        f"Transferred {lease.downloaded_bytes / MB:.1f} MB in {lease.download_seconds:.1f}s "
+                        f"({lease.throughput / MB:.2f} MB/s, {lease.concurrency} fragment connections)"
+                    )
                 
-                # Find the downloaded MP3 file
-                mp3_files = list(download_dir.glob("*.mp3"))
-                if not mp3_files:
+                if audio_file is None:
                     return DownloadResult(
                         success=False,
-                        error_message="No MP3 file found after download"
+                        error_message="No audio file found after download",
+                        error_class=PERMANENT
                     )
+                cover = next(
+                    (path for path in download_dir.iterdir() if path.suffix.lower() in THUMBNAIL_EXTENSIONS),
+                    None
+                )
                 
-                # Get the first (and should be only) MP3 file
-                output_file = mp3_files[0]
-                
-                # Sanitize filename and move to final location
-                sanitized_name = self._sanitize_filename(f"{metadata['title']}.mp3")
-                final_path = self.output_dir / sanitized_name
-                
-                # Handle filename conflicts
-                counter = 1
-                while final_path.exists():
-                    name_part = sanitized_name.rsplit('.', 1)[0]
-                    final_path = self.output_dir / f"{name_part}_{counter}.mp3"
-                    counter += 1
-                
-                # Move file to final location
-                output_file.rename(final_path)
+                # Transcode, tag, embed cover art and normalize in a single pass
+                processed = download_dir / "processed.mp3"
+                tags = self._id3_tags(metadata)
+                if is_cancelled():
+                    raise DownloadCancelled("Download cancelled")
+                try:
+                    postprocess_seconds = postprocess_audio(
+                        str(audio_file), str(processed), tags, cover=str(cover) if cover else None,
+                        loudnorm=settings.loudness_normalization, bitrate=settings.audio_bitrate,
+                        cancelled=cancelled
+                    )
+                except RuntimeError as e:
+                    if cover is None:
+                        raise
+                    # a broken thumbnail must not cost us the track
+                    self.logger.warning(f"Post-processing with cover art failed, retrying without: {e}")
+                    postprocess_seconds = postprocess_audio(
+                        str(audio_file), str(processed), tags, cover=None,
+                        loudnorm=settings.loudness_normalization, bitrate=settings.audio_bitrate,
+                        cancelled=cancelled
+                    )
+                self.logger.info(f"Post-processed {metadata.title} in {postprocess_seconds:.2f}s")
+                if memory is not None:
+                    memory.sample(force=True)
                 
-                # Clean up temporary directory
+                # Move the file over a freshly reserved name; the workspace is on the same filesystem
+                final_path = self._reserve_final_path(self._sanitize_filename(f"{metadata.title}.mp3"))
                 try:
-                    download_dir.rmdir()
+                    os.replace(processed, final_path)
                 except OSError:
-                    # Directory not empty, clean up remaining files
-                    for file in download_dir.iterdir():
-                        file.unlink()
-                    download_dir.rmdir()
+                    final_path.unlink(missing_ok=True)
+                    raise
                 
                 # Get file size
                 file_size = final_path.stat().st_size if final_path.exists() else None
@@ -134,21 +457,42 @@ class MusicDownloader:
                 return DownloadResult(
                     success=True,
                     file_path=str(final_path),
-                    title=metadata['title'],
-                    artist=metadata['artist'],
-                    duration=metadata['duration'],
-                    file_size=file_size
+                    title=metadata.title,
+                    artist=metadata.artist,
+                    duration=metadata.duration,
+                    file_size=file_size,
+                    postprocess_seconds=postprocess_seconds,
+                    download_seconds=round(lease.download_seconds, 3) if lease else None,
+                    fragment_concurrency=lease.concurrency if lease and lease.fragmented else None,
+                    extractor=metadata.extractor,
+                    media_id=metadata.media_id
                 )
                 
+        except (AdmissionError, DownloadCancelled):
+            raise
+
+        except (ProcessCancelled, yt_dlp.utils.DownloadCancelled) as e:
+            raise DownloadCancelled(str(e)) from e
+
         except yt_dlp.DownloadError as e:
+            if is_cancelled():
+                # a downloader may have wrapped our cancellation
+                raise DownloadCancelled("Download cancelled") from e
             error_msg = f"Download failed: {str(e)}"
             self.logger.error(error_msg)
-            return DownloadResult(success=False, error_message=error_msg)
+            return DownloadResult(success=False, error_message=error_msg, error_class=self.classify_error(e))
             
         except Exception as e:
             error_msg = f"Unexpected error during download: {str(e)}"
             self.logger.error(error_msg, exc_info=True)
-            return DownloadResult(success=False, error_message=error_msg)
+            return DownloadResult(success=False, error_message=error_msg, error_class=self.classify_error(e))
+
+        finally:
+            if lease is not None:
+                fragment_tuner.release(lease)
+            # partial media and thumbnails never outlive the job
+            if download_dir is not None:
+                shutil.rmtree(download_dir, ignore_errors=True)
 
 # For testing
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+import io
+import tarfile
+import zipfile
+
+from music_downloader.service import archive
+from music_downloader.service.archive import stream_tar, stream_zip, unique_entries
+
+
+def _make_files(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    song = tmp_path / "a" / "song.mp3"
+    song.write_bytes(b"x" * 1000)
+    other = tmp_path / "b" / "song.mp3"
+    other.write_bytes(b"y" * 10)
+    wav = tmp_path / "b" / "raw.wav"
+    wav.write_bytes(b"\0" * 5000)
+    return unique_entries([str(song), str(other), str(wav), str(tmp_path / "missing.mp3")])
+
+
+def test_zip_stores_audio_and_streams_in_chunks(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(archive, "CHUNK_SIZE", 64)
+    chunks = list(stream_zip(_make_files(tmp_path)))
+    assert max(len(chunk) for chunk in chunks) < 1000
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.namelist() == ["song.mp3", "song_1.mp3", "raw.wav"]
+        assert zf.getinfo("song.mp3").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("raw.wav").compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read("song.mp3") == b"x" * 1000
+        assert zf.read("song_1.mp3") == b"y" * 10
+
+
+def test_tar_round_trips(tmp_path) -> None:
+    data = b"".join(stream_tar(_make_files(tmp_path)))
+
+    with tarfile.open(fileobj=io.BytesIO(data)) as tf:
+        assert tf.getnames() == ["song.mp3", "song_1.mp3", "raw.wav"]
+        assert tf.extractfile("song_1.mp3").read() == b"y" * 10
@@ -0,0 +1,98 @@
+import shutil
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from music_downloader.app import app
+from music_downloader.auth import get_current_active_user
+from music_downloader.config.settings import settings
+from music_downloader.model import DownloadHistory
+from music_downloader.service import scheduler as scheduler_module
+from music_downloader.service.ffmpeg import ProcessCancelled, _run_ffmpeg
+from music_downloader.service.scheduler import DownloadScheduler
+from music_downloader.service.yt_music import DownloadCancelled
+
+
+def _wait_for(predicate, timeout=5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_running_job_stops_and_frees_its_worker(session_factory, monkeypatch) -> None:
+    started = threading.Event()
+
+    class SlowDownloader:
+        def __init__(self, output_dir=None):
+            pass
+
+        def download_audio(self, url, admit=None, job_id=None, cancelled=None, memory=None):
+            started.set()
+            # stands in for yt-dlp calling the progress hook between chunks
+            while not cancelled.wait(0.05):
+                pass
+            raise DownloadCancelled("Download cancelled")
+
+    monkeypatch.setattr(scheduler_module, "MusicDownloader", SlowDownloader)
+    db = session_factory()
+    db.add(DownloadHistory(id=1, user_id=1, url="https://example.com/live", status="pending"))
+    db.commit()
+
+    monkeypatch.setattr(settings, "prewarm_downloader", False)
+    scheduler = DownloadScheduler(workers=1, session_factory=session_factory)
+    scheduler.start()  # picks the pending record up from the database
+    try:
+        assert started.wait(5)
+        assert scheduler.running_job_ids() == {1}
+
+        # what DELETE /api/downloads/1 does before the event reaches the scheduler
+        db.query(DownloadHistory).filter(DownloadHistory.id == 1).update({"status": "cancelled"})
+        db.commit()
+        assert scheduler.cancel(1)
+        _wait_for(lambda: not scheduler.running_job_ids(), timeout=1.0)
+    finally:
+        scheduler.stop()
+
+    db.expire_all()
+    assert db.get(DownloadHistory, 1).status == "cancelled"
+    db.close()
+    # the worker's memory is tracked however its job ended
+    memory = scheduler.worker_memory()["download-worker-0"]
+    assert memory.jobs == 1 and memory.peak_rss_bytes >= memory.last_rss_bytes > 0
+
+
+def test_batch_cancel_skips_finished_and_foreign_downloads(client, session_factory) -> None:
+    db = session_factory()
+    db.add_all([
+        DownloadHistory(id=1, user_id=1, url="u", status="pending"),
+        DownloadHistory(id=2, user_id=1, url="u", status="downloading"),
+        DownloadHistory(id=3, user_id=1, url="u", status="completed"),
+        DownloadHistory(id=4, user_id=2, url="u", status="pending"),
+    ])
+    db.commit()
+    db.close()
+
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id=1, username="alice")
+    response = client.post("/api/downloads/cancel", json={"ids": [1, 2, 3, 4, 99]})
+    assert response.json() == {"cancelled": [1, 2]}
+    assert client.delete("/api/downloads/3").status_code == 409
+    assert client.delete("/api/downloads/4").status_code == 404
+
+    db = session_factory()
+    assert [row.status for row in db.query(DownloadHistory).order_by(DownloadHistory.id)] == [
+        "cancelled", "cancelled", "completed", "pending"
+    ]
+    db.close()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_ffmpeg_is_killed_on_cancel() -> None:
+    cancelled = threading.Event()
+    threading.Timer(0.3, cancelled.set).start()
+    started = time.monotonic()
+    with pytest.raises(ProcessCancelled):
+        _run_ffmpeg(["ffmpeg", "-nostdin", "-re", "-f", "lavfi", "-i", "sine=duration=30", "-f", "null", "-"], cancelled)
+    assert time.monotonic() - started < 1.5
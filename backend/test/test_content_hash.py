@@ -0,0 +1,55 @@
+import hashlib
+import os
+import time
+
+from music_downloader.model import LibraryTrack
+from music_downloader.service.content_hash import ContentHasher, deduplicate, find_duplicates
+
+
+def _add_tracks(session_factory, tmp_path, contents) -> None:
+    db = session_factory()
+    for name, data in contents.items():
+        path = tmp_path / name
+        path.write_bytes(data)
+        st = os.stat(path)
+        db.add(LibraryTrack(path=str(path), directory=str(tmp_path), size=st.st_size, mtime_ns=st.st_mtime_ns))
+    db.commit()
+    db.close()
+
+
+def test_hashes_pending_tracks_and_links_duplicates(tmp_path, session_factory) -> None:
+    _add_tracks(session_factory, tmp_path, {"a.mp3": b"same", "b.mp3": b"same", "c.mp3": b"other"})
+
+    assert ContentHasher(workers=2, session_factory=session_factory).hash_pending() == 3
+
+    db = session_factory()
+    groups = find_duplicates(db)
+    assert list(groups) == [hashlib.sha256(b"same").hexdigest()]
+    assert [os.path.basename(t.path) for t in groups[hashlib.sha256(b"same").hexdigest()]] == ["a.mp3", "b.mp3"]
+
+    preview = deduplicate(db, mode="hardlink", dry_run=True)
+    assert (preview.files_linked, preview.bytes_reclaimed) == (1, 4)
+    assert os.stat(tmp_path / "a.mp3").st_ino != os.stat(tmp_path / "b.mp3").st_ino
+
+    result = deduplicate(db, mode="hardlink", dry_run=False)
+    assert result.files_linked == 1
+    assert os.stat(tmp_path / "a.mp3").st_ino == os.stat(tmp_path / "b.mp3").st_ino
+    assert deduplicate(db, dry_run=True).files_linked == 0
+    db.close()
+
+
+def test_hasher_catches_up_on_start_without_a_scan(tmp_path, session_factory) -> None:
+    # tracks indexed before hashing existed, or left unhashed when the process died
+    _add_tracks(session_factory, tmp_path, {"old.mp3": b"indexed long ago"})
+    hasher = ContentHasher(workers=1, session_factory=session_factory)
+    hasher.start()
+    try:
+        deadline = time.monotonic() + 5
+        db = session_factory()
+        while db.query(LibraryTrack).filter(LibraryTrack.content_hash.is_(None)).count():
+            assert time.monotonic() < deadline, "track was never hashed"
+            time.sleep(0.02)
+            db.expire_all()
+        db.close()
+    finally:
+        hasher.stop()
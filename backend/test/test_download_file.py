@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+import tarfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+
+from music_downloader.app import app
+from music_downloader.auth import (
+    create_access_token, create_media_token, get_current_active_user, get_current_media_user, get_current_user
+)
+from music_downloader.config.settings import settings
+from music_downloader.model import DownloadHistory, User
+from music_downloader.schema.download import DownloadHistoryResponse
+
+
+@pytest.fixture
+def client(client, tmp_path, db_session, monkeypatch):
+    music_dir = tmp_path / "music"
+    music_dir.mkdir()
+    track = music_dir / "song.mp3"
+    track.write_bytes(bytes(range(256)) * 4)
+    outside = tmp_path / "secret.mp3"
+    outside.write_bytes(b"secret")
+
+    db_session.add_all([
+        DownloadHistory(id=1, user_id=1, url="u", status="completed", file_path=str(track)),
+        DownloadHistory(id=2, user_id=2, url="u", status="completed", file_path=str(track)),
+        DownloadHistory(id=3, user_id=1, url="u", status="completed", file_path=str(outside)),
+    ])
+    db_session.commit()
+
+    monkeypatch.setattr(settings, "output_directory", str(music_dir))
+    app.dependency_overrides[get_current_media_user] = lambda: SimpleNamespace(id=1)
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id=1)
+    return client
+
+
+def test_serves_range_and_revalidates(client) -> None:
+    response = client.get("/api/downloads/1/file")
+    assert response.status_code == 200
+    assert len(response.content) == 1024
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-disposition"].startswith("inline")
+
+    partial = client.get("/api/downloads/1/file", headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == bytes(range(10, 20))
+
+    etag = response.headers["etag"]
+    cached = client.get("/api/downloads/1/file", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+def test_rejects_foreign_and_out_of_tree_files(client) -> None:
+    assert client.get("/api/downloads/2/file").status_code == 404
+    assert client.get("/api/downloads/3/file").status_code == 404
+
+
+def test_media_urls_take_only_path_scoped_tokens(client) -> None:
+    db = client.session_factory()
+    db.add(User(id=1, username="alice", email="alice@example.com", hashed_password="x"))
+    db.commit()
+    db.close()
+    del app.dependency_overrides[get_current_media_user]
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, username="alice")
+
+    issued = client.post("/auth/media-token", json={"path": "/api/downloads/1/file"})
+    assert issued.status_code == 200
+    url = issued.json()["url"]
+    assert client.get(url).status_code == 200
+    # signed for one path only
+    token = issued.json()["media_token"]
+    assert client.get(f"/api/downloads/archive?ids=1&media_token={token}").status_code == 401
+    expired = create_media_token("alice", "/api/downloads/1/file", timedelta(seconds=-1))
+    assert client.get(f"/api/downloads/1/file?media_token={expired}").status_code == 401
+    # the session token never travels in a URL
+    session_token = create_access_token({"sub": "alice"})
+    assert client.get(f"/api/downloads/1/file?access_token={session_token}").status_code == 401
+    assert client.get(f"/api/downloads/1/file?media_token={session_token}").status_code == 401
+    assert client.post("/auth/media-token", json={"path": "/auth/me"}).status_code == 400
+
+    del app.dependency_overrides[get_current_user]
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_archive_streams_only_owned_files(client) -> None:
+    response = client.get("/api/downloads/archive", params={"ids": [1, 2, 3], "format": "tar"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-tar"
+
+    with tarfile.open(fileobj=io.BytesIO(response.content)) as tf:
+        assert tf.getnames() == ["song.mp3"]
+
+
+def test_history_revalidates_until_a_row_changes(client) -> None:
+    response = client.get("/api/downloads")
+    assert response.status_code == 200
+    assert response.json()["total"] == 2
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    assert client.get("/api/downloads", headers={"If-None-Match": etag}).status_code == 304
+    # a different page is a different representation
+    assert client.get("/api/downloads", params={"per_page": 1}, headers={"If-None-Match": etag}).status_code == 200
+
+    detail_etag = client.get("/api/downloads/1").headers["etag"]
+    assert client.get("/api/downloads/1", headers={"If-None-Match": detail_etag}).status_code == 304
+
+    db = client.session_factory()
+    db.add(DownloadHistory(id=4, user_id=1, url="u", status="pending"))
+    db.commit()
+    db.close()
+    assert client.get("/api/downloads", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_history_rows_serialize_like_the_response_model(client) -> None:
+    db = client.session_factory()
+    db.get(DownloadHistory, 1).error_message = "not part of the listing"
+    db.commit()
+    entities = db.query(DownloadHistory).filter(DownloadHistory.user_id == 1).order_by(
+        DownloadHistory.created_at.desc()
+    ).all()
+    expected = DownloadHistoryResponse(downloads=entities, total=2, page=1, per_page=10).model_dump(mode="json")
+    db.close()
+
+    listed = client.get("/api/downloads").json()
+    assert listed == expected
+    assert "error_message" not in listed["downloads"][0]
+
+
+def test_changes_feed_returns_only_newer_rows(client) -> None:
+    db = client.session_factory()
+    for download_id, minutes_ago in ((1, 30), (3, 20)):
+        db.get(DownloadHistory, download_id).updated_at = datetime.utcnow() - timedelta(minutes=minutes_ago)
+    db.commit()
+
+    first = client.get("/api/downloads/changes", params={"limit": 1}).json()
+    assert [d["id"] for d in first["downloads"]] == [1]
+    assert first["has_more"] is True
+
+    second = client.get("/api/downloads/changes", params={"since": first["cursor"]}).json()
+    assert [d["id"] for d in second["downloads"]] == [3]
+    assert second["has_more"] is False
+
+    idle = client.get("/api/downloads/changes", params={"since": second["cursor"]}).json()
+    assert idle["downloads"] == [] and idle["cursor"] == second["cursor"]
+
+    db.get(DownloadHistory, 1).updated_at = datetime.utcnow() - timedelta(minutes=1)
+    db.commit()
+    db.close()
+    changed = client.get("/api/downloads/changes", params={"since": second["cursor"]}).json()
+    assert [d["id"] for d in changed["downloads"]] == [1]
+
+    assert client.get("/api/downloads/changes", params={"since": "not-a-cursor"}).status_code == 400
+
+
+def test_updates_stamp_statement_time_on_postgres() -> None:
+    # now() would be the transaction start, minutes before a long job's final update commits
+    statement = update(DownloadHistory).where(DownloadHistory.id == 1).values(status="completed")
+    assert "updated_at=clock_timestamp()" in str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_export_streams_filtered_history(client) -> None:
+    db = client.session_factory()
+    db.get(DownloadHistory, 1).title = 'Live, "unplugged"'
+    db.add(DownloadHistory(id=4, user_id=1, url="v", status="failed", created_at=datetime(2020, 1, 1)))
+    db.commit()
+    db.close()
+
+    response = client.get("/api/downloads/export", params={"status": "completed"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["id"] for row in rows] == ["3", "1"]  # newest first, like the listing
+    assert rows[1]["title"] == 'Live, "unplugged"' and rows[0]["title"] == ""
+
+    response = client.get("/api/downloads/export", params={"format": "ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == [3, 1, 4]
+    assert lines[2]["created_at"] == "2020-01-01T00:00:00"
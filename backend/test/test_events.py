@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from music_downloader.auth import token_cache as token_cache_module
+from music_downloader.auth.token_cache import TokenCache
+from music_downloader.config.settings import settings
+from music_downloader.model import TokenBlacklist, User
+from music_downloader.service.events import EventBus, TOKEN_REVOKED, USER_CHANGED
+
+
+def test_events_are_dispatched_locally_without_a_listener() -> None:
+    bus = EventBus()
+    received = []
+    bus.subscribe(TOKEN_REVOKED, received.append)
+    bus.subscribe(TOKEN_REVOKED, lambda event: 1 / 0)  # a failing handler must not stop the others
+
+    bus.publish(TOKEN_REVOKED, jti="abc", user_id=1)
+    bus.publish("other.event", value=1)
+
+    assert received == [{"type": TOKEN_REVOKED, "jti": "abc", "user_id": 1}]
+
+
+def test_token_cache_forgets_revoked_tokens_and_changed_users(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "auth_cache_seconds", 30)
+    cache = TokenCache()
+    cache.remember("a", user_id=1)
+    cache.remember("b", user_id=1)
+    cache.remember("c", user_id=2)
+
+    cache.forget_token("a")
+    assert not cache.is_known_valid("a")
+    cache.forget_user(1)
+    assert not cache.is_known_valid("b")
+    assert cache.is_known_valid("c")
+
+    monkeypatch.setattr(settings, "auth_cache_seconds", 0)
+    assert not cache.is_known_valid("c")
+
+
+def test_committed_account_changes_and_revocations_are_published(db_session, monkeypatch) -> None:
+    bus = EventBus()
+    received = []
+    bus.subscribe(USER_CHANGED, received.append)
+    bus.subscribe(TOKEN_REVOKED, received.append)
+    monkeypatch.setattr(token_cache_module, "event_bus", bus)
+    user = User(id=1, username="alice", email="alice@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+
+    user.last_login = datetime.utcnow()  # not part of what a cached token vouches for
+    db_session.commit()
+    user.is_active = False
+    db_session.flush()
+    db_session.rollback()  # nothing happened
+    assert received == []
+
+    user.hashed_password = "y"
+    db_session.commit()
+    db_session.add(TokenBlacklist(jti="abc", user_id=1, expires_at=datetime.utcnow()))
+    db_session.commit()
+    assert received == [
+        {"type": USER_CHANGED, "user_id": 1},
+        {"type": TOKEN_REVOKED, "jti": "abc", "user_id": 1},
+        {"type": USER_CHANGED, "user_id": 1},
+    ]
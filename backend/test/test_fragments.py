@@ -0,0 +1,34 @@
+from music_downloader.service.fragments import FragmentTuner, parse_extractor_limits
+
+MB = 1_000_000
+DASH = {"extractor_key": "Youtube", "protocol": "http_dash_segments"}
+
+
+def _transfer(tuner: FragmentTuner, info: dict, throughput_per_connection, link: float = None) -> int:
+    lease = tuner.acquire(info)
+    throughput = throughput_per_connection * lease.concurrency
+    lease.downloaded_bytes, lease.download_seconds = int(min(throughput, link or throughput) * 10), 10.0
+    tuner.release(lease)
+    return lease.concurrency
+
+
+def test_concurrency_grows_until_the_link_saturates() -> None:
+    tuner = FragmentTuner(max_concurrency=16, extractor_limits={}, bandwidth_bytes=0)
+    # each connection gets 1 MB/s, the link tops out at 8 MB/s
+    used = [_transfer(tuner, DASH, 1 * MB, link=8 * MB) for _ in range(5)]
+    assert used[:3] == [4, 8, 16]
+    assert used[3] == 8  # 16 connections added nothing over 8
+
+    # progressive downloads are never split
+    assert tuner.acquire({"extractor_key": "Youtube", "protocol": "https"}).concurrency == 1
+
+
+def test_extractor_limits_and_bandwidth_budget() -> None:
+    assert parse_extractor_limits("youtube=2, vimeo=x,soundcloud=0") == {"youtube": 2, "soundcloud": 1}
+    tuner = FragmentTuner(max_concurrency=8, extractor_limits={"youtube": 2}, bandwidth_bytes=4 * MB)
+    assert _transfer(tuner, DASH, 1 * MB) == 2
+    assert tuner.concurrency("Youtube") == 2
+
+    running = tuner.acquire(DASH)  # expected to take 2 MB/s of the 4 MB/s budget
+    second = tuner.acquire({"extractor_key": "Vimeo", "protocol": "m3u8_native"})
+    assert running.rate_limit == 4 * MB and second.rate_limit == 2 * MB
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+from music_downloader.app import app
+from music_downloader.auth import get_current_active_user
+from music_downloader.config.settings import settings
+from music_downloader.model import DownloadArchiveEntry, DownloadHistory
+from music_downloader.route import download as download_route
+from music_downloader.service import imports
+from music_downloader.service.imports import normalize_url
+from music_downloader.service.scheduler import DownloadScheduler
+
+
+def test_normalize_collapses_youtube_forms_and_tracking() -> None:
+    watch = ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ")
+    assert normalize_url("https://youtu.be/dQw4w9WgXcQ?si=abc") == watch
+    assert normalize_url("http://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ&list=RD1") == watch
+    assert normalize_url("https://www.youtube.com/shorts/dQw4w9WgXcQ") == watch
+    assert normalize_url("https://music.youtube.com/watch?v=dQw4w9WgXcQ")[1] == "youtube:dQw4w9WgXcQ"
+    assert normalize_url("HTTPS://Example.com/track?id=1&utm_source=x") == (
+        "https://example.com/track?id=1", "https://example.com/track?id=1"
+    )
+    assert normalize_url("ftp://example.com/a.mp3") is None
+    assert normalize_url("not a url") is None
+
+
+def test_import_dedups_and_inserts_in_chunks(client, session_factory, monkeypatch) -> None:
+    db = session_factory()
+    db.add_all([
+        DownloadHistory(user_id=1, url="https://youtu.be/aaaaaaaaaaa", status="completed"),
+        DownloadHistory(user_id=1, url="https://example.com/failed", status="failed"),
+        DownloadHistory(user_id=2, url="https://example.com/other-user", status="completed"),
+        DownloadArchiveEntry(user_id=1, extractor="youtube", media_id="bbbbbbbbbbb"),
+    ])
+    db.commit()
+    db.close()
+
+    scheduler = DownloadScheduler(workers=1, session_factory=session_factory)
+    monkeypatch.setattr(imports, "download_scheduler", scheduler)
+    monkeypatch.setattr(download_route, "download_scheduler", scheduler)
+    monkeypatch.setattr(imports, "INSERT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "max_queued_jobs_per_user", 4)
+
+    upload = "\n".join([
+        "url,title",
+        "https://www.youtube.com/watch?v=aaaaaaaaaaa,already downloaded",
+        "https://music.youtube.com/watch?v=bbbbbbbbbbb,archived by a subscription",
+        "https://example.com/failed,failed before: retried",
+        "https://example.com/other-user,",
+        "# a comment",
+        "",
+        "garbage,line",
+        "https://youtu.be/ccccccccccc",
+        "https://www.youtube.com/watch?v=ccccccccccc&si=x,same video again",
+        "https://example.com/new",
+        "https://example.com/one-too-many",
+    ]).encode()
+
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(
+        id=1, storage_used_bytes=0, storage_quota_bytes=None
+    )
+    response = client.post("/api/downloads/import", files={"file": ("wishlist.csv", upload, "text/csv")})
+
+    assert response.status_code == 200
+    summary = response.json()
+    assert (summary["queued"], summary["duplicate"], summary["invalid"], summary["over_limit"]) == (4, 3, 1, 1)
+    assert summary["invalid_lines"] == [8]
+
+    db = session_factory()
+    imported = db.query(DownloadHistory).filter(DownloadHistory.id.in_(summary["download_ids"])).all()
+    assert sorted(row.url for row in imported) == [
+        "https://example.com/failed", "https://example.com/new", "https://example.com/other-user",
+        "https://www.youtube.com/watch?v=ccccccccccc",
+    ]
+    assert {row.priority for row in imported} == {"bulk"}
+    assert scheduler.queued_count(1) == 4
+    # each job carries the URL of the row it was created for
+    assert {(job.id, job.url) for job in scheduler._queue.order()} == {(row.id, row.url) for row in imported}
+    db.close()
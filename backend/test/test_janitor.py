@@ -0,0 +1,44 @@
+import os
+import time
+
+from music_downloader.service.janitor import WorkspaceJanitor
+
+
+def _age(path, seconds) -> None:
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_sweep_removes_only_abandoned_workspaces_and_partials(tmp_path) -> None:
+    jobs = tmp_path / ".jobs"
+    for name in ("1", "2", "3"):
+        (jobs / name).mkdir(parents=True)
+        (jobs / name / "audio.webm").write_bytes(b"x" * 100)
+    legacy = tmp_path / "download_20240101_120000"
+    legacy.mkdir()
+    (legacy / "song.mp3").write_bytes(b"y" * 50)
+    album = tmp_path / "download_favourites"  # the user's own folder, however old
+    album.mkdir()
+    (album / "track.mp3").write_bytes(b"a" * 20)
+    (tmp_path / "old.webm.part").write_bytes(b"z" * 10)
+    (tmp_path / "fresh.webm.part").write_bytes(b"z" * 10)
+    (tmp_path / "song.mp3").write_bytes(b"keep")
+
+    for path in (jobs / "1", jobs / "1" / "audio.webm", jobs / "2", jobs / "2" / "audio.webm",
+                 legacy, legacy / "song.mp3", album, album / "track.mp3",
+                 tmp_path / "old.webm.part", tmp_path / "song.mp3"):
+        _age(path, 7200)
+
+    # job 2 still runs here; job 3 was touched recently, maybe by another process
+    janitor = WorkspaceJanitor(root=str(tmp_path), grace=3600, running_jobs=lambda: {2})
+    report = janitor.sweep()
+
+    assert report.workspaces_removed == 2
+    assert report.partial_files_removed == 1
+    assert report.bytes_reclaimed == 100 + 50 + 10
+    assert sorted(path.name for path in jobs.iterdir()) == ["2", "3"]
+    assert not legacy.exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        ".jobs", "download_favourites", "fresh.webm.part", "song.mp3"
+    ]
+    assert janitor.last_report == report
@@ -0,0 +1,62 @@
+import os
+
+from music_downloader.model import LibraryTrack
+from music_downloader.service import library
+from music_downloader.service.library import LibraryIndexer
+
+
+def _make_indexer(tmp_path, session_factory, monkeypatch, probed):
+    def fake_probe(path):
+        probed.append(path)
+        return {"title": os.path.basename(path), "artist": "Artist", "album": None, "duration": 1.0}
+
+    monkeypatch.setattr(library, "probe_audio", fake_probe)
+    root = tmp_path / "music"
+    root.mkdir()
+    return LibraryIndexer(root=str(root), workers=2, session_factory=session_factory), root
+
+
+def test_rescan_only_lists_changed_directories(tmp_path, session_factory, monkeypatch) -> None:
+    probed = []
+    indexer, root = _make_indexer(tmp_path, session_factory, monkeypatch, probed)
+    (root / "album_a").mkdir()
+    (root / "album_b").mkdir()
+    (root / "album_a" / "one.mp3").write_bytes(b"a")
+    (root / "album_b" / "two.flac").write_bytes(b"b")
+    (root / "album_b" / "cover.jpg").write_bytes(b"c")
+
+    stats = indexer.scan()
+    assert stats.tracks_added == 2
+    assert stats.directories_listed == 3
+    assert len(probed) == 2
+
+    probed.clear()
+    stats = indexer.scan()
+    assert stats.directories_listed == 0
+    assert stats.directories_skipped == 3
+    assert probed == []
+
+    (root / "album_b" / "three.mp3").write_bytes(b"d")
+    stats = indexer.scan()
+    assert stats.directories_listed == 1
+    assert stats.tracks_added == 1
+    assert probed == [str(root / "album_b" / "three.mp3")]
+
+
+def test_removed_files_and_directories_leave_the_index(tmp_path, session_factory, monkeypatch) -> None:
+    indexer, root = _make_indexer(tmp_path, session_factory, monkeypatch, [])
+    (root / "album_a").mkdir()
+    (root / "album_a" / "one.mp3").write_bytes(b"a")
+    (root / "single.mp3").write_bytes(b"b")
+    indexer.scan()
+
+    (root / "album_a" / "one.mp3").unlink()
+    (root / "album_a").rmdir()
+    stats = indexer.scan()
+    assert stats.directories_removed == 1
+
+    db = session_factory()
+    try:
+        assert [t.path for t in db.query(LibraryTrack).all()] == [str(root / "single.mp3")]
+    finally:
+        db.close()
@@ -0,0 +1,55 @@
+import json
+import logging
+import queue
+
+from fastapi.testclient import TestClient
+
+from music_downloader.app import app
+from music_downloader.config.logging_config import (
+    ContextFilter, DroppingQueueHandler, JsonFormatter, SamplingFilter, log_context, request_id_var
+)
+from music_downloader.service.scheduler import DownloadJob
+
+
+def test_queued_records_carry_context_and_format_as_json() -> None:
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.addFilter(ContextFilter())
+    logger = logging.getLogger("test_logging.json")
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        with log_context(request_id="req-1", job_id=42):
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logger.error("job %s failed", 42, exc_info=True)
+        logger.error("dropped, the queue is full")
+    finally:
+        logger.removeHandler(handler)
+
+    assert handler.dropped == 1
+    entry = json.loads(JsonFormatter().format(handler.queue.get_nowait()))
+    assert entry["message"] == "job 42 failed"
+    assert entry["request_id"] == "req-1" and entry["job_id"] == "42"
+    assert entry["level"] == "ERROR" and "ValueError: boom" in entry["exception"]
+    assert request_id_var.get() is None
+
+
+def test_sampling_keeps_warnings() -> None:
+    def record(level: int) -> logging.LogRecord:
+        return logging.LogRecord("yt_dlp", level, __file__, 1, "msg", None, None)
+
+    assert not SamplingFilter(0).filter(record(logging.INFO))
+    assert SamplingFilter(0).filter(record(logging.WARNING))
+    assert SamplingFilter(1).filter(record(logging.DEBUG))
+
+
+def test_request_id_is_echoed_and_follows_queued_jobs() -> None:
+    client = TestClient(app)
+    generated = client.get("/health").headers["x-request-id"]
+    assert len(generated) == 32
+    assert client.get("/health", headers={"X-Request-ID": "abc-123"}).headers["x-request-id"] == "abc-123"
+
+    with log_context(request_id="abc-123"):
+        job = DownloadJob(id=1, user_id=1, url="https://example.com/a")
+    assert job.request_id == "abc-123"
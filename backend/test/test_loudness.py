@@ -0,0 +1,91 @@
+import math
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from music_downloader.config.settings import settings
+from music_downloader.model import DownloadHistory, LibraryTrack, User
+from music_downloader.service.loudness import (
+    SAMPLE_RATE, LoudnessAnalyzer, LoudnessMeter, LoudnessResult, channel_weights
+)
+
+
+def test_meter_matches_closed_form_for_steady_signal() -> None:
+    # K-weighting is applied by ffmpeg, so a steady sine fed here reads as -0.691 + 10 log10(sum of mean squares)
+    seconds, amplitude = 10, 0.5
+    t = np.arange(seconds * SAMPLE_RATE) / SAMPLE_RATE
+    sine = (amplitude * np.sin(2 * np.pi * 997 * t)).astype(np.float32)
+    meter = LoudnessMeter(np.ones(2))
+    for chunk in np.array_split(np.column_stack([sine, sine]), 7):  # chunks not aligned to 100 ms steps
+        meter.add(chunk)
+
+    expected = -0.691 + 10 * math.log10(2 * amplitude ** 2 / 2)
+    assert meter.integrated() == pytest.approx(expected, abs=0.02)
+
+
+def test_meter_gates_silence_and_short_input() -> None:
+    meter = LoudnessMeter(np.ones(1))
+    meter.add(np.zeros((SAMPLE_RATE * 2, 1), dtype=np.float32))
+    assert meter.integrated() is None
+
+    meter = LoudnessMeter(np.ones(1))
+    meter.add(np.full((SAMPLE_RATE // 5, 1), 0.5, dtype=np.float32))  # shorter than one 400 ms block
+    assert meter.integrated() is None
+
+
+def test_channel_weights_skip_lfe_and_boost_surrounds() -> None:
+    assert channel_weights(6, 0x3F).tolist() == [1.0, 1.0, 1.0, 0.0, 1.41, 1.41]
+    assert channel_weights(1, 0).tolist() == [1.0]
+    assert LoudnessResult(integrated_lufs=-14.0, sample_peak=0.9).replaygain_db == -4.0
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_analyzer_measures_pending_tracks(tmp_path, session_factory, db_session) -> None:
+    path = tmp_path / "tone.wav"
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=997:duration=3",
+         "-af", "volume=0.5", str(path)],
+        check=True
+    )
+    st = os.stat(path)
+    db_session.add(LibraryTrack(path=str(path), directory=str(tmp_path), size=st.st_size, mtime_ns=st.st_mtime_ns))
+    db_session.commit()
+
+    assert LoudnessAnalyzer(workers=1, session_factory=session_factory).analyze_pending() == 1
+
+    track = db_session.query(LibraryTrack).one()
+    db_session.refresh(track)
+    assert track.loudness_analyzed_at is not None
+    # lavfi sine is 1/8 full scale; the -0.691 offset cancels the K-weighting gain at 997 Hz
+    assert track.sample_peak == pytest.approx(0.0625, rel=0.02)
+    assert track.loudness_lufs == pytest.approx(10 * math.log10(0.0625 ** 2 / 2), abs=0.1)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_replaygain_rewrite_updates_sizes_and_usage(tmp_path, session_factory, db_session, monkeypatch) -> None:
+    path = tmp_path / "tone.mp3"
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=997:duration=3", str(path)],
+        check=True
+    )
+    st = os.stat(path)
+    db_session.add(User(
+        id=1, username="alice", email="alice@example.com", hashed_password="x", storage_used_bytes=st.st_size
+    ))
+    db_session.add(DownloadHistory(user_id=1, url="u", status="completed", file_path=str(path), file_size=st.st_size))
+    db_session.add(LibraryTrack(path=str(path), directory=str(tmp_path), size=st.st_size, mtime_ns=st.st_mtime_ns))
+    db_session.commit()
+
+    monkeypatch.setattr(settings, "write_replaygain_tags", True)
+    assert LoudnessAnalyzer(workers=1, session_factory=session_factory).analyze_pending() == 1
+
+    db_session.expire_all()
+    tagged = os.stat(path)
+    assert tagged.st_size != st.st_size
+    track = db_session.query(LibraryTrack).one()
+    assert (track.size, track.mtime_ns) == (tagged.st_size, tagged.st_mtime_ns)
+    assert db_session.query(DownloadHistory).one().file_size == tagged.st_size
+    assert db_session.get(User, 1).storage_used_bytes == tagged.st_size
@@ -1,3 +1,7 @@
+import os
+import subprocess
+import sys
+
 from music_downloader.model import Base
 
 
@@ -5,3 +9,11 @@ def test_model_package_exports_base_with_registered_tables() -> None:
     assert Base is not None
     assert "users" in Base.metadata.tables
     assert "download_history" in Base.metadata.tables
+
+
+def test_app_import_leaves_yt_dlp_unloaded() -> None:
+    # a fresh interpreter: this test session may already have imported yt-dlp
+    probe = "import sys; from music_downloader.app import create_app; create_app(); print('yt_dlp' in sys.modules)"
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True, env=env).stdout
+    assert output.strip().splitlines()[-1] == "False"
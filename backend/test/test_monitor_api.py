@@ -1,14 +1,34 @@
 from datetime import datetime
 from fastapi.testclient import TestClient
 from music_downloader.app import app
+from music_downloader.service.health import health_checker
 
 client = TestClient(app)
 
-def test_readiness():
+def test_readiness(monkeypatch):
+    monkeypatch.setattr(health_checker, "checks", {"database": lambda: "ok", "ffmpeg": lambda: "/usr/bin/ffmpeg"})
+    monkeypatch.setattr(health_checker, "last_report", None)
     pre_utc_dt = datetime.utcnow()
     response = client.get("/readiness")
     assert response.status_code == 200
     assert datetime.fromisoformat(response.json()["utc_dt"]) >= pre_utc_dt
+    assert response.json()["ready"] is True
+
+def test_readiness_fails_when_a_check_fails(monkeypatch):
+    def full_disk():
+        raise RuntimeError("10 MB free, below 1024 MB")
+
+    monkeypatch.setattr(health_checker, "checks", {"database": lambda: "ok", "disk_space": full_disk})
+    monkeypatch.setattr(health_checker, "last_report", None)
+    response = client.get("/readiness")
+    assert response.status_code == 503
+    disk_space = response.json()["checks"]["disk_space"]
+    assert disk_space["ok"] is False
+    assert disk_space["detail"] == "10 MB free, below 1024 MB"
+
+    shed = client.post("/api/download", json={"url": "https://example.com"})
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "30"
 
 def test_liveness():
     response = client.get("/liveness")
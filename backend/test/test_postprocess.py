@@ -0,0 +1,55 @@
+import shutil
+import subprocess
+
+import pytest
+
+from music_downloader.service.ffmpeg import postprocess_audio
+from music_downloader.service.yt_music import MusicDownloader, TrackMetadata
+
+
+def test_id3_tags_prefer_release_year() -> None:
+    tags = MusicDownloader._id3_tags(TrackMetadata.from_info({
+        "title": "Song", "uploader": "Band", "album": None, "upload_date": "20240102", "release_year": 1999,
+    }))
+    assert tags == {"title": "Song", "artist": "Band", "album": None, "date": "1999"}
+    assert MusicDownloader._id3_tags(TrackMetadata(title="Song", upload_date="20240102"))["date"] == "2024"
+
+
+def test_selected_info_is_reduced_to_compact_record() -> None:
+    formats = [{"format_id": str(i), "url": "u"} for i in range(50)]
+    captions = {"en": [{"ext": "vtt"}] * 7}
+    info = {"formats": formats, "automatic_captions": captions, "title": " Song ", "description": "x" * 5000}
+    # yt-dlp passes filters a shallow copy of the info dict it keeps
+    selected = dict(info, format_id="1")
+
+    metadata = TrackMetadata.from_info(selected)
+    MusicDownloader._release_unused_info(selected)
+
+    assert metadata.title == "Song" and not hasattr(metadata, "__dict__")
+    assert info["formats"] == [] and info["automatic_captions"] == {}
+    assert selected["format_id"] == "1"
+
+
+def test_final_names_are_reserved_atomically(tmp_path) -> None:
+    downloader = MusicDownloader(output_dir=str(tmp_path))
+    (tmp_path / "Song.mp3").write_bytes(b"earlier download")
+    # two jobs for the same title finishing together each get a name of their own
+    names = {downloader._reserve_final_path("Song.mp3").name for _ in range(2)}
+    assert names == {"Song_1.mp3", "Song_2.mp3"}
+    assert (tmp_path / "Song.mp3").read_bytes() == b"earlier download"
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_single_pass_writes_tags_and_cover(tmp_path) -> None:
+    source, cover, output = tmp_path / "in.wav", tmp_path / "cover.png", tmp_path / "out.mp3"
+    subprocess.run(["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "sine=duration=2", str(source)], check=True)
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "color=s=64x64", "-frames:v", "1", str(cover)], check=True
+    )
+
+    seconds = postprocess_audio(str(source), str(output), {"title": "Song", "artist": "Band"}, cover=str(cover))
+
+    assert seconds > 0
+    probe = subprocess.run(["ffmpeg", "-i", str(output)], capture_output=True, text=True).stderr
+    assert "title           : Song" in probe
+    assert "(attached pic)" in probe
@@ -0,0 +1,84 @@
+from fastapi.testclient import TestClient
+
+from music_downloader.app import app
+from music_downloader.auth.security import create_access_token
+from music_downloader.model import RateLimitCounter
+from music_downloader.service import rate_limit
+from music_downloader.service.rate_limit import (
+    DatabaseRateLimiter, MemoryRateLimiter, RateLimit, parse_rate_limits, sliding_window
+)
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sliding_window_weighs_the_previous_window() -> None:
+    rate = RateLimit(limit=10, window=60)
+    assert sliding_window(previous=0, current=9, elapsed=0, rate=rate) == 0
+    # 15s into this window, the last one still counts for 3/4 of its 10 requests
+    assert sliding_window(previous=10, current=2, elapsed=15, rate=rate) == 3
+    assert sliding_window(previous=10, current=2, elapsed=18, rate=rate) == 0
+    assert sliding_window(previous=0, current=10, elapsed=50, rate=rate) == 16
+
+    assert parse_rate_limits("post /auth/login/=10/60, GET /x=0/60,bogus") == {
+        ("POST", "/auth/login"): RateLimit(10, 60)
+    }
+
+
+def test_memory_limiter_counts_admitted_requests_per_key() -> None:
+    clock = Clock(1_000_040.0)  # 20s into a window
+    limiter = MemoryRateLimiter(clock=clock)
+    rate = RateLimit(limit=3, window=60)
+    assert [limiter.hit(["ip:a", "user:alice"], rate) for _ in range(3)] == [0, 0, 0]
+    assert limiter.hit(["ip:a"], rate) == 60  # the rest of this window and a third of the next
+    assert limiter.hit(["ip:b", "user:alice"], rate) == 60  # the user limit follows alice to a new address
+    assert limiter.hit(["ip:b"], rate) == 0  # rejected requests did not count against ip:b
+
+    clock.now += 50  # 10s into the next window the full one still counts for 2.5 requests
+    assert limiter.hit(["ip:a"], rate) == 10
+    clock.now += 10
+    assert limiter.hit(["ip:a"], rate) == 0
+
+
+def test_database_limiter_shares_counts_between_instances(session_factory, monkeypatch) -> None:
+    clock = Clock(1_000_040.0)
+    workers = [DatabaseRateLimiter(session_factory, clock=clock) for _ in range(2)]
+    rate = RateLimit(limit=3, window=60)
+    monkeypatch.setattr(rate_limit, "route_limits", {("POST", "/auth/login"): rate})
+
+    assert [workers[i % 2].hit(["ip:a"], rate) for i in range(3)] == [0, 0, 0]
+    assert workers[0].hit(["ip:a"], rate) == 60
+    assert workers[1].hit(["ip:a"], rate) == 60
+
+    clock.now += 180  # long enough for the old counters to be swept
+    workers[0]._next_prune = 0
+    assert workers[0].hit(["ip:a"], rate) == 0
+    db = session_factory()
+    assert [(row.window_start, row.count) for row in db.query(RateLimitCounter)] == [(1_000_220 // 60 * 60, 1)]
+    db.close()
+
+
+def test_middleware_answers_429_before_the_route(monkeypatch) -> None:
+    monkeypatch.setattr(rate_limit, "route_limits", {("GET", "/health"): RateLimit(limit=2, window=3600)})
+    clock = Clock(1_080_600.0)  # 10 minutes into an hour
+    monkeypatch.setattr(rate_limit, "rate_limiter", MemoryRateLimiter(clock=clock))
+    client = TestClient(app)
+    token = create_access_token({"sub": "alice"})
+
+    assert client.get("/health").status_code == 200
+    assert client.get("/health", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    response = client.get("/health")
+    assert response.status_code == 429
+    # the rest of this hour, then half of the next while the full one slides out
+    assert response.headers["Retry-After"] == "4800"
+    assert response.headers["X-Request-ID"]
+
+    # alice has one request left, but not from this address
+    response = client.get("/health", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 429
+    assert client.get("/").status_code == 200  # routes without a limit are untouched
@@ -0,0 +1,40 @@
+from yt_dlp.utils import DownloadError, ExtractorError
+
+from music_downloader.service.retry import (
+    CircuitBreaker, EXTRACTOR, PERMANENT, RATE_LIMITED, TRANSIENT, source_key,
+)
+from music_downloader.service.yt_music import MusicDownloader
+
+
+def _download_error(message, cause=None):
+    return DownloadError(f"ERROR: {message}", exc_info=(type(cause), cause, None) if cause else None)
+
+
+def test_failures_are_classified() -> None:
+    classify = MusicDownloader.classify_error
+    assert classify(_download_error("[youtube] abc: Video unavailable")) == PERMANENT
+    assert classify(_download_error("HTTP Error 429: Too Many Requests")) == RATE_LIMITED
+    assert classify(_download_error("[youtube] abc: Unable to extract player response")) == EXTRACTOR
+    assert classify(_download_error("boom", ExtractorError("gone", expected=True))) == PERMANENT
+    assert classify(ConnectionResetError("reset by peer")) == TRANSIENT
+
+
+def test_source_key_groups_hosts() -> None:
+    assert source_key("https://music.youtube.com/watch?v=1") == "youtube"
+    assert source_key("https://youtu.be/1") == "youtube"
+    assert source_key("https://soundcloud.com/a/b") == "soundcloud"
+
+
+def test_circuit_opens_then_lets_one_probe_through() -> None:
+    breaker = CircuitBreaker(threshold=2, cooldown=0.01)
+    breaker.record_failure("youtube")
+    assert breaker.acquire("youtube") is None
+    breaker.record_failure("youtube")
+    assert breaker.acquire("youtube") > 0
+    assert breaker.acquire("soundcloud") is None
+
+    breaker._circuits["youtube"].open_until = 0
+    assert breaker.acquire("youtube") is None
+    assert breaker.acquire("youtube") == CircuitBreaker.PROBE_RECHECK_SECONDS
+    breaker.record_success("youtube")
+    assert breaker.acquire("youtube") is None
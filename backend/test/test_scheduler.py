@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+from music_downloader.model import DownloadHistory
+from music_downloader.service.scheduler import DownloadJob, DownloadScheduler, FairQueue
+
+
+def _job(job_id, user_id, priority="bulk"):
+    return DownloadJob(id=job_id, user_id=user_id, url=f"https://example.com/{job_id}", priority=priority)
+
+
+def test_users_are_served_round_robin() -> None:
+    queue = FairQueue()
+    for job_id in range(1, 5):
+        queue.push(_job(job_id, user_id=1))
+    queue.push(_job(10, user_id=2))
+    queue.push(_job(11, user_id=2))
+
+    assert [job.id for job in queue.order()] == [1, 10, 2, 11, 3, 4]
+    assert [queue.pop().id for _ in range(6)] == [1, 10, 2, 11, 3, 4]
+    assert queue.pop() is None
+
+
+def test_interactive_jobs_jump_bulk_work() -> None:
+    queue = FairQueue()
+    queue.push(_job(1, user_id=1))
+    queue.push(_job(2, user_id=1))
+    queue.push(_job(3, user_id=2, priority="interactive"))
+
+    assert queue.pop().id == 3
+    assert queue.count(1) == 2
+
+
+def test_users_at_their_concurrency_cap_are_skipped() -> None:
+    queue = FairQueue()
+    queue.push(_job(1, user_id=1))
+    queue.push(_job(2, user_id=2))
+
+    assert queue.pop(can_start=lambda user_id: user_id != 1).id == 2
+    assert queue.pop(can_start=lambda user_id: user_id != 1) is None
+    assert queue.remove(1).id == 1
+    assert len(queue) == 0
+
+
+def test_startup_requeues_only_stale_claims(session_factory) -> None:
+    now = datetime.utcnow()
+    db = session_factory()
+    db.add_all([
+        # still running in another process, which keeps its heartbeat fresh
+        DownloadHistory(id=1, user_id=1, url="u1", status="downloading", heartbeat_at=now),
+        DownloadHistory(id=2, user_id=1, url="u2", status="downloading", heartbeat_at=now - timedelta(hours=1)),
+        DownloadHistory(id=3, user_id=2, url="u3", status="downloading"),
+        DownloadHistory(id=4, user_id=2, url="u4", status="pending"),
+    ])
+    db.commit()
+
+    scheduler = DownloadScheduler(workers=1, session_factory=session_factory)
+    scheduler._requeue_pending()
+    assert sorted(job.id for job in scheduler._queue.order()) == [2, 3, 4]
+    db.expire_all()
+    assert [row.status for row in db.query(DownloadHistory).order_by(DownloadHistory.id)] == [
+        "downloading", "pending", "pending", "pending"
+    ]
+    db.close()
+
+
+def test_lost_claim_gives_the_probe_back(session_factory) -> None:
+    db = session_factory()
+    db.add(DownloadHistory(id=1, user_id=1, url="https://example.com/1", status="downloading"))
+    db.commit()
+    db.close()
+
+    scheduler = DownloadScheduler(workers=1, session_factory=session_factory)
+    job = _job(1, user_id=1)
+    for _ in range(scheduler.circuit_breaker.threshold):
+        scheduler.circuit_breaker.record_failure(job.source)
+    scheduler.circuit_breaker._circuits[job.source].open_until = 0
+    assert scheduler.circuit_breaker.acquire(job.source, job.id) is None  # this job is the probe
+
+    scheduler._execute(job)  # another process already claimed it
+    assert scheduler.circuit_breaker.acquire(job.source, 2) is None
+
+
+def test_only_the_probe_gives_the_probe_back(session_factory) -> None:
+    scheduler = DownloadScheduler(workers=1, session_factory=session_factory)
+    probe, earlier = _job(1, user_id=1), _job(2, user_id=1)
+    breaker = scheduler.circuit_breaker
+    for _ in range(breaker.threshold):
+        breaker.record_failure(probe.source)
+    breaker._circuits[probe.source].open_until = 0
+    assert breaker.acquire(probe.source, probe.id) is None
+
+    # started before the circuit opened, ends without a verdict while the probe still runs
+    scheduler._execute(earlier)
+    assert breaker.acquire(probe.source, 3) == breaker.PROBE_RECHECK_SECONDS
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from music_downloader.app import app
+from music_downloader.auth import get_current_active_user, get_admin_user
+from music_downloader.model import DownloadStatsDaily, User
+from music_downloader.service.stats import record_download_outcome
+
+
+def test_rollups_accumulate_and_feed_stats_endpoints(client, session_factory) -> None:
+    today = datetime.utcnow().date()
+    long_ago = today - timedelta(days=90)
+
+    db = session_factory()
+    db.add_all([
+        User(id=1, username="alice", email="alice@example.com", hashed_password="x"),
+        User(id=2, username="bob", email="bob@example.com", hashed_password="x"),
+    ])
+    db.commit()
+    record_download_outcome(db, 1, "completed", file_size=1000, duration=60.0)
+    record_download_outcome(db, 1, "completed", file_size=500, duration=30.0)
+    record_download_outcome(db, 1, "failed")
+    record_download_outcome(db, 1, "completed", file_size=7, duration=1.0, day=long_ago)
+    record_download_outcome(db, 2, "completed", file_size=5000, duration=200.0)
+    db.commit()
+    # one row per user and day, however many jobs finished
+    assert db.query(DownloadStatsDaily).count() == 3
+    db.close()
+
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(id=1)
+    app.dependency_overrides[get_admin_user] = lambda: SimpleNamespace(id=1, is_admin=True)
+    mine = client.get("/api/stats?days=7").json()
+    assert mine["totals"] == {"downloads": 2, "failures": 1, "bytes": 1500, "duration_seconds": 90.0}
+    assert mine["days"] == [
+        {"day": today.isoformat(), "downloads": 2, "failures": 1, "bytes": 1500, "duration_seconds": 90.0}
+    ]
+
+    everyone = client.get("/api/stats/all?days=7").json()
+    assert everyone["totals"]["bytes"] == 6500
+    assert [(user["username"], user["downloads"]) for user in everyone["users"]] == [("bob", 1), ("alice", 2)]
+
+    assert client.get("/api/stats?days=366").json()["totals"]["downloads"] == 3
+    assert client.get("/api/stats?days=0").status_code == 422
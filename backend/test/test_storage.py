@@ -0,0 +1,79 @@
+import pytest
+
+from music_downloader.config.settings import settings
+from music_downloader.model import DownloadHistory, User
+from music_downloader.service import scheduler as scheduler_module
+from music_downloader.service.scheduler import DownloadJob, DownloadScheduler
+from music_downloader.service.storage import (
+    MB, QuotaExceeded, StorageAdmission, StorageDeferred, charge_storage, estimate_download_bytes
+)
+
+
+def test_estimate_prefers_reported_sizes_over_bitrate(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "audio_bitrate", "192")
+    assert estimate_download_bytes({"duration": 100, "filesize": 5_000_000}) == (5_000_000, 2_400_000)
+    assert estimate_download_bytes({"duration": 100, "abr": 128}) == (1_600_000, 2_400_000)
+    assert estimate_download_bytes({
+        "duration": 100, "requested_formats": [{"filesize_approx": 1000}, {"tbr": 80}]
+    }) == (1_001_000, 2_400_000)
+    assert estimate_download_bytes({}) == (settings.unknown_size_estimate_mb * MB,) * 2
+
+
+def test_reservations_enforce_quota_and_free_space(tmp_path, session_factory, monkeypatch) -> None:
+    db = session_factory()
+    db.add(User(id=1, username="alice", email="alice@example.com", hashed_password="x",
+                storage_quota_bytes=10 * MB))
+    db.commit()
+    charge_storage(db, 1, 4 * MB)
+    db.commit()
+    db.close()
+
+    monkeypatch.setattr(settings, "min_free_disk_mb", 0)
+    admission = StorageAdmission(path=str(tmp_path), session_factory=session_factory)
+    song = {"filesize": 2 * MB, "requested_formats": None}  # no duration: the output is estimated at source size
+
+    first = admission.reserve(1, song)
+    second = admission.reserve(1, song)
+    assert admission.reserved_bytes() == 8 * MB
+    # 4 MB used plus three running 2 MB jobs fill the 10 MB quota
+    third = admission.reserve(1, song)
+    with pytest.raises(QuotaExceeded):
+        admission.reserve(1, song)
+
+    for reservation in (first, second, third):
+        admission.release(reservation)
+    assert admission.reserved_bytes() == 0
+
+    # running jobs' reservations count against free space until they finish
+    monkeypatch.setattr(settings, "min_free_disk_mb", 10 ** 9)
+    with pytest.raises(StorageDeferred):
+        admission.reserve(1, song)
+
+
+def test_playlist_entries_beyond_the_first_leave_nothing_reserved(tmp_path, session_factory, monkeypatch) -> None:
+    import yt_dlp
+
+    verdicts = []
+
+    def extract_info(self, url, download=True):
+        # yt-dlp runs the match filter once per entry of a playlist URL
+        for index in range(2):
+            info = {"id": f"v{index}", "title": f"Song {index}", "filesize": MB, "extractor_key": "Youtube"}
+            verdicts.append(self.params["match_filter"](info, incomplete=False))
+        raise yt_dlp.utils.DownloadError("network went away")
+
+    monkeypatch.setattr(yt_dlp.YoutubeDL, "extract_info", extract_info)
+    monkeypatch.setattr(settings, "output_directory", str(tmp_path))
+    monkeypatch.setattr(settings, "min_free_disk_mb", 0)
+    admission = StorageAdmission(path=str(tmp_path), session_factory=session_factory)
+    monkeypatch.setattr(scheduler_module, "storage_admission", admission)
+    db = session_factory()
+    db.add(DownloadHistory(id=1, user_id=1, url="https://www.youtube.com/playlist?list=PL1", status="pending"))
+    db.commit()
+    db.close()
+
+    scheduler = DownloadScheduler(workers=1, session_factory=session_factory)
+    scheduler._execute(DownloadJob(id=1, user_id=1, url="https://www.youtube.com/playlist?list=PL1"))
+
+    assert verdicts[0] is None and verdicts[1]  # the second entry is skipped before it reserves anything
+    assert admission.reserved_bytes() == 0
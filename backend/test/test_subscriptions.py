@@ -0,0 +1,157 @@
+from datetime import datetime, timedelta, timezone
+
+from music_downloader.model import DownloadArchiveEntry, DownloadHistory, Subscription
+from music_downloader.service import scheduler as scheduler_module
+from music_downloader.service import subscriptions
+from music_downloader.service.imports import _known_keys
+from music_downloader.service.scheduler import DownloadJob, DownloadScheduler
+from music_downloader.service.subscriptions import SubscriptionChecker
+from music_downloader.service.yt_music import DownloadResult, MusicDownloader, PlaylistEntry, PlaylistListing
+
+
+def _listing(*media_ids):
+    return PlaylistListing(title="Channel", entries=[
+        PlaylistEntry(extractor="youtube", media_id=media_id, url=f"https://youtu.be/{media_id}", title=media_id)
+        for media_id in media_ids
+    ])
+
+
+def _make_due(session_factory):
+    db = session_factory()
+    db.query(Subscription).update({"next_check_at": datetime.now(timezone.utc) - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+
+
+def test_only_unseen_entries_are_queued(session_factory, monkeypatch) -> None:
+    scheduler = DownloadScheduler(workers=1, session_factory=session_factory)
+    monkeypatch.setattr(subscriptions, "download_scheduler", scheduler)
+
+    db = session_factory()
+    db.add(Subscription(id=1, user_id=1, url="https://www.youtube.com/@artist/videos"))
+    db.commit()
+    db.close()
+
+    listings = iter([_listing("b", "a"), _listing("d", "c", "b", "a")])
+    calls = []
+
+    def lister(url, limit):
+        calls.append(url)
+        return next(listings)
+
+    checker = SubscriptionChecker(session_factory=session_factory, lister=lister)
+
+    # the first check only records what is already there
+    _make_due(session_factory)
+    assert checker.check_due() == 1
+    assert scheduler.queue_depth() == 0
+    # not due again until the interval passes
+    assert checker.check_due() == 0
+
+    _make_due(session_factory)
+    assert checker.check_due() == 1
+    assert len(calls) == 2
+
+    db = session_factory()
+    queued = db.query(DownloadHistory).order_by(DownloadHistory.id).all()
+    assert [(d.url, d.status, d.priority) for d in queued] == [
+        ("https://youtu.be/c", "pending", "bulk"),
+        ("https://youtu.be/d", "pending", "bulk"),
+    ]
+    assert db.get(Subscription, 1).title == "Channel"
+    db.close()
+    assert scheduler.queue_depth() == 2
+
+
+def test_failed_and_cancelled_entries_are_queued_again(session_factory, monkeypatch) -> None:
+    scheduler = DownloadScheduler(workers=1, session_factory=session_factory)
+    monkeypatch.setattr(subscriptions, "download_scheduler", scheduler)
+    db = session_factory()
+    db.add(Subscription(id=1, user_id=1, url="https://www.youtube.com/@artist/videos"))
+    # archived when it was queued, before entries waited for completion
+    db.add(DownloadHistory(id=100, user_id=1, url="https://youtu.be/c", status="cancelled"))
+    db.add(DownloadArchiveEntry(user_id=1, extractor="youtube", media_id="c", subscription_id=1, download_id=100))
+    db.commit()
+    db.close()
+
+    listings = iter([_listing("a"), _listing("b", "a"), _listing("b", "a"), _listing("c", "b", "a")])
+    checker = SubscriptionChecker(session_factory=session_factory, lister=lambda url, limit: next(listings))
+    for _ in range(3):
+        _make_due(session_factory)
+        checker.check_due()
+    # "b" was queued once and is not archived while it waits
+    db = session_factory()
+    assert [d.url for d in db.query(DownloadHistory).filter_by(status="pending")] == ["https://youtu.be/b"]
+    assert [e.media_id for e in db.query(DownloadArchiveEntry).order_by(DownloadArchiveEntry.id)] == ["c", "a"]
+    assert "youtube:c" not in _known_keys(db, 1)
+    db.query(DownloadHistory).filter_by(url="https://youtu.be/b").update({"status": "failed"})
+    db.commit()
+    db.close()
+
+    _make_due(session_factory)
+    checker.check_due()
+    db = session_factory()
+    assert sorted(d.url for d in db.query(DownloadHistory).filter_by(status="pending")) == [
+        "https://youtu.be/b", "https://youtu.be/c"
+    ]
+    db.close()
+
+
+def test_downloads_outside_subscriptions_are_archived(tmp_path, session_factory, monkeypatch) -> None:
+    scheduler = DownloadScheduler(workers=1, session_factory=session_factory)
+    monkeypatch.setattr(subscriptions, "download_scheduler", scheduler)
+    track = tmp_path / "b.mp3"
+    track.write_bytes(b"b")
+
+    class FakeDownloader:
+        def __init__(self, output_dir=None):
+            pass
+
+        def download_audio(self, url, admit=None, job_id=None, cancelled=None, memory=None):
+            return DownloadResult(success=True, file_path=str(track), title="b", extractor="youtube", media_id="b")
+
+    monkeypatch.setattr(scheduler_module, "MusicDownloader", FakeDownloader)
+    db = session_factory()
+    db.add(Subscription(id=1, user_id=1, url="https://www.youtube.com/@artist/videos"))
+    db.add(DownloadHistory(id=1, user_id=1, url="https://youtu.be/b", status="pending"))
+    db.commit()
+    db.close()
+
+    listings = iter([_listing("a"), _listing("c", "b", "a")])
+    checker = SubscriptionChecker(session_factory=session_factory, lister=lambda url, limit: next(listings))
+    _make_due(session_factory)
+    checker.check_due()  # seeds the archive with "a"
+
+    # downloaded by hand before the channel got to it
+    scheduler._execute(DownloadJob(id=1, user_id=1, url="https://youtu.be/b"))
+    _make_due(session_factory)
+    checker.check_due()
+
+    db = session_factory()
+    assert db.query(DownloadArchiveEntry.media_id).filter_by(download_id=1).all() == [("b",)]
+    assert [d.url for d in db.query(DownloadHistory).filter_by(status="pending")] == ["https://youtu.be/c"]
+    db.close()
+
+
+def test_listing_reads_only_the_entries_it_needs(monkeypatch) -> None:
+    import yt_dlp
+
+    produced = []
+
+    def entries():
+        for index in range(1000):
+            produced.append(index)
+            yield {"_type": "url", "ie_key": "Youtube", "id": f"v{index}", "url": f"https://youtu.be/v{index}"}
+
+    def extract_info(self, url, download=True, process=True, ie_key=None):
+        assert process is False
+        if url.endswith("@artist"):
+            return {"_type": "url", "url": "https://www.youtube.com/@artist/videos", "ie_key": "YoutubeTab"}
+        return {"_type": "playlist", "title": "Artist", "extractor_key": "YoutubeTab", "entries": entries()}
+
+    monkeypatch.setattr(yt_dlp.YoutubeDL, "extract_info", extract_info)
+    listing = MusicDownloader.list_entries("https://www.youtube.com/@artist", 3)
+
+    assert listing.title == "Artist" and produced == []
+    assert [entry.media_id for entry in listing.entries] == ["v0", "v1", "v2"]
+    assert produced == [0, 1, 2]
@@ -145,6 +145,8 @@ function colorForStatus(status: DownloadResponse["status"]) {
       return "#2563eb";
     case "failed":
       return "#dc2626";
+    case "cancelled":
+      return "#6b7280";
     default:
       return "#a16207"; // pending
   }
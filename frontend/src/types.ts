@@ -15,6 +15,7 @@ export type UserResponse = {
 
 export type DownloadRequest = {
   url: string;
+  priority?: "interactive" | "bulk";
 };
 
 export type DownloadResponse = {
@@ -22,8 +23,11 @@ export type DownloadResponse = {
   url: string;
   title?: string | null;
   artist?: string | null;
-  status: "pending" | "downloading" | "completed" | "failed";
+  status: "pending" | "downloading" | "completed" | "failed" | "cancelled";
   file_path?: string | null;
+  priority?: "interactive" | "bulk";
+  queue_position?: number | null; // only while pending
+  estimated_start_at?: string | null; // ISO datetime, only while pending
   created_at: string; // ISO datetime
 };
 